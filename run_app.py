@@ -1,6 +1,9 @@
+import multiprocessing
+
 from src.main import main
 
 
 if __name__ == "__main__":
+    # Folder imports parse in worker processes; frozen builds need this hook.
+    multiprocessing.freeze_support()
     main()
-
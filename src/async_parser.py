@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from collections.abc import AsyncIterator, Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+
+from .metrics import METRICS, write_metrics_from_env
+from .models import WorkbookParseResult
+from .parser import (
+    ArchiveMember,
+    folder_sources,
+    largest_first,
+    parse_source,
+    parse_to_wire,
+    source_name,
+)
+from .wire import decode_results
+
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def process_executor(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Process pool for the async API; spawned like the folder-import workers."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+async def parse_workbook_async(
+    source: Path | ArchiveMember,
+    source_file: str | None = None,
+    executor: Executor | None = None,
+    timeout: float | None = None,
+) -> WorkbookParseResult:
+    """Parse one workbook or archive member in ``executor`` without blocking the event loop.
+
+    ``executor`` defaults to the loop's thread pool; a :class:`ProcessPoolExecutor`
+    (see :func:`process_executor`) parses in another process. Raises
+    :class:`TimeoutError` when parsing takes longer than ``timeout`` seconds.
+    """
+    return await _parse(source, source_file or source_name(source, None), executor, timeout)
+
+
+async def iter_parse_async(
+    sources: Iterable[Path | ArchiveMember],
+    root: Path | None = None,
+    executor: Executor | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: float | None = None,
+    return_exceptions: bool = False,
+) -> AsyncIterator[tuple[Path | ArchiveMember, WorkbookParseResult | Exception]]:
+    """Yield ``(source, result)`` as parses complete, largest files started first.
+
+    At most ``max_concurrency`` files are in ``executor`` at a time, and
+    ``timeout`` applies to each file. A failed or timed-out file raises from
+    the iterator unless ``return_exceptions`` is set, in which case its
+    exception is yielded in place of the result. A timed-out file is reported
+    when its timeout expires, but a running parse cannot be interrupted, so it
+    keeps its slot until the executor has finished with it. Closing the
+    iterator (or cancelling the task consuming it) cancels the files still in
+    flight; a parse already running in a worker finishes there, but its result
+    is dropped and no further files are submitted.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    queue = iter(largest_first(sources))
+    exhausted = False
+    running: dict[asyncio.Task[WorkbookParseResult], tuple[Path | ArchiveMember, asyncio.Future]] = {}
+    # A file's slot: its executor work, until that is done and its outcome was taken.
+    in_flight: set[asyncio.Future[WorkbookParseResult]] = set()
+
+    def fill() -> None:
+        nonlocal exhausted
+        while not exhausted and len(in_flight) < max_concurrency:
+            source = next(queue, None)
+            if source is None:
+                exhausted = True
+                return
+            source_file = source_name(source, root)
+            work = asyncio.ensure_future(_run_in_executor(source, source_file, executor))
+            in_flight.add(work)
+            running[asyncio.ensure_future(_await_parse(work, source_file, timeout))] = source, work
+
+    try:
+        fill()
+        while running:
+            waiting = set(running)
+            if not exhausted:
+                # Timed-out parses still running free their slot when they finish.
+                waiting.update(work for work in in_flight if not work.done())
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            finished = [(task, running.pop(task)[0]) for task in done if task in running]
+            pending = {work for _, work in running.values()}
+            in_flight.difference_update([work for work in in_flight if work.done() and work not in pending])
+            fill()
+            for task, source in finished:
+                exc = task.exception()
+                if exc is None:
+                    yield source, task.result()
+                elif return_exceptions and isinstance(exc, Exception):
+                    yield source, exc
+                else:
+                    raise exc
+    finally:
+        for task in (*running, *in_flight):
+            task.cancel()
+        if running or in_flight:
+            await asyncio.gather(*running, *in_flight, return_exceptions=True)
+
+
+async def parse_workbooks_async(
+    sources: Iterable[Path | ArchiveMember],
+    root: Path | None = None,
+    executor: Executor | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: float | None = None,
+) -> list[WorkbookParseResult]:
+    """Parse ``sources`` (see :func:`iter_parse_async`) and return results sorted by source file."""
+    parsed = iter_parse_async(
+        sources, root=root, executor=executor, max_concurrency=max_concurrency, timeout=timeout
+    )
+    results = [result async for _, result in parsed]
+    return sorted(results, key=lambda result: result.source_file)
+
+
+async def parse_folder_async(
+    folder: Path,
+    include: Sequence[str] = ("*",),
+    exclude: Sequence[str] = (),
+    recursive: bool = False,
+    executor: Executor | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: float | None = None,
+) -> list[WorkbookParseResult]:
+    """Async counterpart of :func:`parse_folder`; discovery also runs off the event loop."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    sources, root = await loop.run_in_executor(None, folder_sources, folder, include, exclude, recursive)
+    results = await parse_workbooks_async(
+        sources, root=root, executor=executor, max_concurrency=max_concurrency, timeout=timeout
+    )
+    METRICS.observe("folder_parse_seconds", time.perf_counter() - started)
+    await loop.run_in_executor(None, write_metrics_from_env)
+    return results
+
+
+async def _parse(
+    source: Path | ArchiveMember, source_file: str, executor: Executor | None, timeout: float | None
+) -> WorkbookParseResult:
+    work = asyncio.ensure_future(_run_in_executor(source, source_file, executor))
+    return await _await_parse(work, source_file, timeout)
+
+
+async def _await_parse(
+    work: asyncio.Future[WorkbookParseResult], source_file: str, timeout: float | None
+) -> WorkbookParseResult:
+    # Shielded: a timeout gives up waiting but leaves the work tracked by the caller.
+    try:
+        return await asyncio.wait_for(asyncio.shield(work), timeout)
+    except asyncio.TimeoutError:
+        if timeout is None:
+            raise
+        raise TimeoutError(f"Parsing {source_file} timed out after {timeout:g} s") from None
+
+
+async def _run_in_executor(
+    source: Path | ArchiveMember, source_file: str, executor: Executor | None
+) -> WorkbookParseResult:
+    loop = asyncio.get_running_loop()
+    if not isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, parse_source, source, source_file)
+    try:
+        payload, worker_metrics = await loop.run_in_executor(
+            executor, parse_to_wire, source, source_file, METRICS.enabled
+        )
+    except Exception:
+        METRICS.inc("workbooks_failed_total")
+        raise
+    if worker_metrics is not None:
+        METRICS.merge(worker_metrics)
+    return decode_results(payload)[0]
@@ -18,26 +18,57 @@ _DEFAULT_PATH = Path("config/gui_defaults.json")
 
 
 def load_gui_defaults() -> XmlConfig:
-    if not _DEFAULT_PATH.exists():
-        return XmlConfig()
-    try:
-        data = json.loads(_DEFAULT_PATH.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
+    data = _read_defaults_file()
+    if data is None:
         return XmlConfig()
+    return _config_from_dict(data)
+
+
+def save_gui_defaults(cfg: XmlConfig) -> None:
+    data = _read_defaults_file() or {}
+    data.update(asdict(cfg))
+    _write_defaults_file(data)
+
 
+def load_export_profiles() -> dict[str, XmlConfig]:
+    data = _read_defaults_file() or {}
+    raw_profiles = data.get("export_profiles", {})
+    if not isinstance(raw_profiles, dict):
+        return {}
+    profiles: dict[str, XmlConfig] = {}
+    for name, profile in raw_profiles.items():
+        name_text = str(name).strip()
+        if name_text and isinstance(profile, dict):
+            profiles[name_text] = _config_from_dict(profile)
+    return profiles
+
+
+def _config_from_dict(data: dict) -> XmlConfig:
+    # Slotted dataclasses do not keep field defaults as class attributes.
+    defaults = XmlConfig()
     return XmlConfig(
-        method_id=str(data.get("method_id", XmlConfig.method_id)),
-        method_version=str(data.get("method_version", XmlConfig.method_version)),
+        method_id=str(data.get("method_id", defaults.method_id)),
+        method_version=str(data.get("method_version", defaults.method_version)),
         sample_tube_types=_normalize_list(data.get("sample_tube_types", [])),
         measurement_sample_lists=_normalize_list(data.get("measurement_sample_lists", [])),
         run_results_export_path=str(data.get("run_results_export_path", "")),
     )
 
 
-def save_gui_defaults(cfg: XmlConfig) -> None:
+def _read_defaults_file() -> dict | None:
+    if not _DEFAULT_PATH.exists():
+        return None
+    try:
+        data = json.loads(_DEFAULT_PATH.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _write_defaults_file(data: dict) -> None:
     _DEFAULT_PATH.parent.mkdir(parents=True, exist_ok=True)
     _DEFAULT_PATH.write_text(
-        json.dumps(asdict(cfg), ensure_ascii=False, indent=2),
+        json.dumps(data, ensure_ascii=False, indent=2),
         encoding="utf-8",
     )
 
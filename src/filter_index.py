@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import heapq
+import re
+from array import array
+from bisect import bisect_left, insort
+from operator import attrgetter
+
+from .models import MeasurementRecord, WorkbookParseResult
+from .search_index import TrigramIndex
+
+
+FILTER_FIELDS = ("source_file", "sample_label", "analyte_name", "unit", "metric_role")
+TEXT_FILTER = "text"
+SORT_COLUMNS = (
+    "source_file",
+    "sample_label",
+    "sample_code",
+    "unit",
+    "analyte_name",
+    "group_name",
+    "metric_role",
+    "raw_value",
+    "numeric_value",
+    "value_status",
+    "sheet_row",
+    "sheet_col",
+)
+_NUMERIC_SORT_COLUMNS = frozenset({"numeric_value", "sheet_row", "sheet_col"})
+_BLANK_LAST = float("inf")
+_POSTING_FIELDS = FILTER_FIELDS[1:]
+
+_NON_ZERO_BYTES = re.compile(rb"[^\x00]+")
+_BIT_POSITIONS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+_COMPACT_MIN_DEAD = 4096
+
+
+class MeasurementIndex:
+    """Inverted index over the loaded measurement records.
+
+    Every record gets an integer id. Records of one workbook occupy a contiguous
+    id range, so the source-file filter is a range lookup and replacing or
+    dropping a workbook only flips that range in the ``live`` bitmask. For the
+    other filter fields, each distinct value keeps a posting list of ids; a
+    bitmap of the posting list is built lazily and cached, and filter
+    combinations resolve by AND-ing those bitmaps. The free-text filter
+    (``TEXT_FILTER``) is answered by a :class:`TrigramIndex` over the same ids.
+    """
+
+    def __init__(self) -> None:
+        self.generation = 0
+        self.clear()
+
+    def clear(self) -> None:
+        self._records: list[MeasurementRecord | None] = []
+        self._ranges: dict[str, tuple[int, int]] = {}
+        self._sorted_sources: list[str] = []
+        self._postings: dict[str, dict[str, array]] = {name: {} for name in _POSTING_FIELDS}
+        self._counts: dict[str, dict[str, int]] = {name: {} for name in _POSTING_FIELDS}
+        self._values: dict[str, list[str]] = {name: [] for name in _POSTING_FIELDS}
+        self._bitmaps: dict[tuple[str, str], int] = {}
+        self._search = TrigramIndex()
+        self._permutations: dict[str, tuple[array, array]] = {}
+        self._live = 0
+        self._dead = 0
+        self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._records) - self._dead
+
+    def upsert(self, results: list[WorkbookParseResult]) -> None:
+        for result in results:
+            self._drop_source(result.source_file)
+            self._append(result.source_file, result.normalized_values)
+        self._maybe_compact()
+        self.generation += 1
+
+    def remove(self, source_file: str) -> None:
+        if self._drop_source(source_file):
+            self._maybe_compact()
+            self.generation += 1
+
+    def values(self, field_name: str) -> list[str]:
+        """Sorted distinct non-empty values of ``field_name`` across live records."""
+        if field_name == "source_file":
+            return list(self._sorted_sources)
+        return [value for value in self._values[field_name] if value]
+
+    def query(
+        self, filters: dict[str, str], sort_by: str | None = None, descending: bool = False
+    ) -> list[MeasurementRecord]:
+        """Return live records matching every non-empty filter.
+
+        Without ``sort_by`` records come in source-file order. With ``sort_by``
+        (one of ``SORT_COLUMNS``) the cached permutation for that column is used,
+        so repeated sorted queries never re-sort the record store.
+        """
+        sources, mask = self._resolve(filters)
+        records = self._records
+        if mask == 0:
+            return []
+
+        if sort_by is None:
+            if mask is None:
+                out: list[MeasurementRecord] = []
+                for source in sources:
+                    out.extend(records[slice(*self._ranges[source])])
+                return out
+            return [records[record_id] for record_id in self._decode(mask, sources)]
+
+        perm, rank = self._permutation(sort_by)
+        if mask is None and len(sources) == len(self._sorted_sources):
+            ordered = perm
+        else:
+            if mask is None:
+                mask = self._source_mask(sources)
+            elif len(sources) != len(self._sorted_sources):
+                mask &= self._source_mask(sources)
+            if mask.bit_count() * 8 > len(perm):
+                raw = mask.to_bytes((len(records) + 7) // 8, "little")
+                ordered = [i for i in perm if raw[i >> 3] >> (i & 7) & 1]
+            else:
+                ordered = sorted(self._decode(mask, sources), key=rank.__getitem__)
+        if descending:
+            if sort_by in _NUMERIC_SORT_COLUMNS:
+                ordered = _reversed_blanks_last(ordered, lambda i: getattr(records[i], sort_by) is None)
+            else:
+                ordered = ordered[::-1]
+        return [records[record_id] for record_id in ordered]
+
+    def _resolve(self, filters: dict[str, str]) -> tuple[list[str], int | None]:
+        """Sources to visit plus a bitmask of matching ids (``None`` = whole sources)."""
+        active = {name: value for name, value in filters.items() if value}
+        source_filter = active.pop("source_file", None)
+        text_filter = active.pop(TEXT_FILTER, "").strip()
+        if source_filter is not None:
+            if source_filter not in self._ranges:
+                return [], 0
+            sources = [source_filter]
+        else:
+            sources = self._sorted_sources
+
+        if not active and not text_filter:
+            return sources, None
+
+        mask = self._live
+        for name, value in sorted(active.items(), key=lambda item: self._posting_size(*item)):
+            if value not in self._postings[name]:
+                return sources, 0
+            mask &= self._bitmap(name, value)
+            if not mask:
+                return sources, 0
+        if text_filter:
+            mask &= self._search.bitmap(text_filter, len(self._records))
+        return sources, mask
+
+    def _source_mask(self, sources: list[str]) -> int:
+        mask = 0
+        for source in sources:
+            start, stop = self._ranges[source]
+            mask |= ((1 << (stop - start)) - 1) << start
+        return mask
+
+    def _permutation(self, column: str) -> tuple[array, array]:
+        cached = self._permutations.get(column)
+        if cached is not None:
+            return cached
+        if column not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort preview by unknown column: {column}")
+
+        ids: list[int] = []
+        for source in self._sorted_sources:
+            ids.extend(range(*self._ranges[source]))
+        values = [getattr(self._records[record_id], column) for record_id in ids]
+        if column in _NUMERIC_SORT_COLUMNS:
+            keys = array("d", (_BLANK_LAST if value is None else value for value in values))
+        else:
+            texts = [value or "" for value in values]
+            codes = {text: code for code, text in enumerate(sorted(set(texts)))}
+            keys = array("I", map(codes.__getitem__, texts))
+
+        perm = array("I", (ids[pos] for pos in sorted(range(len(ids)), key=keys.__getitem__)))
+        rank = array("I", bytes(array("I").itemsize * len(self._records)))
+        for position, record_id in enumerate(perm):
+            rank[record_id] = position
+        self._permutations[column] = (perm, rank)
+        return perm, rank
+
+    def _posting_size(self, field_name: str, value: str) -> int:
+        posting = self._postings[field_name].get(value)
+        return 0 if posting is None else len(posting)
+
+    def _append(self, source_file: str, records: list[MeasurementRecord]) -> None:
+        start = len(self._records)
+        self._records.extend(records)
+        stop = len(self._records)
+        self._search.add_records(start, records)
+        columns = (
+            [rec.sample_label or "" for rec in records],
+            [rec.analyte_name for rec in records],
+            [rec.unit or "" for rec in records],
+            [rec.metric_role for rec in records],
+        )
+        for name, keys in zip(_POSTING_FIELDS, columns):
+            postings = self._postings[name]
+            counts = self._counts[name]
+            touched: set[str] = set()
+            for record_id, key in enumerate(keys, start=start):
+                posting = postings.get(key)
+                if posting is None:
+                    posting = postings[key] = array("I")
+                posting.append(record_id)
+                touched.add(key)
+            for key in touched:
+                self._bitmaps.pop((name, key), None)
+                if key not in counts:
+                    insort(self._values[name], key)
+                    counts[key] = 0
+            for key in keys:
+                counts[key] += 1
+
+        self._ranges[source_file] = (start, stop)
+        insort(self._sorted_sources, source_file)
+        self._live |= ((1 << (stop - start)) - 1) << start
+        self._permutations.clear()
+
+    def _drop_source(self, source_file: str) -> bool:
+        bounds = self._ranges.pop(source_file, None)
+        if bounds is None:
+            return False
+        start, stop = bounds
+        for record_id in range(start, stop):
+            rec = self._records[record_id]
+            if rec is None:
+                continue
+            for name, key in zip(_POSTING_FIELDS, _posting_keys(rec)):
+                self._decrement(name, key)
+            self._records[record_id] = None
+        del self._sorted_sources[bisect_left(self._sorted_sources, source_file)]
+        self._live &= ~(((1 << (stop - start)) - 1) << start)
+        self._permutations.clear()
+        self._dead += stop - start
+        return True
+
+    def _decrement(self, field_name: str, key: str) -> None:
+        counts = self._counts[field_name]
+        count = counts[key] - 1
+        if count:
+            counts[key] = count
+            return
+        del counts[key]
+        values = self._values[field_name]
+        del values[bisect_left(values, key)]
+
+    def _bitmap(self, field_name: str, value: str) -> int:
+        cache_key = (field_name, value)
+        cached = self._bitmaps.get(cache_key)
+        if cached is not None:
+            return cached
+        bits = bytearray((len(self._records) + 7) // 8)
+        for record_id in self._postings[field_name][value]:
+            bits[record_id >> 3] |= 1 << (record_id & 7)
+        bitmap = int.from_bytes(bits, "little")
+        self._bitmaps[cache_key] = bitmap
+        return bitmap
+
+    def _decode(self, mask: int, sources: list[str]) -> list[int]:
+        raw = mask.to_bytes((len(self._records) + 7) // 8, "little")
+        out: list[int] = []
+        for source in sources:
+            start, stop = self._ranges[source]
+            first_byte = start >> 3
+            for match in _NON_ZERO_BYTES.finditer(raw, first_byte, (stop + 7) >> 3):
+                base = match.start() << 3
+                for offset, byte in enumerate(match.group()):
+                    for bit in _BIT_POSITIONS[byte]:
+                        record_id = base + (offset << 3) + bit
+                        if start <= record_id < stop:
+                            out.append(record_id)
+        return out
+
+    def _maybe_compact(self) -> None:
+        if self._dead >= _COMPACT_MIN_DEAD and self._dead * 2 > len(self._records):
+            self._compact()
+
+    def _compact(self) -> None:
+        live_results = [
+            (source, self._records[slice(*self._ranges[source])]) for source in self._sorted_sources
+        ]
+        generation = self.generation
+        self.clear()
+        self.generation = generation
+        for source, records in live_results:
+            self._append(source, records)
+
+
+def merge_queries(
+    first: list[MeasurementRecord],
+    second: list[MeasurementRecord],
+    sort_by: str | None = None,
+    descending: bool = False,
+) -> list[MeasurementRecord]:
+    """Merge two query results over disjoint sources, each already in :meth:`MeasurementIndex.query` order."""
+    if sort_by is None:
+        return list(heapq.merge(first, second, key=attrgetter("source_file")))
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort preview by unknown column: {sort_by}")
+    if sort_by not in _NUMERIC_SORT_COLUMNS:
+        def key(rec: MeasurementRecord) -> tuple[str, str]:
+            return (getattr(rec, sort_by) or "", rec.source_file)
+
+        return list(heapq.merge(first, second, key=key, reverse=descending))
+
+    # Numeric blanks trail both inputs and stay last, in source order, either way.
+    first_split, second_split = _blank_start(first, sort_by), _blank_start(second, sort_by)
+    values = heapq.merge(
+        first[:first_split],
+        second[:second_split],
+        key=lambda rec: (getattr(rec, sort_by), rec.source_file),
+        reverse=descending,
+    )
+    blanks = heapq.merge(first[first_split:], second[second_split:], key=attrgetter("source_file"))
+    return [*values, *blanks]
+
+
+def _blank_start(records: list[MeasurementRecord], column: str) -> int:
+    split = len(records)
+    while split and getattr(records[split - 1], column) is None:
+        split -= 1
+    return split
+
+
+def _reversed_blanks_last(ordered, is_blank) -> list:
+    # Numeric blanks sort last ascending; keep them last when descending too.
+    split = len(ordered)
+    while split and is_blank(ordered[split - 1]):
+        split -= 1
+    return [*ordered[:split][::-1], *ordered[split:]]
+
+
+def _posting_keys(rec: MeasurementRecord) -> tuple[str, str, str, str]:
+    return (
+        rec.sample_label or "",
+        rec.analyte_name,
+        rec.unit or "",
+        rec.metric_role,
+    )
@@ -2,13 +2,56 @@ from __future__ import annotations
 
 import sys
 import tkinter as tk
+from collections import Counter
+from contextlib import closing
+from collections.abc import Callable, Iterator
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
+from typing import Any
 from tkinter import filedialog, messagebox, ttk
 
-from .config import XmlConfig, load_gui_defaults, save_gui_defaults
+from .config import XmlConfig, load_export_profiles, load_gui_defaults, save_gui_defaults
+from .filter_index import SORT_COLUMNS, TEXT_FILTER, MeasurementIndex, merge_queries
+from .log_sink import BufferedLogSink, log_path_from_env
+from .metrics import write_metrics_from_env
 from .models import MeasurementRecord, WorkbookParseResult
-from .parser import parse_folder, parse_workbook
-from .xml_exporter import write_consolidated_addon_xml
+from .parser import (
+    ArchiveMember,
+    default_parse_workers,
+    discover_workbooks,
+    is_archive,
+    iter_parse_workbooks,
+    list_archive_workbooks,
+    parse_workbook,
+)
+from .refresh import RefreshScheduler
+from .result_cache import ResultCache, memory_budget_from_env
+from .snapshot import SNAPSHOT_SUFFIX, SessionSnapshot, load_session, save_session
+from .stats import PERCENTILES, CrossLotStatistics
+from .tasks import BackgroundTaskRunner, TaskContext, TaskProgress
+from .xml_exporter import write_aggregated_addon_xml, write_aggregated_profile_exports
+
+
+_PREVIEW_CHUNK_ROWS = 1000
+# Rows of paged-out workbooks pulled back for one preview.
+_PAGED_OUT_PREVIEW_ROWS = 10_000
+SUMMARY_COLUMNS = (
+    "group_name",
+    "analyte_name",
+    "unit",
+    "metric_role",
+    "sample_label",
+    "lots",
+    "count",
+    "min",
+    "max",
+    "mean",
+    "std",
+    *(f"p{percentile:g}" for percentile in PERCENTILES),
+    "drift",
+    "max_step",
+)
 
 
 class ExcelParserApp:
@@ -19,13 +62,19 @@ class ExcelParserApp:
         self._window_icon = None
         self._apply_window_icon()
 
-        self.results: list[WorkbookParseResult] = []
+        # Loaded results; beyond LEAFLET_PARSER_MEMORY_BUDGET_MB the least recently viewed are paged out.
+        self.results = ResultCache(budget_bytes=memory_budget_from_env())
+        self._index = MeasurementIndex()
+        self._tasks = BackgroundTaskRunner(self.root)
 
         self._filter_source = tk.StringVar(value="")
         self._filter_sample = tk.StringVar(value="")
         self._filter_analyte = tk.StringVar(value="")
         self._filter_unit = tk.StringVar(value="")
         self._filter_metric = tk.StringVar(value="")
+        self._filter_text = tk.StringVar(value="")
+        self._sort_column: str | None = None
+        self._sort_descending = False
 
         self._cfg_method_id = tk.StringVar()
         self._cfg_method_version = tk.StringVar()
@@ -33,9 +82,24 @@ class ExcelParserApp:
         self._cfg_measurement_lists = tk.StringVar()
         self._cfg_run_results_path = tk.StringVar()
 
+        self._task_status = tk.StringVar(value="Idle")
+
+        self._filter_values_generation = -1
+        self._summary_state: tuple[int, tuple[str, ...]] | None = None
+        # What the preview tree shows: its filter/sort view (None while incomplete) and rows per source.
+        self._preview_view: tuple[tuple[str, ...], str | None, bool] | None = None
+        self._preview_counts: dict[str, int] = {}
+        self._preview_hidden = 0
+        self._changed_sources: set[str] = set()
+
         self._build_ui()
+        self._log_sink = BufferedLogSink(self.root, self._log_text, log_path=log_path_from_env())
+        self._refresher = RefreshScheduler(
+            self.root, state_key=self._preview_state, render=self._render_preview
+        )
         self._load_default_config()
         self._refresh_preview()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_ui(self) -> None:
         self.root.rowconfigure(3, weight=1)
@@ -44,9 +108,9 @@ class ExcelParserApp:
 
         control_frame = ttk.Frame(self.root, padding=10)
         control_frame.grid(row=0, column=0, sticky="ew")
-        for idx in range(6):
+        for idx in range(9):
             control_frame.columnconfigure(idx, weight=0)
-        control_frame.columnconfigure(6, weight=1)
+        control_frame.columnconfigure(9, weight=1)
 
         ttk.Button(control_frame, text="Import File", command=self.import_file).grid(
             row=0, column=0, padx=5, pady=5, sticky="w"
@@ -55,17 +119,41 @@ class ExcelParserApp:
             row=0, column=1, padx=5, pady=5, sticky="w"
         )
         ttk.Button(
-            control_frame, text="Preview Normalized Records", command=self._refresh_preview
+            control_frame,
+            text="Preview Normalized Records",
+            command=lambda: self._refresh_preview(force=True),
         ).grid(row=0, column=2, padx=5, pady=5, sticky="w")
         ttk.Button(control_frame, text="Export XML", command=self.export_xml).grid(
             row=0, column=3, padx=5, pady=5, sticky="w"
         )
-        ttk.Button(control_frame, text="Save Defaults", command=self.save_defaults).grid(
+        ttk.Button(control_frame, text="Export Profiles", command=self.export_profiles).grid(
             row=0, column=4, padx=5, pady=5, sticky="w"
         )
-        ttk.Button(control_frame, text="Clear", command=self.clear_results).grid(
+        ttk.Button(control_frame, text="Save Defaults", command=self.save_defaults).grid(
             row=0, column=5, padx=5, pady=5, sticky="w"
         )
+        ttk.Button(control_frame, text="Clear", command=self.clear_results).grid(
+            row=0, column=6, padx=5, pady=5, sticky="w"
+        )
+        ttk.Button(control_frame, text="Save Session", command=self.save_session_file).grid(
+            row=0, column=7, padx=5, pady=5, sticky="w"
+        )
+        ttk.Button(control_frame, text="Load Session", command=self.load_session_file).grid(
+            row=0, column=8, padx=5, pady=5, sticky="w"
+        )
+
+        task_frame = ttk.Frame(control_frame)
+        task_frame.grid(row=1, column=0, columnspan=10, sticky="ew")
+        task_frame.columnconfigure(1, weight=1)
+        self._cancel_button = ttk.Button(
+            task_frame, text="Cancel", command=self.cancel_tasks, state="disabled"
+        )
+        self._cancel_button.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self._progress = ttk.Progressbar(task_frame, mode="determinate", maximum=1)
+        self._progress.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        ttk.Label(task_frame, textvariable=self._task_status, width=40).grid(
+            row=0, column=2, padx=5, pady=5, sticky="w"
+        )
 
         config_frame = ttk.LabelFrame(self.root, text="XML Config", padding=10)
         config_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 10))
@@ -121,29 +209,25 @@ class ExcelParserApp:
         self._metric_combo = self._make_filter_combo(
             parent=filter_frame, label="Metric", variable=self._filter_metric, row=0, col=8
         )
+        ttk.Label(filter_frame, text="Search").grid(row=1, column=0, sticky="w", padx=4, pady=4)
+        ttk.Entry(filter_frame, textvariable=self._filter_text).grid(
+            row=1, column=1, columnspan=9, sticky="ew", padx=4, pady=4
+        )
+        self._filter_text.trace_add("write", lambda *_args: self._refresh_preview())
+
+        self._notebook = ttk.Notebook(self.root)
+        self._notebook.grid(row=3, column=0, sticky="nsew", padx=10, pady=(0, 10))
+        self._notebook.bind("<<NotebookTabChanged>>", lambda _event: self._refresh_summary())
 
-        preview_frame = ttk.LabelFrame(self.root, text="Normalized Records", padding=10)
-        preview_frame.grid(row=3, column=0, sticky="nsew", padx=10, pady=(0, 10))
+        preview_frame = ttk.Frame(self._notebook, padding=10)
+        self._notebook.add(preview_frame, text="Normalized Records")
         preview_frame.rowconfigure(0, weight=1)
         preview_frame.columnconfigure(0, weight=1)
 
-        columns = (
-            "source_file",
-            "sample_label",
-            "sample_code",
-            "unit",
-            "analyte_name",
-            "group_name",
-            "metric_role",
-            "raw_value",
-            "numeric_value",
-            "value_status",
-            "sheet_row",
-            "sheet_col",
-        )
+        columns = SORT_COLUMNS
         self._tree = ttk.Treeview(preview_frame, columns=columns, show="headings", height=18)
         for col in columns:
-            self._tree.heading(col, text=col)
+            self._tree.heading(col, text=col, command=lambda c=col: self._sort_preview(c))
             width = 110
             if col in {"source_file", "analyte_name"}:
                 width = 220
@@ -156,6 +240,26 @@ class ExcelParserApp:
         y_scroll.grid(row=0, column=1, sticky="ns")
         self._tree.configure(yscrollcommand=y_scroll.set)
 
+        self._summary_frame = ttk.Frame(self._notebook, padding=10)
+        self._notebook.add(self._summary_frame, text="Cross-lot Summary")
+        self._summary_frame.rowconfigure(0, weight=1)
+        self._summary_frame.columnconfigure(0, weight=1)
+        self._summary_tree = ttk.Treeview(
+            self._summary_frame, columns=SUMMARY_COLUMNS, show="headings", height=18
+        )
+        for col in SUMMARY_COLUMNS:
+            self._summary_tree.heading(col, text=col)
+            width = 90
+            if col in {"group_name", "analyte_name"}:
+                width = 180
+            self._summary_tree.column(col, width=width, anchor="w")
+        self._summary_tree.grid(row=0, column=0, sticky="nsew")
+        summary_scroll = ttk.Scrollbar(
+            self._summary_frame, orient="vertical", command=self._summary_tree.yview
+        )
+        summary_scroll.grid(row=0, column=1, sticky="ns")
+        self._summary_tree.configure(yscrollcommand=summary_scroll.set)
+
         log_frame = ttk.LabelFrame(self.root, text="Status Log", padding=10)
         log_frame.grid(row=4, column=0, sticky="nsew", padx=10, pady=(0, 10))
         log_frame.rowconfigure(0, weight=1)
@@ -183,7 +287,9 @@ class ExcelParserApp:
         return combo
 
     def _load_default_config(self) -> None:
-        cfg = load_gui_defaults()
+        self._apply_config(load_gui_defaults())
+
+    def _apply_config(self, cfg: XmlConfig) -> None:
         self._cfg_method_id.set(cfg.method_id)
         self._cfg_method_version.set(cfg.method_version)
         self._cfg_sample_tube_types.set(", ".join(cfg.sample_tube_types))
@@ -205,33 +311,93 @@ class ExcelParserApp:
         self._log("Saved GUI defaults to config/gui_defaults.json")
 
     def import_file(self) -> None:
+        if self._task_busy("import"):
+            return
         selected = filedialog.askopenfilename(
-            title="Select Excel workbook",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            title="Select Excel workbook or ZIP bundle",
+            filetypes=[("Excel files", "*.xlsx"), ("ZIP bundles", "*.zip"), ("All files", "*.*")],
         )
         if not selected:
             return
-        result = parse_workbook(Path(selected))
-        self._upsert_results([result])
-        self._log(f"Imported file: {result.source_file}")
-        self._log_warnings(result)
-        self._refresh_preview()
+        path = Path(selected)
+        if is_archive(path):
+            self._import_archive(path)
+            return
+
+        def work(ctx: TaskContext) -> WorkbookParseResult:
+            ctx.report(0, 1, path.name)
+            result = parse_workbook(path)
+            write_metrics_from_env()
+            ctx.report(1, 1, path.name)
+            return result
+
+        def done(result: WorkbookParseResult) -> None:
+            self._upsert_results([result])
+            self._log(f"Imported file: {result.source_file}")
+            self._log_warnings(result)
+            self._refresh_preview()
+
+        self._start_task("import", work, done, failure_title="Import failed")
 
     def import_folder(self) -> None:
+        if self._task_busy("import"):
+            return
         selected = filedialog.askdirectory(title="Select folder with Excel workbooks")
         if not selected:
             return
-        results = parse_folder(Path(selected))
-        if not results:
-            messagebox.showinfo("No files", "No .xlsx files found in selected folder.")
+        folder = Path(selected)
+        files = discover_workbooks(folder)
+        if not files:
+            messagebox.showinfo("No files", "No .xlsx files found in selected folder or its subfolders.")
             return
-        self._upsert_results(results)
-        self._log(f"Imported folder: {selected} ({len(results)} workbook(s))")
-        for result in results:
-            self._log_warnings(result)
-        self._refresh_preview()
+        self._import_sources(files, root=folder, label=f"folder: {selected}")
+
+    def _import_archive(self, archive: Path) -> None:
+        try:
+            members = list_archive_workbooks(archive)
+        except (OSError, ValueError) as exc:
+            messagebox.showerror("Import failed", str(exc))
+            return
+        if not members:
+            messagebox.showinfo("No files", "No .xlsx files found in the selected ZIP bundle.")
+            return
+        self._import_sources(members, root=None, label=f"archive: {archive}")
+
+    def _import_sources(self, sources: list[Path | ArchiveMember], root: Path | None, label: str) -> None:
+        imported: list[str] = []
+
+        def work(ctx: TaskContext) -> None:
+            total = len(sources)
+            ctx.report(0, total, label)
+            parsed = iter_parse_workbooks(sources, root=root, max_workers=default_parse_workers())
+            with closing(parsed):
+                for idx, (_, result) in enumerate(parsed, start=1):
+                    ctx.check_cancelled()
+                    ctx.publish(result)
+                    ctx.report(idx, total, result.source_file)
+            write_metrics_from_env()
+
+        def ingest(results: list[WorkbookParseResult]) -> None:
+            # Workbooks are shown as they finish instead of after the whole import.
+            self._upsert_results(results)
+            for result in results:
+                imported.append(result.source_file)
+                self._log_warnings(result)
+            self._refresh_preview()
+
+        def done(_: None) -> None:
+            self._log(f"Imported {label} ({len(imported)} workbook(s))")
+
+        def cancelled() -> None:
+            self._log(f"Import cancelled; kept the {len(imported)} workbook(s) already imported from {label}.")
+
+        self._start_task(
+            "import", work, done, failure_title="Import failed", on_partial=ingest, on_cancelled=cancelled
+        )
 
     def export_xml(self) -> None:
+        if self._task_busy("export"):
+            return
         if not self.results:
             messagebox.showwarning("No data", "Import at least one workbook first.")
             return
@@ -240,106 +406,332 @@ class ExcelParserApp:
             return
         cfg = self._collect_config()
         save_gui_defaults(cfg)
-        try:
-            out_path = write_consolidated_addon_xml(results=self.results, cfg=cfg, out_dir=Path(out_dir))
-        except Exception as exc:
-            self._log(f"[ERROR] XML export failed: {exc}")
-            messagebox.showerror("XML export failed", str(exc))
+        # Paged-out workbooks keep their aggregation, so exporting never reloads them.
+        aggregation = self.results.aggregation()
+
+        def work(ctx: TaskContext) -> Path:
+            ctx.report(0, 1, "consolidated.xml")
+            out_path = write_aggregated_addon_xml(aggregation, cfg=cfg, out_dir=Path(out_dir))
+            write_metrics_from_env()
+            ctx.report(1, 1, "consolidated.xml")
+            return out_path
+
+        def done(out_path: Path) -> None:
+            self._log(f"Exported consolidated XML to: {out_path}")
+            messagebox.showinfo("XML export complete", "Exported 1 consolidated XML file.")
+
+        self._start_task("export", work, done, failure_title="XML export failed")
+
+    def export_profiles(self) -> None:
+        if self._task_busy("export"):
+            return
+        if not self.results:
+            messagebox.showwarning("No data", "Import at least one workbook first.")
+            return
+        profiles = load_export_profiles()
+        if not profiles:
+            messagebox.showinfo(
+                "No export profiles",
+                "Define export profiles under 'export_profiles' in config/gui_defaults.json first.",
+            )
+            return
+        out_dir = filedialog.askdirectory(title="Select output folder for profile exports")
+        if not out_dir:
+            return
+        aggregation = self.results.aggregation()
+
+        def work(ctx: TaskContext) -> dict[str, Path]:
+            ctx.report(0, 1, f"{len(profiles)} profile(s)")
+            written = write_aggregated_profile_exports(
+                aggregation, profiles=profiles, out_dir=Path(out_dir), max_workers=default_parse_workers()
+            )
+            write_metrics_from_env()
+            ctx.report(1, 1, f"{len(profiles)} profile(s)")
+            return written
+
+        def done(written: dict[str, Path]) -> None:
+            for name, path in written.items():
+                self._log(f"Exported profile '{name}' to: {path}")
+            messagebox.showinfo(
+                "XML export complete", f"Exported {len(written)} profile XML file(s)."
+            )
+
+        self._start_task("export", work, done, failure_title="Profile export failed")
+
+    def save_session_file(self) -> None:
+        if self._task_busy("session"):
             return
+        selected = filedialog.asksaveasfilename(
+            title="Save session snapshot",
+            defaultextension=SNAPSHOT_SUFFIX,
+            filetypes=[("Session snapshots", f"*{SNAPSHOT_SUFFIX}"), ("All files", "*.*")],
+        )
+        if not selected:
+            return
+        cache = self.results
+        filters = self._current_filters()
+        config = self._collect_config()
+
+        def work(ctx: TaskContext) -> tuple[Path, int]:
+            ctx.report(0, 1, Path(selected).name)
+            # Paged-out workbooks are read back from the spill cache for the snapshot only.
+            snapshot = SessionSnapshot(results=list(cache.iter_results()), filters=filters, config=config)
+            return save_session(Path(selected), snapshot), len(snapshot.results)
+
+        def done(saved: tuple[Path, int]) -> None:
+            path, count = saved
+            self._log(f"Saved session ({count} workbook(s)) to: {path}")
 
-        self._log(f"Exported consolidated XML to: {out_path}")
-        messagebox.showinfo("XML export complete", "Exported 1 consolidated XML file.")
+        self._start_task("session", work, done, failure_title="Saving session failed")
+
+    def load_session_file(self) -> None:
+        if self._task_busy("session") or self._task_busy("import"):
+            return
+        selected = filedialog.askopenfilename(
+            title="Load session snapshot",
+            filetypes=[("Session snapshots", f"*{SNAPSHOT_SUFFIX}"), ("All files", "*.*")],
+        )
+        if not selected:
+            return
+
+        def work(ctx: TaskContext) -> SessionSnapshot:
+            ctx.report(0, 1, Path(selected).name)
+            return load_session(Path(selected))
+
+        def done(snapshot: SessionSnapshot) -> None:
+            self.results.clear()
+            self._index.clear()
+            self._upsert_results(snapshot.results)
+            self._apply_config(snapshot.config)
+            for name, variable in self._filter_variables().items():
+                variable.set(snapshot.filters.get(name, ""))
+            self._log(f"Loaded session ({len(snapshot.results)} workbook(s)) from: {selected}")
+            self._refresh_preview()
+
+        self._start_task("session", work, done, failure_title="Loading session failed")
+
+    def cancel_tasks(self) -> None:
+        if self._tasks.is_running():
+            self._task_status.set("Cancelling...")
+            self._tasks.cancel()
 
     def clear_results(self) -> None:
-        self.results = []
+        self.results.clear()
+        self._index.clear()
         self._filter_source.set("")
         self._filter_sample.set("")
         self._filter_analyte.set("")
         self._filter_unit.set("")
         self._filter_metric.set("")
+        self._filter_text.set("")
         self._refresh_preview()
         self._log("Cleared loaded results.")
 
     def _upsert_results(self, new_results: list[WorkbookParseResult]) -> None:
-        by_name = {result.source_file: result for result in self.results}
-        for result in new_results:
-            by_name[result.source_file] = result
-        self.results = [by_name[key] for key in sorted(by_name.keys())]
+        evicted = self.results.upsert(new_results)
+        self._index.upsert(new_results)
+        self._changed_sources.update(result.source_file for result in new_results)
+        self._page_out(evicted)
+
+    def _page_out(self, evicted: list[str]) -> None:
+        for source_file in evicted:
+            self._index.remove(source_file)
+        if evicted:
+            self._log(
+                f"Memory budget reached: paged out {len(evicted)} workbook(s); "
+                "views query their rows from the spill cache."
+            )
 
-    def _refresh_preview(self) -> None:
-        self._refresh_filter_values()
-        records = self._filtered_measurements()
+    def _rehydrate_selected_source(self) -> None:
+        """Reload the workbook picked in the File filter if it was paged out, and mark it as viewed."""
+        source_file = self._filter_source.get().strip()
+        if source_file not in self.results:
+            return
+        self.results.touch(source_file)
+        if self.results.is_resident(source_file):
+            return
+        result, evicted = self.results.get(source_file)
+        self._index.upsert([result])
+        self._changed_sources.add(source_file)
+        self._page_out(evicted)
+
+    def _refresh_preview(self, force: bool = False) -> None:
+        self._refresher.request(force=force)
+
+    def _sort_preview(self, column: str) -> None:
+        if self._sort_column == column:
+            self._sort_descending = not self._sort_descending
+        else:
+            self._sort_column = column
+            self._sort_descending = False
+        for col in SORT_COLUMNS:
+            marker = ""
+            if col == self._sort_column:
+                marker = " \u25bc" if self._sort_descending else " \u25b2"
+            self._tree.heading(col, text=col + marker)
+        self._refresh_preview()
 
+    def _preview_state(self) -> tuple[int, tuple[str, ...], str | None, bool]:
+        self._rehydrate_selected_source()
+        if self._filter_values_generation != self._index.generation:
+            self._refresh_filter_values()
+            self._filter_values_generation = self._index.generation
+        return (
+            self._index.generation,
+            tuple(self._current_filters().values()),
+            self._sort_column,
+            self._sort_descending,
+        )
+
+    def _render_preview(self) -> Iterator[None]:
+        filters = self._current_filters()
+        view = (tuple(filters.values()), self._sort_column, self._sort_descending)
+        changed, self._changed_sources = self._changed_sources, set()
+        shown, self._preview_view = self._preview_view, None
+        counts = self._preview_counts
+        # Workbooks added to an unsorted view are spliced in; anything else redraws the tree.
+        if (
+            shown == view
+            and counts
+            and self._sort_column is None
+            and not changed & counts.keys()
+            and not self._preview_hidden
+            and counts.keys() <= set(self.results.sources())
+        ):
+            yield from self._insert_preview_sources(filters, sorted(changed))
+        else:
+            yield from self._render_all_preview()
+        self._preview_view = view
+        paged_out = len(self.results.paged_out_sources())
+        suffix = f" ({paged_out} paged-out workbook(s) included)" if paged_out else ""
+        if self._preview_hidden:
+            suffix = f" ({self._preview_hidden} more from paged-out workbooks not shown; narrow the filters)"
+        self._log(f"Preview rows: {sum(counts.values())}{suffix}")
+        self._refresh_summary()
+
+    def _render_all_preview(self) -> Iterator[None]:
+        records, self._preview_hidden = self._query_records(
+            self._current_filters(), self._sort_column, self._sort_descending, limit=_PAGED_OUT_PREVIEW_ROWS
+        )
         self._tree.delete(*self._tree.get_children())
-        for rec in records:
-            self._tree.insert(
+        self._preview_counts.clear()
+        self._preview_counts.update(Counter(rec.source_file for rec in records))
+        for chunk_start in range(0, len(records), _PREVIEW_CHUNK_ROWS):
+            if chunk_start:
+                yield
+            for rec in records[chunk_start : chunk_start + _PREVIEW_CHUNK_ROWS]:
+                self._tree.insert("", "end", values=_preview_values(rec))
+
+    def _insert_preview_sources(self, filters: dict[str, str], sources: list[str]) -> Iterator[None]:
+        counts = self._preview_counts
+        for source in sources:
+            if filters["source_file"] and filters["source_file"] != source:
+                records: list[MeasurementRecord] = []
+            else:
+                records, _ = self._query_records({**filters, "source_file": source})
+            # Unsorted previews list records in source-file order.
+            position = sum(count for shown, count in counts.items() if shown < source)
+            for chunk_start in range(0, len(records), _PREVIEW_CHUNK_ROWS):
+                if chunk_start:
+                    yield
+                for offset, rec in enumerate(records[chunk_start : chunk_start + _PREVIEW_CHUNK_ROWS]):
+                    self._tree.insert("", position + chunk_start + offset, values=_preview_values(rec))
+            counts[source] = len(records)
+            yield
+
+    def _refresh_summary(self) -> None:
+        """Recompute the cross-lot summary for the current filters if its tab is shown."""
+        if self._notebook.select() != str(self._summary_frame):
+            return
+        state = (self._index.generation, tuple(self._current_filters().values()))
+        if state == self._summary_state:
+            return
+        self._summary_state = state
+
+        filters = self._current_filters()
+        resident = {
+            source_file: list(group)
+            for source_file, group in groupby(self._index.query(filters), key=attrgetter("source_file"))
+        }
+        paged_out = set(self.results.paged_out_sources())
+        engine = CrossLotStatistics()
+        # One paged-out workbook's matching rows at a time.
+        for source_file in self.results.sources():
+            if filters["source_file"] and filters["source_file"] != source_file:
+                continue
+            if source_file in paged_out:
+                records = self.results.paged_out_records({**filters, "source_file": source_file})
+            else:
+                records = resident.get(source_file, [])
+            if records:
+                engine.add(source_file, self.results.summary(source_file).workbook_meta, records)
+        self._summary_tree.delete(*self._summary_tree.get_children())
+        for stats in engine.compute():
+            self._summary_tree.insert(
                 "",
                 "end",
                 values=(
-                    rec.source_file,
-                    rec.sample_label or "",
-                    rec.sample_code or "",
-                    rec.unit or "",
-                    rec.analyte_name,
-                    rec.group_name or "",
-                    rec.metric_role,
-                    rec.raw_value or "",
-                    "" if rec.numeric_value is None else rec.numeric_value,
-                    rec.value_status,
-                    rec.sheet_row,
-                    rec.sheet_col,
+                    *stats.key,
+                    stats.lots,
+                    stats.count,
+                    *map(
+                        _format_stat,
+                        (
+                            stats.minimum,
+                            stats.maximum,
+                            stats.mean,
+                            stats.std,
+                            *stats.percentiles,
+                            stats.drift,
+                            stats.max_step,
+                        ),
+                    ),
                 ),
             )
-        self._log(f"Preview rows: {len(records)}")
-
-    def _filtered_measurements(self) -> list[MeasurementRecord]:
-        source_filter = self._filter_source.get().strip()
-        sample_filter = self._filter_sample.get().strip()
-        analyte_filter = self._filter_analyte.get().strip()
-        unit_filter = self._filter_unit.get().strip()
-        metric_filter = self._filter_metric.get().strip()
-
-        out: list[MeasurementRecord] = []
-        for result in self.results:
-            for rec in result.normalized_values:
-                if source_filter and rec.source_file != source_filter:
-                    continue
-                if sample_filter and (rec.sample_label or "") != sample_filter:
-                    continue
-                if analyte_filter and rec.analyte_name != analyte_filter:
-                    continue
-                if unit_filter and (rec.unit or "") != unit_filter:
-                    continue
-                if metric_filter and rec.metric_role != metric_filter:
-                    continue
-                out.append(rec)
-        return out
 
-    def _refresh_filter_values(self) -> None:
-        source_values = sorted({result.source_file for result in self.results})
-        sample_values = sorted(
-            {
-                rec.sample_label
-                for result in self.results
-                for rec in result.normalized_values
-                if rec.sample_label
-            }
-        )
-        analyte_values = sorted(
-            {rec.analyte_name for result in self.results for rec in result.normalized_values}
-        )
-        unit_values = sorted(
-            {rec.unit for result in self.results for rec in result.normalized_values if rec.unit}
-        )
-        metric_values = sorted(
-            {rec.metric_role for result in self.results for rec in result.normalized_values}
-        )
+    def _filter_variables(self) -> dict[str, tk.StringVar]:
+        return {
+            "source_file": self._filter_source,
+            "sample_label": self._filter_sample,
+            "analyte_name": self._filter_analyte,
+            "unit": self._filter_unit,
+            "metric_role": self._filter_metric,
+            TEXT_FILTER: self._filter_text,
+        }
+
+    def _current_filters(self) -> dict[str, str]:
+        return {name: variable.get().strip() for name, variable in self._filter_variables().items()}
+
+    def _query_records(
+        self,
+        filters: dict[str, str],
+        sort_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> tuple[list[MeasurementRecord], int]:
+        """Matching records of every loaded workbook, plus how many were left out.
+
+        Paged-out rows come from the result cache's store, at most ``limit`` of them.
+        """
+        records = self._index.query(filters, sort_by, descending)
+        if not self.results.paged_out_sources():
+            return records, 0
+        paged_out = self.results.paged_out_records(filters, sort_by, descending, limit)
+        merged = merge_queries(records, paged_out, sort_by, descending)
+        if limit is None or len(paged_out) < limit:
+            return merged, 0
+        # Paged-out rows not read would sort after the last one read: cut the view there.
+        last = paged_out[-1]
+        cut = next(pos for pos in range(len(merged) - 1, -1, -1) if merged[pos] is last) + 1
+        return merged[:cut], len(merged) - cut + self.results.paged_out_count(filters) - len(paged_out)
 
-        self._source_combo["values"] = ("", *source_values)
-        self._sample_combo["values"] = ("", *sample_values)
-        self._analyte_combo["values"] = ("", *analyte_values)
-        self._unit_combo["values"] = ("", *unit_values)
-        self._metric_combo["values"] = ("", *metric_values)
+    def _refresh_filter_values(self) -> None:
+        # Paged-out workbooks stay selectable; choosing one in the File filter reloads it.
+        self._source_combo["values"] = ("", *self.results.sources())
+        self._sample_combo["values"] = ("", *self._combo_values("sample_label"))
+        self._analyte_combo["values"] = ("", *self._combo_values("analyte_name"))
+        self._unit_combo["values"] = ("", *self._combo_values("unit"))
+        self._metric_combo["values"] = ("", *self._combo_values("metric_role"))
 
         if self._filter_source.get() not in self._source_combo["values"]:
             self._filter_source.set("")
@@ -352,15 +744,80 @@ class ExcelParserApp:
         if self._filter_metric.get() not in self._metric_combo["values"]:
             self._filter_metric.set("")
 
+    def _combo_values(self, field_name: str) -> list[str]:
+        return sorted({*self._index.values(field_name), *self.results.paged_out_values(field_name)})
+
+    def _task_busy(self, kind: str) -> bool:
+        if not self._tasks.is_running(kind):
+            return False
+        messagebox.showinfo(
+            "Busy", f"A {kind} task is already running. Cancel it or wait for it to finish."
+        )
+        return True
+
+    def _start_task(
+        self,
+        kind: str,
+        work: Callable[[TaskContext], Any],
+        on_done: Callable[[Any], None],
+        failure_title: str,
+        on_partial: Callable[[list[Any]], None] | None = None,
+        on_cancelled: Callable[[], None] | None = None,
+    ) -> None:
+        def succeeded(value: Any) -> None:
+            self._task_finished(f"{kind.capitalize()} finished")
+            on_done(value)
+
+        def failed(exc: BaseException) -> None:
+            self._task_finished(f"{kind.capitalize()} failed")
+            self._log(f"[ERROR] {failure_title}: {exc}")
+            messagebox.showerror(failure_title, str(exc))
+
+        def cancelled() -> None:
+            self._task_finished(f"{kind.capitalize()} cancelled")
+            if on_cancelled is not None:
+                on_cancelled()
+            else:
+                self._log(f"{kind.capitalize()} cancelled; no results were changed.")
+
+        started = self._tasks.submit(
+            kind,
+            work,
+            on_success=succeeded,
+            on_error=failed,
+            on_progress=self._on_task_progress,
+            on_cancelled=cancelled,
+            on_partial=on_partial,
+        )
+        if started:
+            self._cancel_button.configure(state="normal")
+            self._task_status.set(f"{kind.capitalize()} running...")
+
+    def _on_task_progress(self, progress: TaskProgress) -> None:
+        self._progress.configure(maximum=max(progress.total, 1), value=progress.done)
+        self._task_status.set(
+            f"{progress.kind.capitalize()}: {progress.done}/{progress.total} {progress.message}"
+        )
+
+    def _task_finished(self, status: str) -> None:
+        self._task_status.set(status)
+        if not self._tasks.is_running():
+            self._cancel_button.configure(state="disabled")
+            self._progress.configure(value=0)
+
+    def _on_close(self) -> None:
+        self._tasks.shutdown()
+        self._refresher.cancel()
+        self._log_sink.close()
+        self.results.close()
+        self.root.destroy()
+
     def _log_warnings(self, result: WorkbookParseResult) -> None:
         for warning in result.warnings:
             self._log(f"[WARN] {result.source_file}: {warning}")
 
     def _log(self, message: str) -> None:
-        self._log_text.configure(state="normal")
-        self._log_text.insert("end", message + "\n")
-        self._log_text.see("end")
-        self._log_text.configure(state="disabled")
+        self._log_sink.write(message)
 
     def _apply_window_icon(self) -> None:
         icon_path = _resource_path(Path("assets") / "favicon.ico")
@@ -380,6 +837,27 @@ class ExcelParserApp:
             pass
 
 
+def _preview_values(rec: MeasurementRecord) -> tuple[object, ...]:
+    return (
+        rec.source_file,
+        rec.sample_label or "",
+        rec.sample_code or "",
+        rec.unit or "",
+        rec.analyte_name,
+        rec.group_name or "",
+        rec.metric_role,
+        rec.raw_value or "",
+        "" if rec.numeric_value is None else rec.numeric_value,
+        rec.value_status,
+        rec.sheet_row,
+        rec.sheet_col,
+    )
+
+
+def _format_stat(value: float | None) -> str:
+    return "" if value is None else f"{value:.6g}"
+
+
 def _split_csv(raw: str) -> list[str]:
     return [item.strip() for item in raw.split(",") if item.strip()]
 
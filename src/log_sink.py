@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import os
+from collections import deque
+from collections.abc import Callable
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Protocol
+
+
+LOG_FILE_ENV = "LEAFLET_PARSER_LOG_FILE"
+
+
+class _Scheduler(Protocol):
+    def after_idle(self, func: Callable[[], object]) -> str: ...
+
+
+class _TextWidget(Protocol):
+    def configure(self, **kwargs: object) -> object: ...
+
+    def insert(self, index: str, chars: str) -> None: ...
+
+    def delete(self, index1: str, index2: str | None = None) -> None: ...
+
+    def see(self, index: str) -> None: ...
+
+
+class BufferedLogSink:
+    """Status log that batches widget writes to one update per event-loop tick.
+
+    Messages are queued by :meth:`write` and flushed together from an
+    ``after_idle`` callback, so a burst of thousands of warnings costs one
+    insert/scroll round trip. The widget and :attr:`lines` keep at most
+    ``max_lines`` lines. When ``log_path`` is given, every message is also
+    mirrored to a size-rotated log file.
+    """
+
+    def __init__(
+        self,
+        root: _Scheduler,
+        widget: _TextWidget,
+        max_lines: int = 5000,
+        log_path: Path | None = None,
+        max_bytes: int = 1_000_000,
+        backup_count: int = 3,
+    ) -> None:
+        self._root = root
+        self._widget = widget
+        self._max_lines = max_lines
+        self._pending: list[str] = []
+        self._flush_scheduled = False
+        self._widget_lines = 0
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self._file_logger = _rotating_logger(log_path, max_bytes, backup_count) if log_path else None
+
+    def write(self, message: str) -> None:
+        self._pending.append(message)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._root.after_idle(self.flush)
+
+    def flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        messages, self._pending = self._pending, []
+        self.lines.extend(messages)
+
+        if self._file_logger is not None:
+            for message in messages:
+                self._file_logger.info(message)
+
+        visible = messages[-self._max_lines :]
+        self._widget.configure(state="normal")
+        self._widget.insert("end", "\n".join(visible) + "\n")
+        self._widget_lines += len(visible)
+        excess = self._widget_lines - self._max_lines
+        if excess > 0:
+            self._widget.delete("1.0", f"{excess + 1}.0")
+            self._widget_lines = self._max_lines
+        self._widget.see("end")
+        self._widget.configure(state="disabled")
+
+    def close(self) -> None:
+        self.flush()
+        if self._file_logger is not None:
+            for handler in list(self._file_logger.handlers):
+                handler.close()
+                self._file_logger.removeHandler(handler)
+            self._file_logger = None
+
+
+def log_path_from_env() -> Path | None:
+    value = os.environ.get(LOG_FILE_ENV, "").strip()
+    return Path(value) if value else None
+
+
+def _rotating_logger(log_path: Path, max_bytes: int, backup_count: int) -> logging.Logger:
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    logger = logging.getLogger(f"{__name__}.{log_path.resolve()}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for stale in list(logger.handlers):
+        stale.close()
+        logger.removeHandler(stale)
+    handler = RotatingFileHandler(
+        log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger
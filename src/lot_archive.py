@@ -0,0 +1,548 @@
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from .models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from .stats import PERCENTILES, STAT_ROLES, CrossLotStatistics, SeriesStats
+from .wire import meta_from_json, meta_to_json
+
+
+ARCHIVE_VERSION = 1
+ARCHIVE_FILTER_FIELDS = (
+    "source_file",
+    "sample_label",
+    "sample_code",
+    "unit",
+    "analyte_name",
+    "group_name",
+    "metric_role",
+    "value_status",
+)
+
+_MANIFEST_NAME = "manifest.json"
+_SEGMENT_PREFIX = "seg-"
+_TEXT_COLUMNS = (
+    "sample_label",
+    "sample_code",
+    "unit",
+    "analyte_name",
+    "group_name",
+    "metric_role",
+    "raw_value",
+    "value_status",
+)
+_INT_COLUMNS = ("sheet_row", "sheet_col")
+_COLUMN_TYPES = {
+    **dict.fromkeys(_TEXT_COLUMNS, "I"),
+    **dict.fromkeys(_INT_COLUMNS, "I"),
+    "numeric_value": "d",
+}
+_STATS_COLUMNS = ("group_name", "analyte_name", "unit", "metric_role", "sample_label")
+_LENGTH = struct.Struct("<I")
+_ID = struct.Struct("=I")
+_MISSING = float("nan")
+
+
+@dataclass(slots=True, frozen=True)
+class ArchivedLot:
+    source_file: str
+    start: int
+    stop: int
+    workbook_meta: WorkbookMeta
+    warnings: tuple[str, ...] = ()
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+
+class LotArchive:
+    """Append-only on-disk archive of parsed lots, read through ``mmap``.
+
+    The archive is a directory holding ``manifest.json`` and one segment
+    directory. Every measurement field lives in its own fixed-width column
+    file (``<field>.col``: ``uint32`` ids or row/column numbers, ``float64``
+    numeric values with NaN for "no value"); text fields store ids into a
+    per-field string dictionary (``<field>.dict``, length-prefixed UTF-8,
+    id ``0`` is ``None``). The manifest lists each lot's row range, workbook
+    metadata and warnings, plus the committed row count and dictionary sizes.
+
+    Appends only ever extend the files and then atomically replace the
+    manifest, so a crash mid-append leaves the previous state readable; bytes
+    past the committed sizes are cut off on the next open. Re-appending a
+    source file supersedes its old lot, and :meth:`remove` drops one; their
+    rows stay on disk as dead rows until :meth:`compact` rewrites the live
+    lots into a fresh segment. Queries map only the columns they touch and
+    never build :class:`MeasurementRecord` objects unless asked to. Analytes
+    and raw cells are not archived. Column files use the host byte order; the
+    archive is meant for a single writer.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._maps: dict[str, tuple[mmap.mmap, memoryview]] = {}
+        self._load()
+
+    def __enter__(self) -> LotArchive:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._unmap()
+
+    def __len__(self) -> int:
+        return self._rows - self._dead_rows
+
+    @property
+    def dead_rows(self) -> int:
+        return self._dead_rows
+
+    def lots(self) -> list[ArchivedLot]:
+        """Live lots in the order they were appended."""
+        return list(self._lots.values())
+
+    def lot(self, source_file: str) -> ArchivedLot | None:
+        return self._lots.get(source_file)
+
+    def append(self, results: Iterable[WorkbookParseResult]) -> None:
+        """Append ``results`` as new lots, superseding lots with the same source file."""
+        self._unmap()
+        segment = self.path / self._segment
+        segment.mkdir(exist_ok=True)
+        columns = {name: open(segment / f"{name}.col", "ab") for name in _COLUMN_TYPES}
+        dictionaries = {name: open(segment / f"{name}.dict", "ab") for name in _TEXT_COLUMNS}
+        try:
+            for result in results:
+                records = result.normalized_values
+                for name in _TEXT_COLUMNS:
+                    intern = self._interner(name, dictionaries[name])
+                    ids = array("I", [intern(getattr(rec, name)) for rec in records])
+                    columns[name].write(ids.tobytes())
+                for name in _INT_COLUMNS:
+                    columns[name].write(array("I", [getattr(rec, name) for rec in records]).tobytes())
+                numeric = [rec.numeric_value for rec in records]
+                columns["numeric_value"].write(
+                    array("d", [_MISSING if value is None else value for value in numeric]).tobytes()
+                )
+                start = self._rows
+                self._rows += len(records)
+                superseded = self._lots.pop(result.source_file, None)
+                if superseded is not None:
+                    self._dead_rows += len(superseded)
+                self._lots[result.source_file] = ArchivedLot(
+                    source_file=result.source_file,
+                    start=start,
+                    stop=self._rows,
+                    workbook_meta=result.workbook_meta,
+                    warnings=tuple(result.warnings),
+                )
+            for handle in (*columns.values(), *dictionaries.values()):
+                handle.flush()
+                os.fsync(handle.fileno())
+        except BaseException:
+            for handle in (*columns.values(), *dictionaries.values()):
+                handle.close()
+            self._load()
+            raise
+        for handle in (*columns.values(), *dictionaries.values()):
+            handle.close()
+        self._write_manifest()
+
+    def remove(self, source_file: str) -> bool:
+        lot = self._lots.pop(source_file, None)
+        if lot is None:
+            return False
+        self._dead_rows += len(lot)
+        self._write_manifest()
+        return True
+
+    def compact(self) -> None:
+        """Rewrite the live lots into a new segment, dropping dead rows and unused strings."""
+        old_segment = self.path / self._segment
+        new_name = _segment_name(int(self._segment[len(_SEGMENT_PREFIX) :]) + 1)
+        new_segment = self.path / new_name
+        shutil.rmtree(new_segment, ignore_errors=True)
+        new_segment.mkdir()
+
+        lots: dict[str, ArchivedLot] = {}
+        position = 0
+        for lot in self._lots.values():
+            lots[lot.source_file] = ArchivedLot(
+                lot.source_file, position, position + len(lot), lot.workbook_meta, lot.warnings
+            )
+            position += len(lot)
+        dictionary_sizes: dict[str, list[int]] = {}
+
+        for name, typecode in _COLUMN_TYPES.items():
+            view = self._column(name)
+            with open(new_segment / f"{name}.col", "wb") as out:
+                if name in _TEXT_COLUMNS:
+                    strings = self._strings(name)
+                    remap = array("I", [0]) * len(strings)
+                    kept: list[str | None] = [None]
+                    for lot in self._lots.values():
+                        chunk = array("I")
+                        chunk.frombytes(view[lot.start : lot.stop].tobytes())
+                        for idx, value_id in enumerate(chunk):
+                            new_id = remap[value_id]
+                            if not new_id and value_id:
+                                new_id = remap[value_id] = len(kept)
+                                kept.append(strings[value_id])
+                            chunk[idx] = new_id
+                        out.write(chunk.tobytes())
+                    blob = _encode_strings(kept[1:])
+                    (new_segment / f"{name}.dict").write_bytes(blob)
+                    dictionary_sizes[name] = [len(kept), len(blob)]
+                else:
+                    itemsize = array(typecode).itemsize
+                    with view.cast("B") as raw:
+                        for lot in self._lots.values():
+                            out.write(raw[lot.start * itemsize : lot.stop * itemsize])
+                out.flush()
+                os.fsync(out.fileno())
+
+        self._unmap()
+        self._segment = new_name
+        self._lots = lots
+        self._rows = position
+        self._dead_rows = 0
+        self._dictionary_sizes = dictionary_sizes
+        self._reset_strings()
+        self._write_manifest()
+        shutil.rmtree(old_segment, ignore_errors=True)
+
+    def rows(self, filters: dict[str, str] | None = None) -> array:
+        """Row ids of live records matching every non-empty filter, in lot order."""
+        lots, conditions = self._resolve(filters or {})
+        out = array("I")
+        for lot in lots:
+            out.extend(self._lot_rows(lot, conditions))
+        return out
+
+    def count(self, filters: dict[str, str] | None = None) -> int:
+        lots, conditions = self._resolve(filters or {})
+        if not conditions:
+            return sum(len(lot) for lot in lots)
+        return sum(sum(1 for _ in self._lot_rows(lot, conditions)) for lot in lots)
+
+    def values(self, field_name: str) -> list[str]:
+        """Sorted distinct non-empty values of ``field_name`` across live records."""
+        if field_name == "source_file":
+            return sorted(self._lots)
+        _check_filter_field(field_name)
+        view = self._column(field_name)
+        used: set[int] = set()
+        for lot in self._lots.values():
+            used.update(view[lot.start : lot.stop])
+        strings = self._strings(field_name)
+        return sorted(value for value in map(strings.__getitem__, used) if value)
+
+    def numeric_values(self, filters: dict[str, str] | None = None) -> array:
+        """``numeric_value`` of the matching rows (NaN where the record has none)."""
+        view = self._column("numeric_value")
+        return array("d", map(view.__getitem__, self.rows(filters)))
+
+    def records(self, filters: dict[str, str] | None = None) -> list[MeasurementRecord]:
+        lots, conditions = self._resolve(filters or {})
+        out: list[MeasurementRecord] = []
+        for lot in lots:
+            out.extend(self._materialize(lot, self._lot_rows(lot, conditions)))
+        return out
+
+    def result(self, source_file: str) -> WorkbookParseResult:
+        lot = self._lots.get(source_file)
+        if lot is None:
+            raise KeyError(source_file)
+        return WorkbookParseResult(
+            source_file=source_file,
+            workbook_meta=lot.workbook_meta,
+            normalized_values=self._materialize(lot, range(lot.start, lot.stop)),
+            warnings=list(lot.warnings),
+        )
+
+    def statistics(
+        self,
+        filters: dict[str, str] | None = None,
+        roles: Iterable[str] = STAT_ROLES,
+        percentiles: Iterable[float] = PERCENTILES,
+    ) -> list[SeriesStats]:
+        """Cross-lot statistics computed straight from the key and value columns."""
+        engine = CrossLotStatistics(roles)
+        lots, conditions = self._resolve(filters or {})
+        key_views = [self._column(name) for name in _STATS_COLUMNS]
+        key_strings = [self._strings(name) for name in _STATS_COLUMNS]
+        numeric = self._column("numeric_value")
+        keys: dict[tuple[int, ...], tuple[str, ...]] = {}
+
+        def series_key(row: int) -> tuple[str, ...]:
+            ids = tuple(view[row] for view in key_views)
+            key = keys.get(ids)
+            if key is None:
+                key = keys[ids] = tuple(strings[i] or "" for strings, i in zip(key_strings, ids))
+            return key
+
+        for lot in lots:
+            engine.add_values(
+                lot.source_file,
+                lot.workbook_meta,
+                (
+                    (series_key(row), numeric[row])
+                    for row in self._lot_rows(lot, conditions)
+                    if not math.isnan(numeric[row])
+                ),
+            )
+        return engine.compute(percentiles)
+
+    def _resolve(self, filters: dict[str, str]) -> tuple[list[ArchivedLot], list[tuple[str, int]]]:
+        active = {name: value for name, value in filters.items() if value}
+        source_file = active.pop("source_file", None)
+        if source_file is not None:
+            lot = self._lots.get(source_file)
+            lots = [] if lot is None else [lot]
+        else:
+            lots = list(self._lots.values())
+        conditions: list[tuple[str, int]] = []
+        for name, value in active.items():
+            _check_filter_field(name)
+            value_id = self._string_ids(name).get(value)
+            if value_id is None:
+                return [], []
+            conditions.append((name, value_id))
+        return lots, conditions
+
+    def _lot_rows(self, lot: ArchivedLot, conditions: list[tuple[str, int]]) -> Iterator[int]:
+        if not conditions:
+            yield from range(lot.start, lot.stop)
+            return
+        (first_name, first_id), rest = conditions[0], conditions[1:]
+        checks = [(self._column(name), value_id) for name, value_id in rest]
+        for row in _find_id(self._buffer(first_name), first_id, lot.start, lot.stop):
+            if all(view[row] == value_id for view, value_id in checks):
+                yield row
+
+    def _materialize(self, lot: ArchivedLot, rows: Iterable[int]) -> list[MeasurementRecord]:
+        text = [(self._column(name), self._strings(name)) for name in _TEXT_COLUMNS]
+        sheet_rows, sheet_cols = self._column("sheet_row"), self._column("sheet_col")
+        numeric = self._column("numeric_value")
+        out: list[MeasurementRecord] = []
+        for row in rows:
+            sample_label, sample_code, unit, analyte, group, role, raw, status = (
+                strings[view[row]] for view, strings in text
+            )
+            value = numeric[row]
+            out.append(
+                MeasurementRecord(
+                    source_file=lot.source_file,
+                    sample_label=sample_label,
+                    sample_code=sample_code,
+                    unit=unit,
+                    analyte_name=analyte,
+                    group_name=group,
+                    metric_role=role,
+                    raw_value=raw,
+                    numeric_value=None if math.isnan(value) else value,
+                    value_status=status,
+                    sheet_row=sheet_rows[row],
+                    sheet_col=sheet_cols[row],
+                )
+            )
+        return out
+
+    def _column(self, name: str) -> memoryview:
+        return self._map(name)[1]
+
+    def _buffer(self, name: str) -> mmap.mmap:
+        return self._map(name)[0]
+
+    def _map(self, name: str) -> tuple[mmap.mmap, memoryview]:
+        mapped = self._maps.get(name)
+        if mapped is not None:
+            return mapped
+        typecode = _COLUMN_TYPES[name]
+        size = self._rows * array(typecode).itemsize
+        if size:
+            with open(self.path / self._segment / f"{name}.col", "rb") as handle:
+                buffer = mmap.mmap(handle.fileno(), size, access=mmap.ACCESS_READ)
+            mapped = (buffer, memoryview(buffer).cast(typecode))
+        else:
+            # mmap cannot map an empty file; an empty view reads the same.
+            buffer = mmap.mmap(-1, 1)
+            mapped = (buffer, memoryview(buffer)[:0].cast(typecode))
+        self._maps[name] = mapped
+        return mapped
+
+    def _unmap(self) -> None:
+        for buffer, view in self._maps.values():
+            view.release()
+            buffer.close()
+        self._maps.clear()
+
+    def _strings(self, name: str) -> list[str | None]:
+        strings = self._string_lists.get(name)
+        if strings is None:
+            count, size = self._dictionary_sizes.get(name, (1, 0))
+            strings = [None]
+            path = self.path / self._segment / f"{name}.dict"
+            if size:
+                with open(path, "rb") as handle:
+                    blob = handle.read(size)
+                position = 0
+                while position < size:
+                    (length,) = _LENGTH.unpack_from(blob, position)
+                    position += _LENGTH.size
+                    strings.append(blob[position : position + length].decode("utf-8"))
+                    position += length
+            if len(strings) != count:
+                raise ValueError(f"Corrupt lot archive dictionary: {path}")
+            self._string_lists[name] = strings
+        return strings
+
+    def _string_ids(self, name: str) -> dict[str, int]:
+        ids = self._string_id_maps.get(name)
+        if ids is None:
+            ids = self._string_id_maps[name] = {
+                value: value_id for value_id, value in enumerate(self._strings(name)) if value_id
+            }
+        return ids
+
+    def _interner(self, name: str, out: BinaryIO) -> Callable[[str | None], int]:
+        strings = self._strings(name)
+        ids = self._string_ids(name)
+        sizes = self._dictionary_sizes.setdefault(name, [1, 0])
+
+        def intern(value: str | None) -> int:
+            if value is None:
+                return 0
+            value_id = ids.get(value)
+            if value_id is None:
+                value_id = ids[value] = len(strings)
+                strings.append(value)
+                encoded = _encode_strings([value])
+                out.write(encoded)
+                sizes[0] += 1
+                sizes[1] += len(encoded)
+            return value_id
+
+        return intern
+
+    def _reset_strings(self) -> None:
+        self._string_lists: dict[str, list[str | None]] = {}
+        self._string_id_maps: dict[str, dict[str, int]] = {}
+
+    def _load(self) -> None:
+        self._unmap()
+        self._reset_strings()
+        manifest_path = self.path / _MANIFEST_NAME
+        if not manifest_path.exists():
+            self._segment = _segment_name(1)
+            self._rows = 0
+            self._dead_rows = 0
+            self._dictionary_sizes: dict[str, list[int]] = {}
+            self._lots: dict[str, ArchivedLot] = {}
+            return
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"Corrupt lot archive manifest: {manifest_path}") from exc
+        if manifest.get("version") != ARCHIVE_VERSION:
+            version = manifest.get("version")
+            raise ValueError(f"Unsupported lot archive version {version}: {manifest_path}")
+        self._segment = manifest["segment"]
+        self._rows = int(manifest["rows"])
+        self._dead_rows = int(manifest["dead_rows"])
+        self._dictionary_sizes = {name: list(sizes) for name, sizes in manifest["dictionaries"].items()}
+        self._lots = {
+            item["source_file"]: ArchivedLot(
+                source_file=item["source_file"],
+                start=item["start"],
+                stop=item["stop"],
+                workbook_meta=meta_from_json(item["workbook_meta"]),
+                warnings=tuple(item["warnings"]),
+            )
+            for item in manifest["lots"]
+        }
+        self._truncate_uncommitted()
+
+    def _truncate_uncommitted(self) -> None:
+        segment = self.path / self._segment
+        for name, typecode in _COLUMN_TYPES.items():
+            _truncate(segment / f"{name}.col", self._rows * array(typecode).itemsize)
+        for name in _TEXT_COLUMNS:
+            _truncate(segment / f"{name}.dict", self._dictionary_sizes.get(name, (1, 0))[1])
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": ARCHIVE_VERSION,
+            "segment": self._segment,
+            "rows": self._rows,
+            "dead_rows": self._dead_rows,
+            "dictionaries": self._dictionary_sizes,
+            "lots": [
+                {
+                    "source_file": lot.source_file,
+                    "start": lot.start,
+                    "stop": lot.stop,
+                    "workbook_meta": meta_to_json(lot.workbook_meta),
+                    "warnings": list(lot.warnings),
+                }
+                for lot in self._lots.values()
+            ],
+        }
+        path = self.path / _MANIFEST_NAME
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, ensure_ascii=False)
+            handle.flush()
+            os.fsync(handle.fileno())
+        tmp_path.replace(path)
+
+
+def _find_id(buffer: mmap.mmap, value_id: int, start: int, stop: int) -> Iterator[int]:
+    """Rows in ``[start, stop)`` of a ``uint32`` column holding ``value_id``, found by byte search."""
+    needle = _ID.pack(value_id)
+    position, end = start * _ID.size, stop * _ID.size
+    while True:
+        hit = buffer.find(needle, position, end)
+        if hit < 0:
+            return
+        if hit % _ID.size:
+            position = hit + 1
+            continue
+        yield hit // _ID.size
+        position = hit + _ID.size
+
+
+def _encode_strings(values: Iterable[str]) -> bytes:
+    parts: list[bytes] = []
+    for value in values:
+        encoded = value.encode("utf-8")
+        parts.append(_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def _truncate(path: Path, size: int) -> None:
+    if path.exists() and path.stat().st_size > size:
+        with open(path, "r+b") as handle:
+            handle.truncate(size)
+
+
+def _segment_name(number: int) -> str:
+    return f"{_SEGMENT_PREFIX}{number:06d}"
+
+
+def _check_filter_field(field_name: str) -> None:
+    if field_name not in ARCHIVE_FILTER_FIELDS:
+        raise ValueError(f"Cannot filter archived lots by unknown field: {field_name}")
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TypeVar
+
+from .config import XmlConfig
+from .models import WorkbookParseResult
+from .parser import list_workbooks, parse_workbook
+from .xml_exporter import build_consolidated_addon_xml
+
+
+DEFAULT_BASELINE_PATH = Path("config/memory_baseline.json")
+DEFAULT_TOLERANCE = 0.25
+
+_T = TypeVar("_T")
+_RSS_SAMPLE_SECONDS = 0.005
+_IGNORED_SITES = (tracemalloc.__file__, threading.__file__, "<frozen importlib._bootstrap")
+
+
+@dataclass(slots=True)
+class PhaseStats:
+    name: str
+    peak_bytes: int = 0
+    retained_bytes: int = 0
+    rss_peak_bytes: int | None = None
+    top_sites: list[tuple[str, int]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MemoryReport:
+    corpus: str
+    workbooks: int
+    records: int
+    phases: dict[str, PhaseStats] = field(default_factory=dict)
+
+    def metrics(self) -> dict[str, float]:
+        """Scale-independent numbers that regression thresholds are kept for."""
+        records = max(self.records, 1)
+        parse = self.phases["parse"]
+        export = self.phases["export"]
+        return {
+            "parse_peak_bytes_per_workbook": parse.peak_bytes,
+            "bytes_per_record": parse.retained_bytes / records,
+            "export_peak_bytes_per_record": export.peak_bytes / records,
+        }
+
+
+def profile_phase(name: str, work: Callable[[], _T], top: int = 10) -> tuple[_T, PhaseStats]:
+    """Run ``work`` under tracemalloc and RSS sampling; the result stays alive for ``retained_bytes``."""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start()
+    sampler = _RssSampler()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        sampler.start()
+        try:
+            result = work()
+        finally:
+            sampler.stop()
+        peak = tracemalloc.get_traced_memory()[1]
+        # Workbooks released by the parser still sit in reference cycles.
+        gc.collect()
+        current = tracemalloc.get_traced_memory()[0]
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    stats = PhaseStats(
+        name=name,
+        peak_bytes=max(peak - baseline_bytes, 0),
+        retained_bytes=max(current - baseline_bytes, 0),
+        rss_peak_bytes=sampler.peak,
+        top_sites=_top_sites(before, after, top),
+    )
+    return result, stats
+
+
+def profile_corpus(corpus: str, paths: Sequence[Path], cfg: XmlConfig | None = None, top: int = 10) -> MemoryReport:
+    """Profile parsing ``paths`` and exporting the results as one consolidated XML."""
+    cfg = cfg or XmlConfig()
+    per_workbook_peak = 0
+
+    def parse_all() -> list[WorkbookParseResult]:
+        nonlocal per_workbook_peak
+        results = []
+        for path in paths:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            results.append(parse_workbook(path))
+            per_workbook_peak = max(per_workbook_peak, tracemalloc.get_traced_memory()[1] - before)
+        return results
+
+    tracemalloc.start()
+    try:
+        results, parse_stats = profile_phase("parse", parse_all, top)
+        # Peaks are reset per workbook, so the phase peak is the largest single parse.
+        parse_stats.peak_bytes = per_workbook_peak
+        _, export_stats = profile_phase("export", lambda: build_consolidated_addon_xml(results, cfg), top)
+    finally:
+        tracemalloc.stop()
+
+    return MemoryReport(
+        corpus=corpus,
+        workbooks=len(results),
+        records=sum(len(result.normalized_values) for result in results),
+        phases={"parse": parse_stats, "export": export_stats},
+    )
+
+
+def load_baseline(path: Path = DEFAULT_BASELINE_PATH) -> tuple[dict[str, float], float]:
+    """Return the stored thresholds and tolerance; no thresholds when the file is missing."""
+    if not path.exists():
+        return {}, DEFAULT_TOLERANCE
+    data = json.loads(path.read_text(encoding="utf-8"))
+    thresholds = {str(key): float(value) for key, value in data.get("thresholds", {}).items()}
+    return thresholds, float(data.get("tolerance", DEFAULT_TOLERANCE))
+
+
+def save_baseline(reports: Sequence[MemoryReport], path: Path = DEFAULT_BASELINE_PATH) -> dict[str, float]:
+    """Store the worst value of every metric across ``reports`` as the new thresholds."""
+    thresholds: dict[str, float] = {}
+    for report in reports:
+        for key, value in report.metrics().items():
+            thresholds[key] = round(max(thresholds.get(key, 0.0), value), 1)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({"tolerance": DEFAULT_TOLERANCE, "thresholds": thresholds}, indent=2) + "\n",
+        encoding="utf-8",
+    )
+    return thresholds
+
+
+def check_regressions(
+    reports: Sequence[MemoryReport], thresholds: dict[str, float], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    failures: list[str] = []
+    for report in reports:
+        for key, value in report.metrics().items():
+            limit = thresholds.get(key)
+            if limit is not None and value > limit * (1 + tolerance):
+                failures.append(f"{report.corpus}: {key} = {value:,.0f} exceeds baseline {limit:,.0f}")
+    return failures
+
+
+def format_report(report: MemoryReport) -> str:
+    lines = [f"== {report.corpus}: {report.workbooks} workbooks, {report.records} records"]
+    for phase in report.phases.values():
+        rss = "n/a" if phase.rss_peak_bytes is None else _mib(phase.rss_peak_bytes)
+        lines.append(
+            f"  {phase.name:<7} peak {_mib(phase.peak_bytes)}  retained {_mib(phase.retained_bytes)}  rss peak {rss}"
+        )
+        for site, size in phase.top_sites:
+            lines.append(f"      {size:>12,} B  {site}")
+    for key, value in report.metrics().items():
+        lines.append(f"  {key}: {value:,.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.memprofile",
+        description="Measure parser and exporter memory on folders of leaflets.",
+    )
+    parser.add_argument(
+        "folders", nargs="*", type=Path, default=[Path(".")], help="folders with .xlsx leaflets, one corpus each"
+    )
+    parser.add_argument("--top", type=int, default=10, help="allocation sites listed per phase")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="also write the reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    reports: list[MemoryReport] = []
+    for folder in args.folders:
+        leaflets = list_workbooks(folder)
+        if not leaflets:
+            print(f"[WARN] No leaflets in {folder}", file=sys.stderr)
+            continue
+        reports.append(profile_corpus(f"leaflets in {folder}", leaflets, top=args.top))
+
+    for report in reports:
+        print(format_report(report))
+    if args.json:
+        args.json.write_text(json.dumps([asdict(report) for report in reports], indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        save_baseline(reports, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    thresholds, tolerance = load_baseline(args.baseline)
+    failures = check_regressions(reports, thresholds, tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+class _RssSampler:
+    """Polls the process resident set size on a background thread."""
+
+    def __init__(self) -> None:
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        if self.peak is not None:
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._sample()
+
+    def _run(self) -> None:
+        while not self._stop.wait(_RSS_SAMPLE_SECONDS):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss = _current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+def _current_rss() -> int | None:
+    """Current resident set size, or the process peak where only that is available."""
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        return _peak_working_set()
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_working_set() -> int | None:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    try:
+        kernel32 = ctypes.WinDLL("kernel32")
+        psapi = ctypes.WinDLL("psapi")
+    except OSError:
+        return None
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+    psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def _top_sites(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top: int) -> list[tuple[str, int]]:
+    filters = [tracemalloc.Filter(False, pattern) for pattern in _IGNORED_SITES]
+    diffs = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    sites = []
+    for stat in diffs[:top]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        sites.append((f"{frame.filename}:{frame.lineno}", stat.size_diff))
+    return sites
+
+
+def _mib(size: int) -> str:
+    return f"{size / (1024 * 1024):8.2f} MiB"
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+
+METRICS_FILE_ENV = "LEAFLET_PARSER_METRICS_FILE"
+METRIC_PREFIX = "leaflet_parser_"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Help texts for the Prometheus exposition; unknown metrics are exported without one.
+METRIC_HELP = {
+    "workbooks_parsed_total": "Workbooks parsed successfully.",
+    "workbooks_failed_total": "Workbooks whose parsing raised an error.",
+    "cells_read_total": "Non-empty cells captured from parsed workbooks.",
+    "records_emitted_total": "Normalized measurement records emitted by the parser.",
+    "warnings_total": "Parse warnings by type.",
+    "parse_seconds": "Time to parse one workbook.",
+    "folder_parse_seconds": "Time to parse a folder or ZIP bundle.",
+    "exports_total": "Consolidated XML exports written (a sharded export counts once).",
+    "export_bytes_written_total": "Bytes of consolidated XML written.",
+    "export_seconds": "Time to render, validate and write one consolidated XML.",
+}
+
+_LabelKey = tuple[tuple[str, str], ...]
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+class MetricsRegistry:
+    """Process-wide counters and duration histograms.
+
+    While ``enabled`` is false, :meth:`inc` and :meth:`observe` return
+    immediately, and callers skip any work done only for metrics. Metric names
+    are given without :data:`METRIC_PREFIX`; labels are keyword arguments.
+    :meth:`snapshot` returns a JSON-ready dict that :meth:`merge` can fold back
+    in, which is how worker processes report to the parent.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[_LabelKey, float]] = {}
+        self._histograms: dict[str, dict[_LabelKey, list[float]]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Add ``value`` (seconds) to the histogram ``name`` with :data:`DURATION_BUCKETS`."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket counts, then the +Inf bucket, then the sum.
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0.0] * (len(DURATION_BUCKETS) + 2)
+            state[bisect_left(DURATION_BUCKETS, value)] += 1
+            state[-1] += value
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict[str, object]:
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "buckets": list(zip([*DURATION_BUCKETS, "+Inf"], _cumulative(state[:-1]))),
+                        "count": sum(state[:-1]),
+                        "sum": state[-1],
+                    }
+                    for key, state in sorted(series.items())
+                ]
+                for name, series in sorted(self._histograms.items())
+            }
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def merge(self, snapshot: dict[str, object]) -> None:
+        """Add the counts of a :meth:`snapshot` (for example from a worker process)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, series in snapshot.get("counters", {}).items():
+                target = self._counters.setdefault(name, {})
+                for item in series:
+                    key = tuple(sorted(item["labels"].items()))
+                    target[key] = target.get(key, 0) + item["value"]
+            for name, series in snapshot.get("histograms", {}).items():
+                target = self._histograms.setdefault(name, {})
+                for item in series:
+                    key = tuple(sorted(item["labels"].items()))
+                    state = target.get(key)
+                    if state is None:
+                        state = target[key] = [0.0] * (len(DURATION_BUCKETS) + 2)
+                    previous = 0
+                    for idx, (_, cumulative) in enumerate(item["buckets"]):
+                        state[idx] += cumulative - previous
+                        previous = cumulative
+                    state[-1] += item["sum"]
+
+    def to_prometheus(self) -> str:
+        """The snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines: list[str] = []
+        for name, series in snapshot["counters"].items():
+            full_name = METRIC_PREFIX + name
+            lines.extend(_header(full_name, name, "counter"))
+            for item in series:
+                lines.append(f"{full_name}{_labels(item['labels'])} {_number(item['value'])}")
+        for name, series in snapshot["histograms"].items():
+            full_name = METRIC_PREFIX + name
+            lines.extend(_header(full_name, name, "histogram"))
+            for item in series:
+                for bound, cumulative in item["buckets"]:
+                    labels = {**item["labels"], "le": bound if isinstance(bound, str) else _number(bound)}
+                    lines.append(f"{full_name}_bucket{_labels(labels)} {_number(cumulative)}")
+                lines.append(f"{full_name}_sum{_labels(item['labels'])} {_number(item['sum'])}")
+                lines.append(f"{full_name}_count{_labels(item['labels'])} {_number(item['count'])}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: Path) -> Path:
+        """Atomically write a snapshot: Prometheus text for ``.prom`` files, JSON otherwise.
+
+        The file is replaced in one step, so a textfile collector never reads a
+        partial snapshot.
+        """
+        if path.suffix == ".prom":
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(content)
+            # mkstemp creates the file owner-only; collectors often run as another user.
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return path
+
+
+def metrics_path_from_env() -> Path | None:
+    value = os.environ.get(METRICS_FILE_ENV, "").strip()
+    return Path(value) if value else None
+
+
+def write_metrics_from_env() -> Path | None:
+    """Write the :data:`METRICS` snapshot to ``LEAFLET_PARSER_METRICS_FILE`` when it is set."""
+    path = metrics_path_from_env()
+    if path is None or not METRICS.enabled:
+        return None
+    return METRICS.write_snapshot(path)
+
+
+def warning_type(message: str) -> str:
+    """Stable label for a parse warning: its text, lowercased, with punctuation collapsed to ``_``."""
+    return _NON_WORD.sub("_", message.lower()).strip("_")[:64] or "other"
+
+
+def _cumulative(counts: list[float]) -> list[float]:
+    out: list[float] = []
+    total = 0.0
+    for count in counts:
+        total += count
+        out.append(total)
+    return out
+
+
+def _header(full_name: str, name: str, kind: str) -> list[str]:
+    lines = []
+    if name in METRIC_HELP:
+        lines.append(f"# HELP {full_name} {METRIC_HELP[name]}")
+    lines.append(f"# TYPE {full_name} {kind}")
+    return lines
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and not math.isinf(value):
+        return str(int(value))
+    return repr(value)
+
+
+METRICS = MetricsRegistry(enabled=metrics_path_from_env() is not None)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from array import array
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
 from datetime import date
 from typing import Literal
@@ -52,12 +54,177 @@ class RawCellRecord:
     python_type: str | None
 
 
+class RawCellGrid:
+    """Sparse per-workbook grid of captured raw cells.
+
+    Cells are stored column-wise (sheet index, row, column, value id, type id)
+    with values and type names interned in one string table, where id ``0``
+    stands for ``None``. Iterating yields :class:`RawCellRecord` objects for
+    compatibility; :meth:`get` is an O(1) lookup by (sheet, row, column).
+    """
+
+    __slots__ = (
+        "sheet_names",
+        "_sheet_ids",
+        "_sheets",
+        "_rows",
+        "_cols",
+        "_values",
+        "_types",
+        "_strings",
+        "_string_ids",
+        "_lookup",
+    )
+
+    def __init__(self) -> None:
+        self.sheet_names: list[str] = []
+        self._sheet_ids: dict[str, int] = {}
+        self._sheets = array("H")
+        self._rows = array("I")
+        self._cols = array("I")
+        self._values = array("I")
+        self._types = array("I")
+        self._strings: list[str | None] = [None]
+        self._string_ids: dict[str, int] | None = {}
+        self._lookup: list[dict[int, int]] | None = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[RawCellRecord]) -> RawCellGrid:
+        grid = cls()
+        for rec in records:
+            grid.add(rec.sheet_name, rec.row_idx, rec.col_idx, rec.raw_value, rec.python_type)
+        return grid
+
+    @classmethod
+    def from_columns(
+        cls,
+        sheet_names: list[str],
+        sheets: array,
+        rows: array,
+        cols: array,
+        values: array,
+        types: array,
+        strings: list[str | None],
+    ) -> RawCellGrid:
+        """Adopt prebuilt columns; ``values``/``types`` index into ``strings``."""
+        grid = cls()
+        grid.sheet_names = list(sheet_names)
+        grid._sheet_ids = {name: idx for idx, name in enumerate(grid.sheet_names)}
+        grid._sheets = sheets
+        grid._rows = rows
+        grid._cols = cols
+        grid._values = values
+        grid._types = types
+        grid._strings = strings
+        grid._string_ids = None
+        return grid
+
+    def columns(self) -> tuple[list[str], array, array, array, array, array, list[str | None]]:
+        return (
+            self.sheet_names,
+            self._sheets,
+            self._rows,
+            self._cols,
+            self._values,
+            self._types,
+            self._strings,
+        )
+
+    def add(
+        self,
+        sheet_name: str,
+        row_idx: int,
+        col_idx: int,
+        raw_value: str | None,
+        python_type: str | None,
+    ) -> None:
+        sheet_id = self._sheet_ids.get(sheet_name)
+        if sheet_id is None:
+            sheet_id = self._sheet_ids[sheet_name] = len(self.sheet_names)
+            self.sheet_names.append(sheet_name)
+            if self._lookup is not None:
+                self._lookup.append({})
+        if self._lookup is not None:
+            self._lookup[sheet_id][_cell_key(row_idx, col_idx)] = len(self._rows)
+        self._sheets.append(sheet_id)
+        self._rows.append(row_idx)
+        self._cols.append(col_idx)
+        self._values.append(self._intern(raw_value))
+        self._types.append(self._intern(python_type))
+
+    def get(self, sheet_name: str, row_idx: int, col_idx: int) -> RawCellRecord | None:
+        sheet_id = self._sheet_ids.get(sheet_name)
+        if sheet_id is None:
+            return None
+        pos = self._cell_lookup()[sheet_id].get(_cell_key(row_idx, col_idx))
+        if pos is None:
+            return None
+        return self._record(pos)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[RawCellRecord]:
+        for pos in range(len(self._rows)):
+            yield self._record(pos)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (RawCellGrid, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RawCellGrid(cells={len(self)}, sheets={self.sheet_names!r})"
+
+    def _record(self, pos: int) -> RawCellRecord:
+        strings = self._strings
+        return RawCellRecord(
+            sheet_name=self.sheet_names[self._sheets[pos]],
+            row_idx=self._rows[pos],
+            col_idx=self._cols[pos],
+            raw_value=strings[self._values[pos]],
+            python_type=strings[self._types[pos]],
+        )
+
+    def _intern(self, value: str | None) -> int:
+        if value is None:
+            return 0
+        if self._string_ids is None:
+            # Adopted tables may be shared with other grids; extend a private copy.
+            self._strings = list(self._strings)
+            self._string_ids = {}
+            for string_id, text in enumerate(self._strings):
+                if text is not None:
+                    self._string_ids.setdefault(text, string_id)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def _cell_lookup(self) -> list[dict[int, int]]:
+        if self._lookup is None:
+            lookup: list[dict[int, int]] = [{} for _ in self.sheet_names]
+            for pos, (sheet_id, row_idx, col_idx) in enumerate(zip(self._sheets, self._rows, self._cols)):
+                lookup[sheet_id][_cell_key(row_idx, col_idx)] = pos
+            self._lookup = lookup
+        return self._lookup
+
+
+def _cell_key(row_idx: int, col_idx: int) -> int:
+    return (row_idx << 20) | col_idx
+
+
 @dataclass(slots=True)
 class WorkbookParseResult:
     source_file: str
     workbook_meta: WorkbookMeta
     analytes: list[AnalyteDef] = field(default_factory=list)
     normalized_values: list[MeasurementRecord] = field(default_factory=list)
-    raw_cells: list[RawCellRecord] = field(default_factory=list)
+    raw_cells: RawCellGrid = field(default_factory=RawCellGrid)
     warnings: list[str] = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        if not isinstance(self.raw_cells, RawCellGrid):
+            self.raw_cells = RawCellGrid.from_records(self.raw_cells)
+
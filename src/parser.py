@@ -1,21 +1,38 @@
 from __future__ import annotations
 
+import fnmatch
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import date, datetime
 from pathlib import Path
+from typing import BinaryIO
 
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
 from openpyxl.worksheet.worksheet import Worksheet
 
+from .metrics import METRICS, warning_type, write_metrics_from_env
 from .models import (
     AnalyteDef,
     MeasurementRecord,
-    RawCellRecord,
+    RawCellGrid,
     WorkbookMeta,
     WorkbookParseResult,
 )
+from .prefetch import DEFAULT_PREFETCH_BYTES, DEFAULT_PREFETCH_DEPTH, ReadAhead
+from .wire import decode_results, encode_results
 
 
+# Archive members up to this size are parsed from memory, larger ones spill to a temporary file.
+_SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
 _META_KEYS = {
     "order no.": "order_no",
     "lot no.": "lot_no",
@@ -33,44 +50,313 @@ class _UnitBlockState:
     range_high_assigned: bool = False
 
 
-def parse_folder(folder: Path) -> list[WorkbookParseResult]:
-    files = sorted(
-        p for p in folder.glob("*.xlsx") if p.is_file() and not p.name.startswith("~$")
-    )
-    return [parse_workbook(path) for path in files]
+@dataclass(slots=True, frozen=True)
+class _LayoutPlan:
+    meta_rows: tuple[tuple[str, int], ...]
+    substance_row: int | None
+    group_row: int | None
+    analyte_cols: tuple[int, ...]
+    analyte_names: tuple[str, ...]
 
 
-def parse_workbook(path: Path) -> WorkbookParseResult:
-    warnings: list[str] = []
-    workbook = load_workbook(path, data_only=True, read_only=False)
-    try:
-        raw_cells = _capture_raw_cells(workbook)
-        rows_sheet = _find_rows_sheet(workbook.worksheets)
-        if rows_sheet is None:
-            warnings.append("No sheet matching 'sorted by rows' was found.")
-            return WorkbookParseResult(
-                source_file=path.name,
-                workbook_meta=WorkbookMeta(sheet_name_rows=""),
-                analytes=[],
-                normalized_values=[],
-                raw_cells=raw_cells,
-                warnings=warnings,
-            )
+@dataclass(slots=True, frozen=True)
+class ArchiveMember:
+    """A workbook stored inside a ZIP archive."""
 
-        workbook_meta = _extract_workbook_meta(rows_sheet, warnings)
-        analytes, normalized_values = _extract_semantic_values(
-            ws=rows_sheet, source_file=path.name, warnings=warnings
-        )
+    archive: Path
+    name: str
+    size: int = 0
+
+
+def list_workbooks(folder: Path) -> list[Path]:
+    return discover_workbooks(folder, recursive=False)
+
+
+def discover_workbooks(
+    folder: Path,
+    include: Sequence[str] = ("*",),
+    exclude: Sequence[str] = (),
+    recursive: bool = True,
+) -> list[Path]:
+    """``.xlsx`` workbooks under ``folder`` matching ``include``/``exclude`` globs on the relative path."""
+    candidates = folder.rglob("*") if recursive else folder.glob("*")
+    found: list[tuple[str, Path]] = []
+    for path in candidates:
+        relative = path.relative_to(folder).as_posix()
+        if _is_workbook_name(relative, include, exclude) and path.is_file():
+            found.append((relative, path))
+    return [path for _, path in sorted(found)]
+
+
+def list_archive_workbooks(
+    archive: Path, include: Sequence[str] = ("*",), exclude: Sequence[str] = ()
+) -> list[ArchiveMember]:
+    """``.xlsx`` members of a ZIP archive sorted by member path; patterns as in :func:`discover_workbooks`."""
+    try:
+        with zipfile.ZipFile(archive) as bundle:
+            infos = bundle.infolist()
+    except zipfile.BadZipFile as exc:
+        raise ValueError(f"Not a valid ZIP archive: {archive}") from exc
+    members = [
+        ArchiveMember(archive=archive, name=info.filename, size=info.file_size)
+        for info in infos
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and _is_workbook_name(info.filename, include, exclude)
+    ]
+    return sorted(members, key=lambda member: member.name)
+
+
+def is_archive(path: Path) -> bool:
+    return path.suffix.lower() == ".zip" and path.is_file()
+
+
+def parse_folder(
+    folder: Path,
+    include: Sequence[str] = ("*",),
+    exclude: Sequence[str] = (),
+    recursive: bool = False,
+    max_workers: int = 1,
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH,
+    prefetch_bytes: int = DEFAULT_PREFETCH_BYTES,
+) -> list[WorkbookParseResult]:
+    """Parse the workbooks in ``folder``, or the members of ``folder`` when it is a ZIP archive."""
+    started = time.perf_counter()
+    sources, root = folder_sources(folder, include=include, exclude=exclude, recursive=recursive)
+    results = parse_workbooks(
+        sources,
+        root=root,
+        max_workers=max_workers,
+        prefetch_depth=prefetch_depth,
+        prefetch_bytes=prefetch_bytes,
+    )
+    METRICS.observe("folder_parse_seconds", time.perf_counter() - started)
+    write_metrics_from_env()
+    return results
+
+
+def folder_sources(
+    folder: Path,
+    include: Sequence[str] = ("*",),
+    exclude: Sequence[str] = (),
+    recursive: bool = False,
+) -> tuple[list[Path | ArchiveMember], Path | None]:
+    """Workbooks to parse for ``folder`` (or ZIP bundle) and the root their names are relative to."""
+    if is_archive(folder):
+        return list_archive_workbooks(folder, include=include, exclude=exclude), None
+    return discover_workbooks(folder, include=include, exclude=exclude, recursive=recursive), folder
+
+
+def parse_workbooks(
+    sources: Iterable[Path | ArchiveMember],
+    root: Path | None = None,
+    max_workers: int = 1,
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH,
+    prefetch_bytes: int = DEFAULT_PREFETCH_BYTES,
+) -> list[WorkbookParseResult]:
+    """Parse ``sources`` (see :func:`iter_parse_workbooks`) and return results sorted by source file."""
+    parsed = iter_parse_workbooks(
+        sources,
+        root=root,
+        max_workers=max_workers,
+        prefetch_depth=prefetch_depth,
+        prefetch_bytes=prefetch_bytes,
+    )
+    return sorted((result for _, result in parsed), key=lambda result: result.source_file)
+
+
+def iter_parse_workbooks(
+    sources: Iterable[Path | ArchiveMember],
+    root: Path | None = None,
+    max_workers: int = 1,
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH,
+    prefetch_bytes: int = DEFAULT_PREFETCH_BYTES,
+) -> Iterator[tuple[Path | ArchiveMember, WorkbookParseResult]]:
+    """Yield ``(source, result)`` in completion order, scheduling the largest files first."""
+    scheduled = largest_first(sources)
+    if max_workers <= 1 or len(scheduled) < 2:
+        if prefetch_depth <= 0 or len(scheduled) < 2:
+            for source in scheduled:
+                yield source, parse_source(source, source_file=source_name(source, root))
+            return
+        with ReadAhead(
+            scheduled, _read_source, _source_size, depth=prefetch_depth, max_bytes=prefetch_bytes
+        ) as reader:
+            for source, data in reader:
+                source_file = source_name(source, root)
+                if data is None:
+                    yield source, parse_source(source, source_file=source_file)
+                else:
+                    yield source, parse_workbook(io.BytesIO(data), source_file=source_file)
+        return
+
+    # Spawned workers do not inherit the GUI's threads or open Tk handles.
+    pool = ProcessPoolExecutor(
+        max_workers=min(max_workers, len(scheduled)), mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        futures = {
+            pool.submit(parse_to_wire, source, source_name(source, root), METRICS.enabled): source
+            for source in scheduled
+        }
+        for future in as_completed(futures):
+            try:
+                payload, worker_metrics = future.result()
+            except Exception:
+                # The worker's own count of the failure is lost with its result.
+                METRICS.inc("workbooks_failed_total")
+                raise
+            if worker_metrics is not None:
+                METRICS.merge(worker_metrics)
+            # Drop the finished future so its payload is not kept until the pool is done.
+            source = futures.pop(future)
+            yield source, decode_results(payload)[0]
+            del payload
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_source(source: Path | ArchiveMember, source_file: str | None = None) -> WorkbookParseResult:
+    """Parse a workbook file or archive member; members are never extracted to the archive's folder."""
+    if isinstance(source, Path):
+        return parse_workbook(source, source_file=source_file)
+    with zipfile.ZipFile(source.archive) as bundle, bundle.open(source.name) as member:
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as buffer:
+            shutil.copyfileobj(member, buffer)
+            buffer.seek(0)
+            return parse_workbook(buffer, source_file=source_file or source_name(source, None))
+
+
+def source_name(source: Path | ArchiveMember, root: Path | None) -> str:
+    """The ``source_file`` name of ``source``, relative to ``root`` when it lies below it."""
+    if isinstance(source, ArchiveMember):
+        return f"{source_name(source.archive, root)}/{source.name}"
+    if root is not None:
+        try:
+            return source.relative_to(root).as_posix()
+        except ValueError:
+            pass
+    return source.name
+
+
+def largest_first(sources: Iterable[Path | ArchiveMember]) -> list[Path | ArchiveMember]:
+    """``sources`` in the order the parsers schedule them: largest first, then by name."""
+    # Size is the cost estimate: parse time grows with the number of cells.
+    return sorted(sources, key=lambda source: (-_source_size(source), _sort_name(source)))
+
+
+def parse_to_wire(
+    source: Path | ArchiveMember, source_file: str, collect_metrics: bool = False
+) -> tuple[bytes, dict[str, object] | None]:
+    """Parse ``source`` into wire format, with the worker's metrics snapshot when ``collect_metrics``."""
+    # Worker processes count into their own registry and hand the delta back to the parent.
+    if not collect_metrics:
+        return encode_results([parse_source(source, source_file=source_file)]), None
+    METRICS.enabled = True
+    METRICS.reset()
+    payload = encode_results([parse_source(source, source_file=source_file)])
+    return payload, METRICS.snapshot()
+
+
+def default_parse_workers() -> int:
+    """Worker processes for folder imports: all cores but one, at most four."""
+    return max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+def parse_workbook(
+    path: Path | BinaryIO,
+    source_file: str | None = None,
+) -> WorkbookParseResult:
+    """Parse one leaflet workbook from a path, or from a seekable stream named by ``source_file``."""
+    if source_file is None:
+        if not isinstance(path, Path):
+            raise ValueError("source_file is required when parsing a stream")
+        source_file = path.name
+    started = time.perf_counter()
+    try:
+        workbook = load_workbook(path, data_only=True, read_only=False)
+        try:
+            result = _parse_loaded_workbook(workbook, source_file)
+        finally:
+            workbook.close()
+    except Exception:
+        METRICS.inc("workbooks_failed_total")
+        raise
+    if METRICS.enabled:
+        _record_parse_metrics(result, time.perf_counter() - started)
+    return result
+
+
+def _parse_loaded_workbook(workbook: Workbook, source_file: str) -> WorkbookParseResult:
+    warnings: list[str] = []
+    raw_cells = _capture_raw_cells(workbook)
+    rows_sheet = _find_rows_sheet(workbook.worksheets)
+    if rows_sheet is None:
+        warnings.append("No sheet matching 'sorted by rows' was found.")
         return WorkbookParseResult(
-            source_file=path.name,
-            workbook_meta=workbook_meta,
-            analytes=analytes,
-            normalized_values=normalized_values,
+            source_file=source_file,
+            workbook_meta=WorkbookMeta(sheet_name_rows=""),
+            analytes=[],
+            normalized_values=[],
             raw_cells=raw_cells,
             warnings=warnings,
         )
-    finally:
-        workbook.close()
+
+    # openpyxl recomputes max_row/max_column over every cell on each access.
+    max_row, max_column = rows_sheet.max_row, rows_sheet.max_column
+    plan = _discover_layout(rows_sheet, max_row, max_column)
+    workbook_meta = _extract_workbook_meta(rows_sheet, plan, warnings)
+    analytes, normalized_values = _extract_semantic_values(
+        ws=rows_sheet, plan=plan, max_row=max_row, source_file=source_file, warnings=warnings
+    )
+    return WorkbookParseResult(
+        source_file=source_file,
+        workbook_meta=workbook_meta,
+        analytes=analytes,
+        normalized_values=normalized_values,
+        raw_cells=raw_cells,
+        warnings=warnings,
+    )
+
+
+def _record_parse_metrics(result: WorkbookParseResult, seconds: float) -> None:
+    METRICS.inc("workbooks_parsed_total")
+    METRICS.inc("cells_read_total", len(result.raw_cells))
+    METRICS.inc("records_emitted_total", len(result.normalized_values))
+    for warning in result.warnings:
+        METRICS.inc("warnings_total", type=warning_type(warning))
+    METRICS.observe("parse_seconds", seconds)
+
+
+def _is_workbook_name(relative: str, include: Sequence[str], exclude: Sequence[str]) -> bool:
+    name = relative.rsplit("/", 1)[-1]
+    if not name.lower().endswith(".xlsx") or name.startswith("~$"):
+        return False
+    if not any(fnmatch.fnmatch(relative, pattern) for pattern in include):
+        return False
+    return not any(fnmatch.fnmatch(relative, pattern) for pattern in exclude)
+
+
+def _source_size(source: Path | ArchiveMember) -> int:
+    if isinstance(source, ArchiveMember):
+        return source.size
+    try:
+        return source.stat().st_size
+    except OSError:
+        return 0
+
+
+def _read_source(source: Path | ArchiveMember) -> bytes:
+    if isinstance(source, ArchiveMember):
+        with zipfile.ZipFile(source.archive) as bundle:
+            return bundle.read(source.name)
+    return source.read_bytes()
+
+
+def _sort_name(source: Path | ArchiveMember) -> str:
+    if isinstance(source, ArchiveMember):
+        return f"{source.archive.as_posix()}/{source.name}"
+    return source.as_posix()
 
 
 def _find_rows_sheet(worksheets: list[Worksheet]) -> Worksheet | None:
@@ -80,17 +366,60 @@ def _find_rows_sheet(worksheets: list[Worksheet]) -> Worksheet | None:
     return None
 
 
-def _extract_workbook_meta(ws: Worksheet, warnings: list[str]) -> WorkbookMeta:
+def _scan_column_a(ws: Worksheet, max_row: int) -> tuple[tuple[str, int], ...]:
+    # Metadata keys keep their last occurrence, substance and group their first.
     key_rows: dict[str, int] = {}
-    raw_values: dict[str, object] = {}
-    for row_idx in range(1, ws.max_row + 1):
-        key_cell = ws.cell(row=row_idx, column=1).value
-        if not isinstance(key_cell, str):
+    substance_row: int | None = None
+    group_row: int | None = None
+    for row_idx in range(1, max_row + 1):
+        key_norm = _col_a_key(ws, row_idx)
+        if key_norm is None:
             continue
-        key_norm = key_cell.strip().lower()
         if key_norm in _META_KEYS:
             key_rows[key_norm] = row_idx
-            raw_values[key_norm] = ws.cell(row=row_idx, column=2).value
+        elif key_norm == "substance" and substance_row is None:
+            substance_row = row_idx
+        elif key_norm == "group" and group_row is None:
+            group_row = row_idx
+    if substance_row is not None:
+        key_rows["substance"] = substance_row
+    if group_row is not None:
+        key_rows["group"] = group_row
+    return tuple(key_rows.items())
+
+
+def _discover_layout(ws: Worksheet, max_row: int, max_column: int) -> _LayoutPlan:
+    anchors = _scan_column_a(ws, max_row)
+    key_rows = {key: row_idx for key, row_idx in anchors if key in _META_KEYS}
+    substance_row = dict(anchors).get("substance")
+    group_row = dict(anchors).get("group")
+
+    analyte_cols: list[int] = []
+    analyte_names: list[str] = []
+    if substance_row is not None:
+        for col_idx in range(4, max_column + 1):
+            name = _to_text(ws.cell(row=substance_row, column=col_idx).value)
+            if name:
+                analyte_cols.append(col_idx)
+                analyte_names.append(name)
+
+    return _LayoutPlan(
+        meta_rows=tuple(key_rows.items()),
+        substance_row=substance_row,
+        group_row=group_row,
+        analyte_cols=tuple(analyte_cols),
+        analyte_names=tuple(analyte_names),
+    )
+
+
+def _col_a_key(ws: Worksheet, row_idx: int) -> str | None:
+    value = ws.cell(row=row_idx, column=1).value
+    return value.strip().lower() if isinstance(value, str) else None
+
+
+def _extract_workbook_meta(ws: Worksheet, plan: _LayoutPlan, warnings: list[str]) -> WorkbookMeta:
+    key_rows = dict(plan.meta_rows)
+    raw_values = {key: ws.cell(row=row_idx, column=2).value for key, row_idx in key_rows.items()}
 
     first_key_row = min(key_rows.values()) if key_rows else 1
     title_lines: list[str] = []
@@ -118,26 +447,24 @@ def _extract_workbook_meta(ws: Worksheet, warnings: list[str]) -> WorkbookMeta:
 
 
 def _extract_semantic_values(
-    ws: Worksheet, source_file: str, warnings: list[str]
+    ws: Worksheet, plan: _LayoutPlan, max_row: int, source_file: str, warnings: list[str]
 ) -> tuple[list[AnalyteDef], list[MeasurementRecord]]:
-    substance_row = _find_row_by_col_a(ws, "substance")
+    substance_row = plan.substance_row
     if substance_row is None:
         warnings.append("No 'Substance' row found.")
         return [], []
 
-    group_row = _find_row_by_col_a(ws, "group")
-    analyte_cols: list[int] = []
-    analyte_defs: list[AnalyteDef] = []
-    for col_idx in range(4, ws.max_column + 1):
-        raw_name = ws.cell(row=substance_row, column=col_idx).value
-        name = _to_text(raw_name)
-        if not name:
-            continue
-        group_name = _to_text(ws.cell(row=group_row, column=col_idx).value) if group_row else None
-        analyte_cols.append(col_idx)
-        analyte_defs.append(
-            AnalyteDef(name=name, group_name=group_name, column_index=col_idx, units_seen=[])
+    group_row = plan.group_row
+    analyte_cols = list(plan.analyte_cols)
+    analyte_defs = [
+        AnalyteDef(
+            name=name,
+            group_name=_to_text(ws.cell(row=group_row, column=col_idx).value) if group_row else None,
+            column_index=col_idx,
+            units_seen=[],
         )
+        for col_idx, name in zip(plan.analyte_cols, plan.analyte_names)
+    ]
 
     if not analyte_defs:
         warnings.append("No analytes were discovered in 'Substance' row.")
@@ -149,7 +476,7 @@ def _extract_semantic_values(
     measurement_started = False
     trailing_blank_rows = 0
 
-    for row_idx in range(substance_row + 2, ws.max_row + 1):
+    for row_idx in range(substance_row + 2, max_row + 1):
         row_values = [ws.cell(row=row_idx, column=c).value for c in analyte_cols]
         has_analyte_content = any(not _is_blank(v) for v in row_values)
 
@@ -240,15 +567,6 @@ def _derive_metric_role(
     return "other"
 
 
-def _find_row_by_col_a(ws: Worksheet, key: str) -> int | None:
-    key_norm = key.lower()
-    for row_idx in range(1, ws.max_row + 1):
-        value = ws.cell(row=row_idx, column=1).value
-        if isinstance(value, str) and value.strip().lower() == key_norm:
-            return row_idx
-    return None
-
-
 def _row_is_separator(values: list[object]) -> bool:
     non_blank = [v for v in values if not _is_blank(v)]
     if not non_blank:
@@ -285,24 +603,22 @@ def _normalize_value(value: object) -> tuple[str | None, float | None, str]:
         return text, None, "text"
 
 
-def _capture_raw_cells(workbook) -> list[RawCellRecord]:
-    records: list[RawCellRecord] = []
+def _capture_raw_cells(workbook) -> RawCellGrid:
+    grid = RawCellGrid()
     for ws in workbook.worksheets:
         for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
             for cell in row:
                 value = cell.value
                 if _is_blank(value):
                     continue
-                records.append(
-                    RawCellRecord(
-                        sheet_name=ws.title,
-                        row_idx=cell.row,
-                        col_idx=cell.column,
-                        raw_value=_to_text(value),
-                        python_type=type(value).__name__ if value is not None else None,
-                    )
+                grid.add(
+                    ws.title,
+                    cell.row,
+                    cell.column,
+                    _to_text(value),
+                    type(value).__name__ if value is not None else None,
                 )
-    return records
+    return grid
 
 
 def _to_text(value: object) -> str | None:
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from typing import Generic, TypeVar
+
+
+DEFAULT_PREFETCH_DEPTH = 4
+DEFAULT_PREFETCH_BYTES = 64 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class ReadAhead(Generic[T]):
+    """Reads the bytes of upcoming sources on a background thread.
+
+    Iterating yields ``(source, data)`` in the given order while the thread
+    is already reading the next sources, so slow storage and parsing overlap.
+    At most ``depth`` buffers wait in the queue, and a read only starts while
+    the buffered bytes plus the source's expected ``size`` fit in
+    ``max_bytes``; the buffer handed out last counts until the next one is
+    requested. A source expected to exceed ``max_bytes`` on its own, or one
+    whose read fails, is yielded with ``data=None`` so the caller opens it
+    directly (and sees the original error there).
+    """
+
+    def __init__(
+        self,
+        sources: Iterable[T],
+        read: Callable[[T], bytes],
+        size: Callable[[T], int],
+        depth: int = DEFAULT_PREFETCH_DEPTH,
+        max_bytes: int = DEFAULT_PREFETCH_BYTES,
+    ) -> None:
+        if depth < 1:
+            raise ValueError("Prefetch depth must be at least 1")
+        if max_bytes < 1:
+            raise ValueError("Prefetch byte limit must be positive")
+        self._sources = list(sources)
+        self._read = read
+        self._size = size
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self._cond = threading.Condition()
+        self._ready: deque[tuple[T, bytes | None]] = deque()
+        self._buffered_bytes = 0
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self.peak_bytes = 0
+        self.wait_seconds = 0.0
+
+    def __enter__(self) -> ReadAhead[T]:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple[T, bytes | None]]:
+        if self._thread is not None:
+            raise RuntimeError("ReadAhead can only be iterated once")
+        self._thread = threading.Thread(target=self._run, name="read-ahead", daemon=True)
+        self._thread.start()
+        held = 0
+        try:
+            for _ in range(len(self._sources)):
+                with self._cond:
+                    self._buffered_bytes -= held
+                    # The reader may be waiting for exactly these bytes to be released.
+                    self._cond.notify_all()
+                    started = time.perf_counter()
+                    while not self._ready:
+                        self._cond.wait()
+                    self.wait_seconds += time.perf_counter() - started
+                    source, data = self._ready.popleft()
+                    held = 0 if data is None else len(data)
+                    self._cond.notify_all()
+                yield source, data
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop reading ahead; a read in progress finishes in the background."""
+        with self._cond:
+            self._closed = True
+            self._ready.clear()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        for source in self._sources:
+            expected = self._size(source)
+            with self._cond:
+                while not self._closed and (
+                    len(self._ready) >= self.depth
+                    or (self._buffered_bytes and self._buffered_bytes + expected > self.max_bytes)
+                ):
+                    self._cond.wait()
+                if self._closed:
+                    return
+            data: bytes | None = None
+            if expected <= self.max_bytes:
+                try:
+                    data = self._read(source)
+                except Exception:
+                    data = None
+            with self._cond:
+                if self._closed:
+                    return
+                if data is not None:
+                    self._buffered_bytes += len(data)
+                    self.peak_bytes = max(self.peak_bytes, self._buffered_bytes)
+                self._ready.append((source, data))
+                self._cond.notify_all()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable, Iterator
+from typing import Protocol
+
+
+class _Scheduler(Protocol):
+    def after(self, ms: int, func: Callable[[], object]) -> str: ...
+
+    def after_cancel(self, after_id: str) -> None: ...
+
+
+class RefreshScheduler:
+    """Coalesces preview refresh requests into at most one render per frame.
+
+    ``state_key`` returns a hashable snapshot of everything the preview depends
+    on (data generation, filter values, ...). A render whose key matches the last
+    completed render is skipped unless forced. ``render`` may return a generator;
+    it is then advanced one step per Tk tick, and abandoned as soon as a newer
+    request with a different key arrives.
+    """
+
+    def __init__(
+        self,
+        root: _Scheduler,
+        state_key: Callable[[], Hashable],
+        render: Callable[[], Iterator[None] | None],
+        frame_ms: int = 16,
+    ) -> None:
+        self._root = root
+        self._state_key = state_key
+        self._render = render
+        self._frame_ms = frame_ms
+        self._pending_id: str | None = None
+        self._force = False
+        self._rendered_key: Hashable | None = None
+        self._active: Iterator[None] | None = None
+        self._active_key: Hashable | None = None
+        self._step_id: str | None = None
+
+    @property
+    def busy(self) -> bool:
+        return self._pending_id is not None or self._active is not None
+
+    def request(self, force: bool = False) -> None:
+        self._force = self._force or force
+        if self._pending_id is None:
+            self._pending_id = self._root.after(self._frame_ms, self._run)
+
+    def cancel(self) -> None:
+        if self._pending_id is not None:
+            self._root.after_cancel(self._pending_id)
+            self._pending_id = None
+        self._force = False
+        self._stop_active()
+
+    def _run(self) -> None:
+        self._pending_id = None
+        force, self._force = self._force, False
+        key = self._state_key()
+
+        if self._active is not None:
+            if key == self._active_key and not force:
+                return
+            self._stop_active()
+        elif key == self._rendered_key and not force:
+            return
+
+        steps = self._render()
+        if steps is None:
+            self._rendered_key = key
+            return
+        self._active = steps
+        self._active_key = key
+        self._step()
+
+    def _step(self) -> None:
+        self._step_id = None
+        if self._active is None:
+            return
+        try:
+            next(self._active)
+        except StopIteration:
+            self._rendered_key = self._active_key
+            self._active = None
+            self._active_key = None
+            return
+        self._step_id = self._root.after(1, self._step)
+
+    def _stop_active(self) -> None:
+        if self._step_id is not None:
+            self._root.after_cancel(self._step_id)
+            self._step_id = None
+        if self._active is not None:
+            close = getattr(self._active, "close", None)
+            if close is not None:
+                close()
+        self._active = None
+        self._active_key = None
+        # The interrupted render left the view partially updated.
+        self._rendered_key = None
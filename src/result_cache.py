@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .models import AnalyteDef, MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from .store import MeasurementStore
+from .wire import decode_results, encode_results
+from .xml_exporter import AssayAggregation, aggregate_results
+
+
+MEMORY_BUDGET_ENV = "LEAFLET_PARSER_MEMORY_BUDGET_MB"
+
+
+@dataclass(slots=True)
+class WorkbookSummary:
+    """What stays in memory for a workbook whose records and raw cells were evicted."""
+
+    source_file: str
+    workbook_meta: WorkbookMeta
+    analytes: list[AnalyteDef] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    record_count: int = 0
+    cell_count: int = 0
+
+
+@dataclass(slots=True)
+class _Entry:
+    summary: WorkbookSummary
+    aggregation: AssayAggregation
+    nbytes: int
+    result: WorkbookParseResult | None
+    spill_path: Path | None = None
+
+
+class ResultCache:
+    """Loaded parse results kept within a memory budget.
+
+    Every workbook keeps its :class:`WorkbookSummary` and its
+    :class:`AssayAggregation`, so exports never need the full results. When the
+    estimated size of the resident results exceeds ``budget_bytes``, the least
+    recently used workbooks are evicted: their result is written once to a
+    spill file (wire format) and dropped from memory, and :meth:`get` reads it
+    back on demand. Their records also go to an on-disk :class:`MeasurementStore`,
+    so :meth:`paged_out_records` filters, sorts and pages them in SQL without
+    decoding any spill file. The most recently used workbook always stays
+    resident. ``budget_bytes=None`` never evicts.
+    """
+
+    def __init__(self, budget_bytes: int | None = None, spill_dir: Path | None = None) -> None:
+        if budget_bytes is not None and budget_bytes <= 0:
+            raise ValueError("budget_bytes must be positive")
+        self.budget_bytes = budget_bytes
+        self._spill_root = spill_dir
+        self._spill_tmp: tempfile.TemporaryDirectory | None = None
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._resident_bytes = 0
+        self._spill_counter = 0
+        self._store: MeasurementStore | None = None
+        self._store_path: Path | None = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, source_file: object) -> bool:
+        return source_file in self._entries
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._resident_bytes
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            return sorted(self._entries)
+
+    def resident_sources(self) -> list[str]:
+        with self._lock:
+            return sorted(name for name, entry in self._entries.items() if entry.result is not None)
+
+    def is_resident(self, source_file: str) -> bool:
+        with self._lock:
+            return self._entries[source_file].result is not None
+
+    def upsert(self, results: Iterable[WorkbookParseResult]) -> list[str]:
+        """Add or replace results as most recently used; returns the sources evicted to make room."""
+        with self._lock:
+            for result in results:
+                self._drop(result.source_file)
+                nbytes = estimate_result_bytes(result)
+                self._entries[result.source_file] = _Entry(
+                    summary=WorkbookSummary(
+                        source_file=result.source_file,
+                        workbook_meta=result.workbook_meta,
+                        analytes=result.analytes,
+                        warnings=result.warnings,
+                        record_count=len(result.normalized_values),
+                        cell_count=len(result.raw_cells),
+                    ),
+                    aggregation=aggregate_results([result]),
+                    nbytes=nbytes,
+                    result=result,
+                )
+                self._resident_bytes += nbytes
+            return self._enforce_budget()
+
+    def touch(self, source_file: str) -> None:
+        """Mark ``source_file`` as just viewed."""
+        with self._lock:
+            if source_file in self._entries:
+                self._entries.move_to_end(source_file)
+
+    def get(self, source_file: str) -> tuple[WorkbookParseResult, list[str]]:
+        """Return the full result, rehydrating it if it was evicted, plus the sources evicted for it."""
+        with self._lock:
+            entry = self._entries[source_file]
+            self._entries.move_to_end(source_file)
+            if entry.result is not None:
+                return entry.result, []
+            entry.result = self._read_spill(entry)
+            self._resident_bytes += entry.nbytes
+            self._paged_out_store().remove(source_file)
+            return entry.result, self._enforce_budget()
+
+    def load(self, source_file: str) -> WorkbookParseResult:
+        """Return the full result without making it resident or changing the eviction order."""
+        with self._lock:
+            entry = self._entries[source_file]
+            if entry.result is not None:
+                return entry.result
+            return self._read_spill(entry)
+
+    def iter_results(self) -> Iterator[WorkbookParseResult]:
+        """All results in source-file order; evicted ones are read back one at a time."""
+        for source_file in self.sources():
+            try:
+                yield self.load(source_file)
+            except KeyError:
+                continue
+
+    def paged_out_sources(self) -> list[str]:
+        with self._lock:
+            return sorted(name for name, entry in self._entries.items() if entry.result is None)
+
+    def paged_out_values(self, field_name: str) -> list[str]:
+        """Sorted distinct non-empty ``field_name`` values of the paged-out workbooks."""
+        with self._lock:
+            return [] if self._store is None else self._store.values(field_name)
+
+    def paged_out_records(
+        self,
+        filters: dict[str, str],
+        sort_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> list[MeasurementRecord]:
+        """Records of paged-out workbooks matching ``filters``, ordered like :meth:`MeasurementIndex.query`."""
+        with self._lock:
+            if self._store is None:
+                return []
+            return self._store.query(filters, sort_by, descending, limit)
+
+    def paged_out_count(self, filters: dict[str, str]) -> int:
+        with self._lock:
+            return 0 if self._store is None else self._store.count(filters)
+
+    def summary(self, source_file: str) -> WorkbookSummary:
+        with self._lock:
+            return self._entries[source_file].summary
+
+    def aggregation(self) -> AssayAggregation:
+        """Aggregation of every loaded workbook, resident or not, folded in source-file order."""
+        merged = AssayAggregation()
+        with self._lock:
+            # Not LRU order: first-wins names and assay refs must not depend on what was viewed last.
+            for source_file in sorted(self._entries):
+                merged.merge(self._entries[source_file].aggregation)
+        return merged
+
+    def remove(self, source_file: str) -> bool:
+        with self._lock:
+            return self._drop(source_file)
+
+    def clear(self) -> None:
+        with self._lock:
+            for source_file in list(self._entries):
+                self._drop(source_file)
+
+    def close(self) -> None:
+        self.clear()
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+            self._store_path.unlink(missing_ok=True)
+        if self._spill_tmp is not None:
+            self._spill_tmp.cleanup()
+            self._spill_tmp = None
+
+    def _enforce_budget(self) -> list[str]:
+        if self.budget_bytes is None or self._resident_bytes <= self.budget_bytes:
+            return []
+        evicted: list[str] = []
+        resident = [name for name, entry in self._entries.items() if entry.result is not None]
+        # Oldest first; the most recently used workbook is never evicted.
+        for source_file in resident[:-1]:
+            if self._resident_bytes <= self.budget_bytes:
+                break
+            entry = self._entries[source_file]
+            if entry.spill_path is None:
+                entry.spill_path = self._write_spill(entry.result)
+            self._paged_out_store().upsert([entry.result])
+            entry.result = None
+            self._resident_bytes -= entry.nbytes
+            evicted.append(source_file)
+        return evicted
+
+    def _drop(self, source_file: str) -> bool:
+        entry = self._entries.pop(source_file, None)
+        if entry is None:
+            return False
+        if entry.result is not None:
+            self._resident_bytes -= entry.nbytes
+        elif self._store is not None:
+            self._store.remove(source_file)
+        if entry.spill_path is not None:
+            entry.spill_path.unlink(missing_ok=True)
+        return True
+
+    def _write_spill(self, result: WorkbookParseResult) -> Path:
+        self._spill_counter += 1
+        path = self._spill_dir() / f"{self._spill_counter:08d}.wire"
+        path.write_bytes(encode_results([result]))
+        return path
+
+    def _read_spill(self, entry: _Entry) -> WorkbookParseResult:
+        return decode_results(entry.spill_path.read_bytes())[0]
+
+    def _paged_out_store(self) -> MeasurementStore:
+        if self._store is None:
+            self._store_path = self._spill_dir() / f"paged-out-{id(self):x}.sqlite"
+            self._store = MeasurementStore(self._store_path)
+        return self._store
+
+    def _spill_dir(self) -> Path:
+        if self._spill_root is not None:
+            self._spill_root.mkdir(parents=True, exist_ok=True)
+            return self._spill_root
+        if self._spill_tmp is None:
+            self._spill_tmp = tempfile.TemporaryDirectory(prefix="leaflet-parser-spill-")
+        return Path(self._spill_tmp.name)
+
+
+def estimate_result_bytes(result: WorkbookParseResult) -> int:
+    """Rough in-memory size of a result's records and raw cell grid."""
+    total = 0
+    for rec in result.normalized_values:
+        total += sys.getsizeof(rec)
+        if rec.raw_value is not None:
+            total += sys.getsizeof(rec.raw_value)
+    _, sheets, rows, cols, values, types, strings = result.raw_cells.columns()
+    for column in (sheets, rows, cols, values, types):
+        total += column.itemsize * len(column)
+    total += sum(sys.getsizeof(text) for text in strings if text is not None)
+    return total
+
+
+def memory_budget_from_env() -> int | None:
+    """Budget in bytes from ``LEAFLET_PARSER_MEMORY_BUDGET_MB``; ``None`` when unset or not positive."""
+    value = os.environ.get(MEMORY_BUDGET_ENV, "").strip()
+    if not value:
+        return None
+    try:
+        megabytes = float(value)
+    except ValueError:
+        return None
+    return int(megabytes * 1024 * 1024) if megabytes > 0 else None
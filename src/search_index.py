@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+
+from .models import MeasurementRecord
+
+
+SEARCH_FIELDS = ("analyte_name", "sample_label", "sample_code", "group_name", "raw_value")
+
+_GRAM = 3
+_BITMAP_CACHE_MIN_POSTING = 64
+
+
+class TrigramIndex:
+    """Case-insensitive substring search over the searchable record fields.
+
+    The index works on distinct terms rather than on records: every distinct
+    casefolded field value becomes a term, each term keeps the ids of the
+    records it occurs in, and each trigram keeps the ids of the terms that
+    contain it. A query intersects the posting lists of its trigrams, verifies
+    the surviving terms with a plain substring check and unions their records.
+    """
+
+    def __init__(self) -> None:
+        self._term_ids: dict[str, int] = {}
+        self._terms: list[str] = []
+        self._term_records: list[array] = []
+        self._grams: dict[str, array] = {}
+        self._term_bitmaps: dict[int, int] = {}
+        self._last_query: tuple[str, int] | None = None
+        self._last_bitmap = 0
+        self.generation = 0
+
+    def add_records(self, start_id: int, records: Sequence[MeasurementRecord]) -> None:
+        term_ids = self._term_ids
+        for record_id, rec in enumerate(records, start=start_id):
+            seen: set[int] = set()
+            for name in SEARCH_FIELDS:
+                value = getattr(rec, name)
+                if not value:
+                    continue
+                text = value.casefold()
+                term_id = term_ids.get(text)
+                if term_id is None:
+                    term_id = self._add_term(text)
+                if term_id in seen:
+                    continue
+                seen.add(term_id)
+                self._term_records[term_id].append(record_id)
+                self._term_bitmaps.pop(term_id, None)
+        self.generation += 1
+
+    def bitmap(self, query: str, record_count: int) -> int:
+        """Bitmap (bit ``i`` set for record id ``i``) of records containing ``query``."""
+        needle = query.strip().casefold()
+        if not needle:
+            return (1 << record_count) - 1
+        cache_key = (needle, self.generation)
+        if self._last_query == cache_key:
+            return self._last_bitmap
+
+        bits = bytearray((record_count + 7) // 8)
+        combined = 0
+        for term_id in self._matching_terms(needle):
+            posting = self._term_records[term_id]
+            if len(posting) >= _BITMAP_CACHE_MIN_POSTING:
+                combined |= self._term_bitmap(term_id, record_count)
+                continue
+            for record_id in posting:
+                bits[record_id >> 3] |= 1 << (record_id & 7)
+        combined |= int.from_bytes(bits, "little")
+
+        self._last_query = cache_key
+        self._last_bitmap = combined
+        return combined
+
+    def _add_term(self, text: str) -> int:
+        term_id = len(self._terms)
+        self._term_ids[text] = term_id
+        self._terms.append(text)
+        self._term_records.append(array("I"))
+        for gram in _grams(text):
+            posting = self._grams.get(gram)
+            if posting is None:
+                posting = self._grams[gram] = array("I")
+            posting.append(term_id)
+        return term_id
+
+    def _matching_terms(self, needle: str) -> list[int]:
+        if len(needle) < _GRAM:
+            return [term_id for term_id, text in enumerate(self._terms) if needle in text]
+
+        postings = []
+        for gram in _grams(needle):
+            posting = self._grams.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        terms = self._terms
+        return sorted(term_id for term_id in candidates if needle in terms[term_id])
+
+    def _term_bitmap(self, term_id: int, record_count: int) -> int:
+        cached = self._term_bitmaps.get(term_id)
+        if cached is not None:
+            return cached
+        bits = bytearray((record_count + 7) // 8)
+        for record_id in self._term_records[term_id]:
+            bits[record_id >> 3] |= 1 << (record_id & 7)
+        bitmap = int.from_bytes(bits, "little")
+        self._term_bitmaps[term_id] = bitmap
+        return bitmap
+
+
+def _grams(text: str) -> set[str]:
+    return {text[idx : idx + _GRAM] for idx in range(len(text) - _GRAM + 1)}
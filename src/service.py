@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+import argparse
+import hmac
+import io
+import ipaddress
+import json
+import os
+import socketserver
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import asdict, replace
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .config import XmlConfig, load_gui_defaults
+from .filter_index import TEXT_FILTER
+from .metrics import METRICS
+from .models import MeasurementRecord, WorkbookParseResult
+from .parser import is_archive, parse_folder, parse_workbook
+from .store import STORE_FILTER_FIELDS, MeasurementStore
+from .wire import meta_to_json
+from .xml_exporter import (
+    AssayAggregation,
+    aggregate_results,
+    build_consolidated_addon_xml,
+    render_consolidated_addon_xml,
+    validate_addon_xml,
+)
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+TOKEN_ENV = "LEAFLET_PARSER_SERVICE_TOKEN"
+
+_CONFIG_FIELDS = ("method_id", "method_version", "run_results_export_path")
+
+
+class ParseService:
+    """Parser state kept warm across the requests of one service process.
+
+    openpyxl and the parser are imported once, and every workbook kept in the
+    session is folded into an :class:`AssayAggregation` as it is parsed, so
+    rendering the session's ``consolidated.xml`` never re-reads or re-groups records.
+    Re-submitting a workbook with the same ``source_file`` replaces it.
+    :meth:`parse_path` only reads below one of ``roots``; without roots only
+    uploads are accepted. With a :class:`MeasurementStore` the session's
+    records are also kept there for :meth:`measurements` and :meth:`lots`.
+    """
+
+    def __init__(
+        self,
+        cfg: XmlConfig | None = None,
+        max_workers: int = 1,
+        roots: Sequence[Path] = (),
+        store: MeasurementStore | None = None,
+    ) -> None:
+        self.cfg = cfg or load_gui_defaults()
+        self.max_workers = max_workers
+        self.roots = [Path(root).resolve() for root in roots]
+        self.store = store
+        if store is not None:
+            # The store mirrors this session; rows of an earlier session have no aggregation here.
+            store.clear()
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._aggregations: dict[str, AssayAggregation] = {}
+        self._merged: AssayAggregation | None = None
+
+    def parse_path(self, path: Path, keep: bool = True) -> list[WorkbookParseResult]:
+        """Parse a workbook, a folder of workbooks or a ZIP bundle below one of the service roots."""
+        if not self.roots:
+            raise PermissionError("Parsing local paths is disabled; start the service with --root")
+        path = path.resolve()
+        if not any(path.is_relative_to(root) for root in self.roots):
+            raise PermissionError(f"Path is outside the service roots: {path}")
+        if not path.exists():
+            raise FileNotFoundError(f"No such file or folder: {path}")
+        if path.is_dir() or is_archive(path):
+            results = parse_folder(path, max_workers=self.max_workers)
+        else:
+            results = [parse_workbook(path)]
+        if keep:
+            self.add(results)
+        return results
+
+    def parse_upload(self, data: bytes, source_file: str, keep: bool = True) -> WorkbookParseResult:
+        result = parse_workbook(io.BytesIO(data), source_file=source_file)
+        if keep:
+            self.add([result])
+        return result
+
+    def add(self, results: Sequence[WorkbookParseResult]) -> None:
+        aggregations = {result.source_file: aggregate_results([result]) for result in results}
+        with self._lock:
+            self._aggregations.update(aggregations)
+            self._merged = None
+            if self.store is not None:
+                self.store.upsert(results)
+
+    def remove(self, source_file: str) -> bool:
+        with self._lock:
+            removed = self._aggregations.pop(source_file, None) is not None
+            self._merged = None
+            if self.store is not None:
+                self.store.remove(source_file)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._aggregations.clear()
+            self._merged = None
+            if self.store is not None:
+                self.store.clear()
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            return sorted(self._aggregations)
+
+    def aggregation(self) -> AssayAggregation:
+        """Aggregation of every workbook in the session; rebuilt only after it changed."""
+        with self._lock:
+            if self._merged is None:
+                merged = AssayAggregation()
+                for aggregation in self._aggregations.values():
+                    merged.merge(aggregation)
+                self._merged = merged
+            return self._merged
+
+    def measurements(
+        self,
+        filters: dict[str, str],
+        sort_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> list[MeasurementRecord]:
+        with self._lock:
+            return self._require_store().query(filters, sort_by, descending, limit)
+
+    def lots(self, filters: dict[str, str]) -> list[tuple[str, str | None]]:
+        with self._lock:
+            return self._require_store().lots(filters)
+
+    def _require_store(self) -> MeasurementStore:
+        if self.store is None:
+            raise LookupError("Measurement queries need a store; start the service with --store")
+        return self.store
+
+    def consolidated_xml(self, cfg: XmlConfig | None = None) -> str:
+        xml_content = render_consolidated_addon_xml(self.aggregation(), cfg or self.cfg)
+        validate_addon_xml(xml_content)
+        return xml_content
+
+
+def result_to_json(result: WorkbookParseResult) -> dict[str, object]:
+    return {
+        "source_file": result.source_file,
+        "workbook_meta": meta_to_json(result.workbook_meta),
+        "warnings": list(result.warnings),
+        "records": [asdict(record) for record in result.normalized_values],
+    }
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API of :class:`ParseService`.
+
+    ``GET /health``, ``GET /workbooks``, ``GET /consolidated.xml`` and
+    ``GET /metrics`` read the session. ``POST /parse?path=...`` parses a local
+    workbook, folder or ZIP bundle; ``POST /parse?name=<file>.xlsx`` parses the
+    uploaded request body. ``/parse`` answers with the normalized records as
+    JSON, or with ``format=xml`` with the ``consolidated.xml`` of just the
+    parsed workbooks; ``keep=0`` leaves the session untouched.
+    ``DELETE /workbooks`` (optionally ``?source_file=...``) drops workbooks.
+    With a store, ``GET /measurements`` and ``GET /lots`` filter the session's
+    records by any of ``STORE_FILTER_FIELDS`` and ``text``; ``/measurements``
+    also takes ``sort``, ``descending`` and ``limit``.
+    ``method_id``, ``method_version`` and ``run_results_export_path`` query
+    parameters override the XML config of one request.
+
+    Browsers must not reach the service: requests with an ``Origin`` header or
+    with a ``Host`` other than a loopback name (or the bound address) are
+    refused, and when the server has a token every request must send it as
+    ``Authorization: Bearer <token>``.
+    """
+
+    server_version = "LeafletParserService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> ParseService:
+        return self.server.service
+
+    def do_GET(self) -> None:
+        self._dispatch(self._get)
+
+    def do_POST(self) -> None:
+        self._dispatch(self._post)
+
+    def do_DELETE(self) -> None:
+        self._dispatch(self._delete)
+
+    def _get(self, route: str, query: dict[str, str]) -> None:
+        if route == "/health":
+            self._send_json(
+                {
+                    "status": "ok",
+                    "workbooks": len(self.service.sources()),
+                    "uptime_seconds": round(time.monotonic() - self.service.started, 3),
+                }
+            )
+        elif route == "/workbooks":
+            self._send_json({"workbooks": self.service.sources()})
+        elif route == "/consolidated.xml":
+            self._send_xml(self.service.consolidated_xml(self._config(query)))
+        elif route == "/measurements":
+            limit = query.get("limit")
+            records = self.service.measurements(
+                _store_filters(query),
+                sort_by=query.get("sort") or None,
+                descending=query.get("descending", "0") not in ("0", "false", "no"),
+                limit=int(limit) if limit else None,
+            )
+            self._send_json({"records": [asdict(record) for record in records]})
+        elif route == "/lots":
+            lots = self.service.lots(_store_filters(query))
+            self._send_json({"lots": [{"source_file": source, "lot_no": lot_no} for source, lot_no in lots]})
+        elif route == "/metrics":
+            self._send(HTTPStatus.OK, METRICS.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path: {route}")
+
+    def _post(self, route: str, query: dict[str, str]) -> None:
+        if route != "/parse":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path: {route}")
+            return
+        keep = query.get("keep", "1") not in ("0", "false", "no")
+        if "path" in query:
+            self._read_body()
+            results = self.service.parse_path(Path(query["path"]), keep=keep)
+        else:
+            data = self._read_body()
+            if not data:
+                raise ValueError("Send a workbook as the request body or pass ?path=")
+            results = [self.service.parse_upload(data, query.get("name") or "upload.xlsx", keep=keep)]
+        if query.get("format") == "xml":
+            xml_content = build_consolidated_addon_xml(results, self._config(query))
+            validate_addon_xml(xml_content)
+            self._send_xml(xml_content)
+        else:
+            self._send_json({"results": [result_to_json(result) for result in results]})
+
+    def _delete(self, route: str, query: dict[str, str]) -> None:
+        if route != "/workbooks":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path: {route}")
+            return
+        if "source_file" in query:
+            if not self.service.remove(query["source_file"]):
+                self._send_error(HTTPStatus.NOT_FOUND, f"Workbook not loaded: {query['source_file']}")
+                return
+        else:
+            self.service.clear()
+        self._send_json({"workbooks": self.service.sources()})
+
+    def _dispatch(self, handler) -> None:
+        refusal = self._refusal()
+        if refusal is not None:
+            self.close_connection = True
+            self._send_error(*refusal)
+            return
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        try:
+            handler(parts.path.rstrip("/") or "/", query)
+        except FileNotFoundError as exc:
+            self._send_error(HTTPStatus.NOT_FOUND, str(exc))
+        except PermissionError as exc:
+            self._send_error(HTTPStatus.FORBIDDEN, str(exc))
+        except LookupError as exc:
+            self._send_error(HTTPStatus.NOT_FOUND, str(exc))
+        except ValueError as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(exc))
+        except _PayloadTooLarge as exc:
+            self.close_connection = True
+            self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, str(exc))
+        except Exception as exc:
+            # Unreadable workbooks: report the parser's error instead of dropping the connection.
+            self._send_error(HTTPStatus.UNPROCESSABLE_ENTITY, f"{type(exc).__name__}: {exc}")
+
+    def _refusal(self) -> tuple[HTTPStatus, str] | None:
+        if "Origin" in self.headers:
+            return HTTPStatus.FORBIDDEN, "Cross-origin requests are not allowed"
+        host = _host_name(self.headers.get("Host", ""))
+        if host not in _LOOPBACK_NAMES and host != getattr(self.server, "bound_host", None):
+            return HTTPStatus.FORBIDDEN, f"Host not allowed: {host or '(none)'}"
+        token = self.server.token
+        if token is not None:
+            sent = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+            if not hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8")):
+                return HTTPStatus.UNAUTHORIZED, "Missing or wrong service token"
+        return None
+
+    def _config(self, query: dict[str, str]) -> XmlConfig:
+        overrides = {key: query[key] for key in _CONFIG_FIELDS if key in query}
+        return replace(self.service.cfg, **overrides) if overrides else self.service.cfg
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            raise _PayloadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+        return self.rfile.read(length) if length > 0 else b""
+
+    def _send_json(self, payload: object, status: HTTPStatus = HTTPStatus.OK) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_xml(self, xml_content: str) -> None:
+        self._send(HTTPStatus.OK, xml_content.encode("utf-8"), "application/xml; charset=utf-8")
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json({"error": message}, status)
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address.
+        return str(self.client_address[0]) if isinstance(self.client_address, tuple) else "local"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class _PayloadTooLarge(Exception):
+    pass
+
+
+def _store_filters(query: dict[str, str]) -> dict[str, str]:
+    return {name: value for name, value in query.items() if name in STORE_FILTER_FIELDS or name == TEXT_FILTER}
+
+
+_LOOPBACK_NAMES = frozenset({"localhost", "127.0.0.1", "::1"})
+
+
+def _host_name(header: str) -> str:
+    """Host name of a ``Host`` header, without port or IPv6 brackets."""
+    header = header.strip().lower()
+    if header.startswith("["):
+        return header[1:].partition("]")[0]
+    return header.rpartition(":")[0] if header.count(":") == 1 else header
+
+
+def _is_loopback(host: str) -> bool:
+    if host.lower() == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: ParseService, token: str | None = None) -> None:
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+        self.token = token
+        self.bound_host = None if _is_loopback(address[0]) else address[0].lower()
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class ServiceUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, socket_path: Path, service: ParseService, token: str | None = None) -> None:
+            self.socket_path = socket_path
+            socket_path.unlink(missing_ok=True)
+            super().__init__(str(socket_path), ServiceRequestHandler)
+            self.service = service
+            self.token = token
+
+        def server_close(self) -> None:
+            super().server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+
+def make_server(
+    service: ParseService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Path | None = None,
+    token: str | None = None,
+) -> socketserver.BaseServer:
+    """Bind the service to ``host:port``, or to the Unix socket ``socket_path`` when given.
+
+    A non-loopback ``host`` is only accepted together with a ``token``.
+    """
+    token = token or None
+    if socket_path is None:
+        if token is None and not _is_loopback(host):
+            raise ValueError(f"Refusing to listen on non-loopback host {host} without a token")
+        return ServiceHTTPServer((host, port), service, token)
+    if not hasattr(socketserver, "UnixStreamServer"):
+        raise ValueError("Unix sockets are not supported on this platform")
+    return ServiceUnixServer(socket_path, service, token)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.service",
+        description="Keep the leaflet parser warm and serve parse/export requests locally.",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", type=Path, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for folder requests")
+    parser.add_argument(
+        "--root",
+        type=Path,
+        action="append",
+        default=[],
+        help="folder whose workbooks ?path= may parse (repeatable); without it only uploads are accepted",
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get(TOKEN_ENV),
+        help=f"require 'Authorization: Bearer <token>' (default: ${TOKEN_ENV}); needed for non-loopback hosts",
+    )
+    parser.add_argument(
+        "--store",
+        help="SQLite file (cleared at start) or :memory: mirroring the session for /measurements and /lots",
+    )
+    args = parser.parse_args(argv)
+
+    # Long-running: always count, so GET /metrics has something to show.
+    METRICS.enabled = True
+    store = None
+    if args.store:
+        store = MeasurementStore(args.store if args.store == ":memory:" else Path(args.store))
+    service = ParseService(max_workers=args.workers, roots=args.root, store=store)
+    try:
+        server = make_server(service, args.host, args.port, args.socket, token=args.token)
+    except ValueError as exc:
+        parser.error(str(exc))
+    where = args.socket if args.socket is not None else "http://{}:{}".format(*server.server_address[:2])
+    print(f"Leaflet parser service listening on {where} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if store is not None:
+            store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .config import XmlConfig
+from .models import WorkbookParseResult
+from .wire import decode_columns, encode_columns
+
+
+SNAPSHOT_SUFFIX = ".lpsession"
+
+_MAGIC = b"LPSNAP"
+_VERSION = 2
+_PREAMBLE = struct.Struct("<6sH")
+
+
+@dataclass(slots=True)
+class SessionSnapshot:
+    results: list[WorkbookParseResult] = field(default_factory=list)
+    filters: dict[str, str] = field(default_factory=dict)
+    config: XmlConfig = field(default_factory=XmlConfig)
+
+
+def save_session(path: Path, snapshot: SessionSnapshot) -> Path:
+    """Write ``snapshot`` as a compressed columnar file and return the path written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    body = encode_columns(
+        snapshot.results,
+        header={"config": asdict(snapshot.config), "filters": snapshot.filters},
+    )
+    payload = _PREAMBLE.pack(_MAGIC, _VERSION) + zlib.compress(body, 1)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(payload)
+    tmp_path.replace(path)
+    return path
+
+
+def load_session(path: Path) -> SessionSnapshot:
+    data = path.read_bytes()
+    if len(data) < _PREAMBLE.size:
+        raise ValueError(f"Not a session snapshot: {path}")
+    magic, version = _PREAMBLE.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError(f"Not a session snapshot: {path}")
+    if version != _VERSION:
+        raise ValueError(f"Unsupported session snapshot version {version}: {path}")
+    try:
+        body = zlib.decompress(data[_PREAMBLE.size :])
+    except zlib.error as exc:
+        raise ValueError(f"Corrupt session snapshot: {path}") from exc
+
+    try:
+        results, header = decode_columns(memoryview(body))
+    except ValueError as exc:
+        raise ValueError(f"Corrupt session snapshot: {path}") from exc
+    return SessionSnapshot(
+        results=results,
+        filters={str(key): str(value) for key, value in header.get("filters", {}).items()},
+        config=XmlConfig(**header.get("config", {})),
+    )
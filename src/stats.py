@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+
+from .models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+
+
+STAT_ROLES = ("target", "range_low", "range_high")
+PERCENTILES = (5.0, 25.0, 50.0, 75.0, 95.0)
+
+SeriesKey = tuple[str, str, str, str, str]
+
+
+@dataclass(slots=True, frozen=True)
+class SeriesStats:
+    """Cross-lot statistics of one (group, analyte, unit, metric role, sample) series.
+
+    ``drift`` is the least-squares slope of the per-lot means over the lot
+    sequence (change per lot, in the series unit) and ``max_step`` the largest
+    absolute change between consecutive lots; both are ``None`` below two lots.
+    """
+
+    group_name: str
+    analyte_name: str
+    unit: str
+    metric_role: str
+    sample_label: str
+    count: int
+    lots: int
+    minimum: float
+    maximum: float
+    mean: float
+    std: float | None
+    percentiles: tuple[float, ...]
+    drift: float | None
+    max_step: float | None
+
+    @property
+    def key(self) -> SeriesKey:
+        return (self.group_name, self.analyte_name, self.unit, self.metric_role, self.sample_label)
+
+
+class CrossLotStatistics:
+    """Accumulates numeric values of many lots into typed arrays.
+
+    Every value becomes one slot in three parallel arrays (series id, lot id,
+    value). :meth:`compute` then works in batched passes over those arrays:
+    one stable permutation sorted by (series, value) yields counts, extrema,
+    moments and percentiles per series from contiguous slices, a second one
+    sorted by (series, lot) yields the per-lot means used for drift.
+
+    A lot is identified by its lot number, or by the source file when a
+    workbook has none; lots are ordered by expiry date, then lot number.
+    """
+
+    def __init__(self, roles: Iterable[str] = STAT_ROLES) -> None:
+        self.roles = frozenset(roles)
+        self._series_ids: dict[SeriesKey, int] = {}
+        self._series_keys: list[SeriesKey] = []
+        self._lot_ids: dict[str, int] = {}
+        self._lot_sort_keys: list[tuple[date, tuple[int, int | str], str]] = []
+        self._series = array("I")
+        self._lots = array("I")
+        self._values = array("d")
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add_result(self, result: WorkbookParseResult) -> None:
+        self.add(result.source_file, result.workbook_meta, result.normalized_values)
+
+    def add(self, source_file: str, meta: WorkbookMeta, records: Iterable[MeasurementRecord]) -> None:
+        """Add the numeric values of ``records``, all belonging to one workbook."""
+        self.add_values(
+            source_file,
+            meta,
+            (
+                (
+                    (
+                        rec.group_name or "",
+                        rec.analyte_name,
+                        rec.unit or "",
+                        rec.metric_role,
+                        rec.sample_label or "",
+                    ),
+                    rec.numeric_value,
+                )
+                for rec in records
+                if rec.numeric_value is not None and rec.metric_role in self.roles
+            ),
+        )
+
+    def add_values(
+        self, source_file: str, meta: WorkbookMeta, items: Iterable[tuple[SeriesKey, float]]
+    ) -> None:
+        """Add ``(series key, value)`` pairs of one workbook; NaN and other-role values are skipped."""
+        lot_id = self._lot_id(source_file, meta)
+        series_ids = self._series_ids
+        roles = self.roles
+        for key, value in items:
+            if key[3] not in roles or not math.isfinite(value):
+                continue
+            series_id = series_ids.get(key)
+            if series_id is None:
+                series_id = series_ids[key] = len(self._series_keys)
+                self._series_keys.append(key)
+            self._series.append(series_id)
+            self._lots.append(lot_id)
+            self._values.append(value)
+
+    def compute(self, percentiles: Iterable[float] = PERCENTILES) -> list[SeriesStats]:
+        """Statistics of every series, sorted by series key."""
+        fractions = tuple(_percentile_fraction(p) for p in percentiles)
+        series, values = self._series, self._values
+        if not values:
+            return []
+
+        by_value = sorted(range(len(values)), key=values.__getitem__)
+        by_value.sort(key=series.__getitem__)
+        sorted_series = array("I", map(series.__getitem__, by_value))
+        sorted_values = array("d", map(values.__getitem__, by_value))
+
+        lot_rank = array("I", bytes(array("I").itemsize * len(self._lot_sort_keys)))
+        for rank, lot_id in enumerate(
+            sorted(range(len(self._lot_sort_keys)), key=self._lot_sort_keys.__getitem__)
+        ):
+            lot_rank[lot_id] = rank
+        record_ranks = array("I", map(lot_rank.__getitem__, self._lots))
+        by_lot = sorted(range(len(values)), key=record_ranks.__getitem__)
+        by_lot.sort(key=series.__getitem__)
+        lot_values = array("d", map(values.__getitem__, by_lot))
+        lot_ranks = array("I", map(record_ranks.__getitem__, by_lot))
+
+        # Both permutations are grouped by series id, so one slice covers a series in each.
+        out: list[SeriesStats] = []
+        start = 0
+        while start < len(sorted_series):
+            series_id = sorted_series[start]
+            stop = bisect_right(sorted_series, series_id, start)
+            chunk = sorted_values[start:stop]
+            lot_means = _lot_means(lot_values[start:stop], lot_ranks[start:stop])
+            out.append(_series_stats(self._series_keys[series_id], chunk, lot_means, fractions))
+            start = stop
+        out.sort(key=lambda stats: stats.key)
+        return out
+
+    def _lot_id(self, source_file: str, meta: WorkbookMeta) -> int:
+        lot = (meta.lot_no or "").strip() or source_file
+        lot_id = self._lot_ids.get(lot)
+        if lot_id is None:
+            lot_id = self._lot_ids[lot] = len(self._lot_sort_keys)
+            self._lot_sort_keys.append((meta.exp_date or date.max, _natural_key(lot), lot))
+        return lot_id
+
+
+def compute_statistics(
+    results: Iterable[WorkbookParseResult],
+    roles: Iterable[str] = STAT_ROLES,
+    percentiles: Iterable[float] = PERCENTILES,
+) -> list[SeriesStats]:
+    """Cross-lot statistics of ``results`` per (group, analyte, unit, metric role, sample)."""
+    engine = CrossLotStatistics(roles)
+    for result in results:
+        engine.add_result(result)
+    return engine.compute(percentiles)
+
+
+def _series_stats(
+    key: SeriesKey, chunk: array, lot_means: list[float], fractions: tuple[float, ...]
+) -> SeriesStats:
+    count = len(chunk)
+    mean = math.fsum(chunk) / count
+    std = None
+    if count > 1:
+        std = math.sqrt(math.fsum((value - mean) ** 2 for value in chunk) / (count - 1))
+    drift = max_step = None
+    if len(lot_means) > 1:
+        drift = _slope(lot_means)
+        max_step = max(abs(b - a) for a, b in zip(lot_means, lot_means[1:]))
+    return SeriesStats(
+        *key,
+        count=count,
+        lots=len(lot_means),
+        minimum=chunk[0],
+        maximum=chunk[-1],
+        mean=mean,
+        std=std,
+        percentiles=tuple(_interpolate(chunk, fraction) for fraction in fractions),
+        drift=drift,
+        max_step=max_step,
+    )
+
+
+def _lot_means(values: array, ranks: array) -> list[float]:
+    """Mean value per lot; ``ranks`` is sorted, so each lot is one contiguous run."""
+    if len(set(ranks)) == len(ranks):
+        # Usual case: one value per lot, nothing to fold.
+        return values.tolist()
+    means: list[float] = []
+    start = 0
+    while start < len(ranks):
+        stop = bisect_right(ranks, ranks[start], start)
+        size = stop - start
+        means.append(values[start] if size == 1 else math.fsum(values[start:stop]) / size)
+        start = stop
+    return means
+
+
+def _slope(points: list[float]) -> float:
+    n = len(points)
+    x_mean = (n - 1) / 2
+    y_mean = math.fsum(points) / n
+    numerator = math.fsum((idx - x_mean) * (y - y_mean) for idx, y in enumerate(points))
+    denominator = n * (n * n - 1) / 12
+    return numerator / denominator
+
+
+def _interpolate(sorted_values: array, fraction: float) -> float:
+    """Linear-interpolated percentile (the "inclusive" definition)."""
+    position = fraction * (len(sorted_values) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * weight
+
+
+def _percentile_fraction(percentile: float) -> float:
+    if not 0 <= percentile <= 100:
+        raise ValueError(f"Percentile must be between 0 and 100: {percentile}")
+    return percentile / 100
+
+
+def _natural_key(text: str) -> tuple[int, int | str]:
+    return (0, int(text)) if text.isdigit() else (1, text)
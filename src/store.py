@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections import namedtuple
+from collections.abc import Iterable
+from pathlib import Path
+
+from .filter_index import FILTER_FIELDS, SORT_COLUMNS, TEXT_FILTER
+from .models import MeasurementRecord, WorkbookParseResult
+from .search_index import SEARCH_FIELDS
+from .xml_exporter import AssayAggregation
+
+
+STORE_FILTER_FIELDS = (*FILTER_FIELDS, "sample_code", "group_name", "value_status")
+
+_MEASUREMENT_COLUMNS = (
+    "source_file",
+    "sample_label",
+    "sample_code",
+    "unit",
+    "analyte_name",
+    "group_name",
+    "metric_role",
+    "raw_value",
+    "numeric_value",
+    "value_status",
+    "sheet_row",
+    "sheet_col",
+)
+_NUMERIC_SORT_COLUMNS = frozenset({"numeric_value", "sheet_row", "sheet_col"})
+_INDEXED_COLUMNS = ("analyte_name", "group_name", "unit", "metric_role", "value_status", "sample_label")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS workbooks (
+    source_file TEXT PRIMARY KEY,
+    order_no TEXT,
+    lot_no TEXT,
+    exp_date TEXT,
+    consisting_of TEXT,
+    date_of_creation TEXT,
+    sheet_name_rows TEXT,
+    warnings TEXT NOT NULL DEFAULT '[]'
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    id INTEGER PRIMARY KEY,
+    source_file TEXT NOT NULL,
+    sample_label TEXT,
+    sample_code TEXT,
+    unit TEXT,
+    analyte_name TEXT NOT NULL,
+    group_name TEXT,
+    metric_role TEXT NOT NULL,
+    raw_value TEXT,
+    numeric_value REAL,
+    value_status TEXT NOT NULL,
+    sheet_row INTEGER NOT NULL,
+    sheet_col INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS measurements_source_file ON measurements (source_file);
+{"".join(f"CREATE INDEX IF NOT EXISTS measurements_{name} ON measurements ({name});" for name in _INDEXED_COLUMNS)}
+"""
+
+# Minimal stand-in for MeasurementRecord when folding grouped rows into an AssayAggregation.
+_AggregateRow = namedtuple("_AggregateRow", "group_name analyte_name sample_code unit")
+
+
+class MeasurementStore:
+    """SQLite-backed store of loaded measurements, in memory or in a file.
+
+    ``query`` and ``values`` follow the :class:`MeasurementIndex` contract (an
+    empty filter value means "any", ``TEXT_FILTER`` is a case-insensitive
+    substring search), so callers can swap one for the other. Workbook metadata
+    is kept alongside for lot-level questions; analytes and raw cells are not
+    stored.
+    """
+
+    def __init__(self, path: Path | str = ":memory:") -> None:
+        if isinstance(path, Path):
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.create_function("lp_casefold", 1, _casefold, deterministic=True)
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> MeasurementStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+
+    def upsert(self, results: Iterable[WorkbookParseResult]) -> None:
+        """Replace the stored rows of every workbook in ``results`` in one transaction."""
+        with self._conn:
+            for result in results:
+                self._delete(result.source_file)
+                meta = result.workbook_meta
+                self._conn.execute(
+                    "INSERT INTO workbooks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        result.source_file,
+                        meta.order_no,
+                        meta.lot_no,
+                        meta.exp_date.isoformat() if meta.exp_date else None,
+                        meta.consisting_of,
+                        meta.date_of_creation.isoformat() if meta.date_of_creation else None,
+                        meta.sheet_name_rows,
+                        json.dumps(result.warnings),
+                    ),
+                )
+                self._conn.executemany(
+                    f"INSERT INTO measurements ({', '.join(_MEASUREMENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_MEASUREMENT_COLUMNS))})",
+                    (
+                        tuple(getattr(rec, name) for name in _MEASUREMENT_COLUMNS)
+                        for rec in result.normalized_values
+                    ),
+                )
+
+    def remove(self, source_file: str) -> None:
+        with self._conn:
+            self._delete(source_file)
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM measurements")
+            self._conn.execute("DELETE FROM workbooks")
+
+    def values(self, field_name: str) -> list[str]:
+        """Sorted distinct non-empty values of ``field_name``."""
+        column = _filter_column(field_name)
+        rows = self._conn.execute(
+            f"SELECT DISTINCT {column} FROM measurements WHERE {column} IS NOT NULL AND {column} != '' "
+            f"ORDER BY {column}"
+        )
+        return [value for (value,) in rows]
+
+    def query(
+        self,
+        filters: dict[str, str],
+        sort_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> list[MeasurementRecord]:
+        """Records matching every non-empty filter, in source-file order unless sorted.
+
+        Sorting matches the preview: text columns compare blanks first, numeric
+        columns put blanks last, ties keep source-file order and ``descending``
+        reverses the whole order except that numeric blanks stay last.
+        """
+        where, params = _where(filters)
+        order = _order_by(sort_by, descending)
+        sql = f"SELECT {', '.join(_MEASUREMENT_COLUMNS)} FROM measurements{where} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [MeasurementRecord(*row) for row in self._conn.execute(sql, params)]
+
+    def count(self, filters: dict[str, str]) -> int:
+        where, params = _where(filters)
+        return self._conn.execute(f"SELECT COUNT(*) FROM measurements{where}", params).fetchone()[0]
+
+    def lots(self, filters: dict[str, str]) -> list[tuple[str, str | None]]:
+        """``(source_file, lot_no)`` of the workbooks with at least one matching record.
+
+        For example ``{"analyte_name": "Retinol", "unit": "µg/L", "value_status": "nd"}``
+        lists the lots that report n.d. for Retinol in µg/L.
+        """
+        where, params = _where(filters)
+        rows = self._conn.execute(
+            "SELECT w.source_file, w.lot_no FROM workbooks w "
+            f"WHERE w.source_file IN (SELECT source_file FROM measurements{where}) "
+            "ORDER BY w.source_file",
+            params,
+        )
+        return [(source_file, lot_no) for source_file, lot_no in rows]
+
+    def aggregation(self) -> AssayAggregation:
+        """Assay aggregation of all stored workbooks, taken in source-file order.
+
+        Rows are grouped in SQL first; each distinct (group, analyte, unit,
+        sample code) combination is folded once, in order of first appearance,
+        which gives the same first-wins names and assay refs as folding every
+        record.
+        """
+        rows = self._conn.execute(
+            """
+            SELECT group_name, analyte_name, sample_code, unit
+            FROM (
+                SELECT group_name, analyte_name, sample_code, unit, source_file, id,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY group_name, analyte_name, sample_code, unit ORDER BY source_file, id
+                       ) AS nth
+                FROM measurements
+            )
+            WHERE nth = 1
+            ORDER BY source_file, id
+            """
+        )
+        aggregation = AssayAggregation()
+        aggregation.add_records(_AggregateRow(*row) for row in rows)
+        return aggregation
+
+    def _delete(self, source_file: str) -> None:
+        self._conn.execute("DELETE FROM measurements WHERE source_file = ?", (source_file,))
+        self._conn.execute("DELETE FROM workbooks WHERE source_file = ?", (source_file,))
+
+
+def _filter_column(field_name: str) -> str:
+    if field_name not in STORE_FILTER_FIELDS:
+        raise ValueError(f"Cannot filter measurements by unknown field: {field_name}")
+    return field_name
+
+
+def _where(filters: dict[str, str]) -> tuple[str, list[object]]:
+    clauses: list[str] = []
+    params: list[object] = []
+    for name, value in filters.items():
+        if not value:
+            continue
+        if name == TEXT_FILTER:
+            needle = _casefold(value.strip())
+            if needle:
+                clauses.append(
+                    "(" + " OR ".join(f"instr(lp_casefold({field}), ?) > 0" for field in SEARCH_FIELDS) + ")"
+                )
+                params.extend([needle] * len(SEARCH_FIELDS))
+            continue
+        clauses.append(f"{_filter_column(name)} = ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _order_by(sort_by: str | None, descending: bool) -> str:
+    if sort_by is None:
+        return "source_file, id"
+    direction = " DESC" if descending else ""
+    tie_break = f"source_file{direction}, id{direction}"
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort preview by unknown column: {sort_by}")
+    if sort_by in _NUMERIC_SORT_COLUMNS:
+        if not descending:
+            return f"{sort_by} IS NULL, {sort_by}, {tie_break}"
+        # Blanks stay last and, like the index, keep ascending tie order among themselves.
+        blank = f"{sort_by} IS NULL"
+        return (
+            f"{blank}, {sort_by} DESC, CASE WHEN {blank} THEN source_file END, source_file DESC, "
+            f"CASE WHEN {blank} THEN id END, id DESC"
+        )
+    return f"COALESCE({sort_by}, ''){direction}, {tie_break}"
+
+
+def _casefold(value: str | None) -> str | None:
+    return None if value is None else value.casefold()
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+
+class TaskCancelled(Exception):
+    """Raised inside a background task when the user asked to cancel it."""
+
+
+class _Scheduler(Protocol):
+    def after(self, ms: int, func: Callable[[], object]) -> str: ...
+
+
+@dataclass(slots=True)
+class TaskProgress:
+    kind: str
+    done: int
+    total: int
+    message: str = ""
+
+
+class TaskContext:
+    """Handle given to a running task to report progress and observe cancellation."""
+
+    def __init__(
+        self,
+        kind: str,
+        cancel_event: threading.Event,
+        post: Callable[[object], None],
+        publish: Callable[[object], None] | None = None,
+    ) -> None:
+        self.kind = kind
+        self._cancel_event = cancel_event
+        self._post = post
+        self._publish = publish
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.kind)
+
+    def report(self, done: int, total: int, message: str = "") -> None:
+        self._post(TaskProgress(kind=self.kind, done=done, total=total, message=message))
+
+    def publish(self, value: object) -> None:
+        """Hand a partial result to the task's ``on_partial`` callback before the task finishes."""
+        if self._publish is not None:
+            self._publish(value)
+
+
+@dataclass(slots=True)
+class _Job:
+    kind: str
+    cancel_event: threading.Event
+    on_success: Callable[[Any], None]
+    on_error: Callable[[BaseException], None] | None
+    on_progress: Callable[[TaskProgress], None] | None
+    on_cancelled: Callable[[], None] | None
+    on_partial: Callable[[list[Any]], None] | None = None
+    thread: threading.Thread | None = None
+
+
+@dataclass(slots=True)
+class _Partial:
+    job: _Job
+    values: list[Any]
+
+
+@dataclass(slots=True)
+class _Finished:
+    job: _Job
+    result: Any = None
+    error: BaseException | None = None
+    cancelled: bool = False
+
+
+class BackgroundTaskRunner:
+    """Runs work on daemon threads and delivers callbacks on the Tk main thread.
+
+    Workers never touch Tk directly: they push events onto a queue that the main
+    thread drains from a ``root.after`` poll while at least one job is active.
+    At most one job of each ``kind`` may run at a time. Values a job publishes
+    while running reach ``on_partial`` in batches, one call per poll, so a
+    burst of partial results costs the UI a single update. Values published
+    before a cancelled job stops are still delivered, ahead of ``on_cancelled``.
+    """
+
+    def __init__(self, root: _Scheduler, poll_interval_ms: int = 50) -> None:
+        self._root = root
+        self._poll_interval_ms = poll_interval_ms
+        self._jobs: dict[str, _Job] = {}
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self._polling = False
+
+    def is_running(self, kind: str | None = None) -> bool:
+        if kind is None:
+            return bool(self._jobs)
+        return kind in self._jobs
+
+    def submit(
+        self,
+        kind: str,
+        work: Callable[[TaskContext], Any],
+        on_success: Callable[[Any], None],
+        on_error: Callable[[BaseException], None] | None = None,
+        on_progress: Callable[[TaskProgress], None] | None = None,
+        on_cancelled: Callable[[], None] | None = None,
+        on_partial: Callable[[list[Any]], None] | None = None,
+    ) -> bool:
+        if kind in self._jobs:
+            return False
+
+        job = _Job(
+            kind=kind,
+            cancel_event=threading.Event(),
+            on_success=on_success,
+            on_error=on_error,
+            on_progress=on_progress,
+            on_cancelled=on_cancelled,
+            on_partial=on_partial,
+        )
+        ctx = TaskContext(
+            kind=kind,
+            cancel_event=job.cancel_event,
+            post=self._events.put,
+            publish=lambda value: self._events.put(_Partial(job=job, values=[value])),
+        )
+        job.thread = threading.Thread(
+            target=self._run, args=(job, work, ctx), name=f"task-{kind}", daemon=True
+        )
+        self._jobs[kind] = job
+        job.thread.start()
+        self._ensure_polling()
+        return True
+
+    def cancel(self, kind: str | None = None) -> None:
+        for job_kind, job in self._jobs.items():
+            if kind is None or job_kind == kind:
+                job.cancel_event.set()
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._jobs.clear()
+
+    def _run(self, job: _Job, work: Callable[[TaskContext], Any], ctx: TaskContext) -> None:
+        try:
+            result = work(ctx)
+        except TaskCancelled:
+            self._events.put(_Finished(job=job, cancelled=True))
+        except BaseException as exc:  # noqa: BLE001 - surfaced to the UI via on_error
+            self._events.put(_Finished(job=job, error=exc))
+        else:
+            self._events.put(_Finished(job=job, result=result, cancelled=ctx.cancelled))
+
+    def _ensure_polling(self) -> None:
+        if self._polling:
+            return
+        self._polling = True
+        self._root.after(self._poll_interval_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._polling = False
+        self.drain()
+        if self._jobs:
+            self._ensure_polling()
+
+    def drain(self) -> None:
+        """Deliver all queued events; must be called on the main thread."""
+        partials: list[_Partial] = []
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(event, TaskProgress):
+                job = self._jobs.get(event.kind)
+                if job is not None and job.on_progress is not None and not job.cancel_event.is_set():
+                    job.on_progress(event)
+                continue
+            if isinstance(event, _Partial):
+                if partials and partials[-1].job is event.job:
+                    partials[-1].values.extend(event.values)
+                else:
+                    partials.append(event)
+                continue
+            # Partial results always arrive before their job's completion.
+            self._deliver_partials(partials)
+            partials = []
+            self._finish(event)
+        self._deliver_partials(partials)
+
+    def _deliver_partials(self, partials: list[_Partial]) -> None:
+        for partial in partials:
+            job = partial.job
+            # Also after a cancel: the job published these, so callers count them as kept.
+            if self._jobs.get(job.kind) is job and job.on_partial is not None:
+                job.on_partial(partial.values)
+
+    def _finish(self, event: _Finished) -> None:
+        job = event.job
+        if self._jobs.get(job.kind) is not job:
+            return
+        del self._jobs[job.kind]
+        if event.cancelled:
+            if job.on_cancelled is not None:
+                job.on_cancelled()
+        elif event.error is not None:
+            if job.on_error is not None:
+                job.on_error(event.error)
+        else:
+            job.on_success(event.result)
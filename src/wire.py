@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import gc
+import json
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from dataclasses import asdict
+from datetime import date
+from multiprocessing import shared_memory
+
+from .models import (
+    AnalyteDef,
+    MeasurementRecord,
+    RawCellGrid,
+    WorkbookMeta,
+    WorkbookParseResult,
+)
+
+
+WIRE_MAGIC = b"LPWIRE"
+WIRE_VERSION = 1
+# Magic, version and body length; the length lets a payload live in a buffer
+# larger than itself, such as a page-rounded shared memory block.
+_PREAMBLE = struct.Struct("<6sHQ")
+_SECTION = struct.Struct("<cI")
+_ARRAY_HEADER = struct.Struct("<cI")
+
+_MEASUREMENT_TEXT_FIELDS = (
+    "source_file",
+    "sample_label",
+    "sample_code",
+    "unit",
+    "analyte_name",
+    "group_name",
+    "metric_role",
+    "raw_value",
+    "value_status",
+)
+_RAW_COLUMN_COUNT = 5
+
+
+def encode_results(results: Sequence[WorkbookParseResult]) -> bytes:
+    """Encode ``results`` as a versioned, uncompressed columnar payload."""
+    body = encode_columns(results)
+    return _PREAMBLE.pack(WIRE_MAGIC, WIRE_VERSION, len(body)) + body
+
+
+def decode_results(data: bytes | memoryview) -> list[WorkbookParseResult]:
+    view = memoryview(data)
+    try:
+        if len(view) < _PREAMBLE.size:
+            raise ValueError("Not a parse result payload")
+        magic, version, size = _PREAMBLE.unpack_from(view)
+        if magic != WIRE_MAGIC:
+            raise ValueError("Not a parse result payload")
+        if version != WIRE_VERSION:
+            raise ValueError(f"Unsupported parse result payload version {version}")
+        if len(view) - _PREAMBLE.size < size:
+            raise ValueError("Corrupt parse result payload: truncated body")
+        results, _ = decode_columns(view[_PREAMBLE.size : _PREAMBLE.size + size])
+        return results
+    finally:
+        view.release()
+
+
+def share_results(results: Sequence[WorkbookParseResult]) -> shared_memory.SharedMemory:
+    """Copy the encoded ``results`` into a new shared memory block.
+
+    The caller owns the block: pass its ``name`` to the receiving process and
+    ``close()``/``unlink()`` it once the receiver has read it.
+    """
+    payload = encode_results(results)
+    block = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    block.buf[: len(payload)] = payload
+    return block
+
+
+def read_shared_results(name: str) -> list[WorkbookParseResult]:
+    """Decode results straight out of the shared memory block called ``name``."""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return decode_results(block.buf)
+    finally:
+        block.close()
+
+
+def encode_columns(results: Sequence[WorkbookParseResult], header: dict[str, object] | None = None) -> bytes:
+    """Encode ``results`` as header, string table and typed column sections.
+
+    ``header`` holds extra JSON-serializable keys stored next to the workbook
+    list; :func:`decode_columns` hands them back unchanged.
+    """
+    strings = _StringTable()
+    measurement_text = {name: array("I") for name in _MEASUREMENT_TEXT_FIELDS}
+    numeric_values = array("d")
+    numeric_present = array("B")
+    sheet_rows = array("I")
+    sheet_cols = array("I")
+    raw_sheets = array("H")
+    raw_rows = array("I")
+    raw_cols = array("I")
+    raw_values = array("I")
+    raw_types = array("I")
+    workbooks: list[dict[str, object]] = []
+
+    for result in results:
+        for name in _MEASUREMENT_TEXT_FIELDS:
+            measurement_text[name].extend(
+                strings.intern(getattr(rec, name)) for rec in result.normalized_values
+            )
+        for rec in result.normalized_values:
+            numeric_present.append(rec.numeric_value is not None)
+            numeric_values.append(0.0 if rec.numeric_value is None else rec.numeric_value)
+        sheet_rows.extend(rec.sheet_row for rec in result.normalized_values)
+        sheet_cols.extend(rec.sheet_col for rec in result.normalized_values)
+
+        sheet_names, sheets, rows, cols, values, types, grid_strings = result.raw_cells.columns()
+        remap = [strings.intern(text) for text in grid_strings]
+        raw_sheets.extend(sheets)
+        raw_rows.extend(rows)
+        raw_cols.extend(cols)
+        raw_values.extend(map(remap.__getitem__, values))
+        raw_types.extend(map(remap.__getitem__, types))
+
+        workbooks.append(
+            {
+                "source_file": result.source_file,
+                "workbook_meta": meta_to_json(result.workbook_meta),
+                "analytes": [asdict(analyte) for analyte in result.analytes],
+                "warnings": result.warnings,
+                "measurements": len(result.normalized_values),
+                "raw_cells": len(result.raw_cells),
+                "raw_sheets": sheet_names,
+            }
+        )
+
+    document = dict(header or {})
+    document["workbooks"] = workbooks
+    sections = [
+        (b"H", json.dumps(document, ensure_ascii=False).encode("utf-8")),
+        (b"S", strings.encode()),
+    ]
+    columns = [
+        *(measurement_text[name] for name in _MEASUREMENT_TEXT_FIELDS),
+        numeric_values,
+        numeric_present,
+        sheet_rows,
+        sheet_cols,
+        raw_sheets,
+        raw_rows,
+        raw_cols,
+        raw_values,
+        raw_types,
+    ]
+    sections.extend((b"C", _pack_array(column)) for column in columns)
+    return b"".join(_SECTION.pack(tag, len(blob)) + blob for tag, blob in sections)
+
+
+def decode_columns(body: memoryview) -> tuple[list[WorkbookParseResult], dict[str, object]]:
+    """Inverse of :func:`encode_columns`; returns the results and the extra header keys.
+
+    Raises ``ValueError`` when the sections are missing or malformed. Nothing
+    returned keeps a reference into ``body``.
+    """
+    # Millions of freshly built, acyclic records would otherwise trigger
+    # repeated full collections while the results are being rebuilt.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _decode_columns(body)
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as exc:
+        raise ValueError("Corrupt parse result payload") from exc
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+class _StringTable:
+    """Interns strings to dense ids; id 0 is reserved for ``None``."""
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._values: list[str] = []
+
+    def intern(self, value: str | None) -> int:
+        if value is None:
+            return 0
+        string_id = self._ids.get(value)
+        if string_id is None:
+            self._values.append(value)
+            string_id = self._ids[value] = len(self._values)
+        return string_id
+
+    def encode(self) -> bytes:
+        encoded = [value.encode("utf-8") for value in self._values]
+        lengths = array("I", map(len, encoded))
+        return _pack_array(lengths) + b"".join(encoded)
+
+
+def _decode_columns(body: memoryview) -> tuple[list[WorkbookParseResult], dict[str, object]]:
+    offset = 0
+    sections: list[tuple[bytes, memoryview]] = []
+    while offset < len(body):
+        tag, size = _SECTION.unpack_from(body, offset)
+        offset += _SECTION.size
+        if offset + size > len(body):
+            raise ValueError("Corrupt parse result payload: truncated section")
+        sections.append((tag, body[offset : offset + size]))
+        offset += size
+
+    if [tag for tag, _ in sections[:2]] != [b"H", b"S"]:
+        raise ValueError("Corrupt parse result payload: missing header or string table")
+    header = json.loads(bytes(sections[0][1]).decode("utf-8"))
+    table = _decode_strings(sections[1][1])
+    columns = [_unpack_array(blob)[0] for tag, blob in sections[2:] if tag == b"C"]
+    for _, blob in sections:
+        blob.release()
+    expected = len(_MEASUREMENT_TEXT_FIELDS) + 4 + _RAW_COLUMN_COUNT
+    if len(columns) != expected:
+        raise ValueError("Corrupt parse result payload: unexpected column count")
+
+    text_columns = [
+        [table[string_id] for string_id in column] for column in columns[: len(_MEASUREMENT_TEXT_FIELDS)]
+    ]
+    numeric_values, numeric_present, sheet_rows, sheet_cols = columns[
+        len(_MEASUREMENT_TEXT_FIELDS) : len(_MEASUREMENT_TEXT_FIELDS) + 4
+    ]
+    raw_sheets, raw_rows, raw_cols, raw_values, raw_types = columns[len(_MEASUREMENT_TEXT_FIELDS) + 4 :]
+
+    numeric = [value if present else None for value, present in zip(numeric_values, numeric_present)]
+    source, sample, code, unit, analyte, group, role, raw, status = text_columns
+    all_records = list(
+        map(
+            MeasurementRecord,
+            source,
+            sample,
+            code,
+            unit,
+            analyte,
+            group,
+            role,
+            raw,
+            numeric,
+            status,
+            sheet_rows,
+            sheet_cols,
+        )
+    )
+
+    results: list[WorkbookParseResult] = []
+    record_pos = 0
+    cell_pos = 0
+    for item in header.pop("workbooks"):
+        n_records = item["measurements"]
+        n_cells = item["raw_cells"]
+        results.append(
+            WorkbookParseResult(
+                source_file=item["source_file"],
+                workbook_meta=meta_from_json(item["workbook_meta"]),
+                analytes=[AnalyteDef(**analyte) for analyte in item["analytes"]],
+                normalized_values=all_records[record_pos : record_pos + n_records],
+                raw_cells=RawCellGrid.from_columns(
+                    item["raw_sheets"],
+                    raw_sheets[cell_pos : cell_pos + n_cells],
+                    raw_rows[cell_pos : cell_pos + n_cells],
+                    raw_cols[cell_pos : cell_pos + n_cells],
+                    raw_values[cell_pos : cell_pos + n_cells],
+                    raw_types[cell_pos : cell_pos + n_cells],
+                    table,
+                ),
+                warnings=list(item["warnings"]),
+            )
+        )
+        record_pos += n_records
+        cell_pos += n_cells
+    if record_pos != len(all_records) or cell_pos != len(raw_rows):
+        raise ValueError("Corrupt parse result payload: record counts do not match the columns")
+    return results, header
+
+
+def _decode_strings(blob: memoryview) -> list[str | None]:
+    lengths, offset = _unpack_array(blob)
+    table: list[str | None] = [None]
+    raw = bytes(blob[offset:])
+    pos = 0
+    for length in lengths:
+        table.append(sys.intern(raw[pos : pos + length].decode("utf-8")))
+        pos += length
+    return table
+
+
+def _pack_array(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return _ARRAY_HEADER.pack(values.typecode.encode("ascii"), len(values)) + values.tobytes()
+
+
+def _unpack_array(blob: memoryview) -> tuple[array, int]:
+    typecode, count = _ARRAY_HEADER.unpack_from(blob)
+    values = array(typecode.decode("ascii"))
+    start = _ARRAY_HEADER.size
+    end = start + count * values.itemsize
+    if end > len(blob):
+        raise ValueError("Corrupt parse result payload: truncated column")
+    values.frombytes(blob[start:end])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values, end
+
+
+def meta_to_json(meta: WorkbookMeta) -> dict[str, object]:
+    data = asdict(meta)
+    for key in ("exp_date", "date_of_creation"):
+        value = data[key]
+        data[key] = value.isoformat() if isinstance(value, date) else None
+    return data
+
+
+def meta_from_json(data: dict[str, object]) -> WorkbookMeta:
+    values = dict(data)
+    for key in ("exp_date", "date_of_creation"):
+        value = values.get(key)
+        values[key] = date.fromisoformat(value) if isinstance(value, str) else None
+    return WorkbookMeta(**values)
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import hashlib
 import io
+import json
+import multiprocessing
+import re
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
 from pathlib import Path
 from xml.etree import ElementTree as ET
 
 from .config import XmlConfig
+from .metrics import METRICS, write_metrics_from_env
 from .models import MeasurementRecord, WorkbookParseResult
 
 
 _EMBEDDED_ADDON_XSD = '<?xml version="1.0" encoding="utf-8"?>\n<xs:schema elementFormDefault="qualified" xmlns:xs="http://www.w3.org/2001/XMLSchema">\n\t<xs:element name="AddOn" nillable="true" type="AddOn" />\n\t<xs:complexType name="AddOn">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Id" type="xs:int" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="MethodId" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="MethodVersion" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="SampleTubeTypes" type="ArrayOfSampleTubeType" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="MeasurementSampleLists" type="ArrayOfMeasurementSampleList" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="RunResultsExportPath" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Assays" type="ArrayOfAssay" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfSampleTubeType">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="SampleTubeType" nillable="true" type="SampleTubeType" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="SampleTubeType">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Id" type="xs:int" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="DisplayName" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="BarcodeMask" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="FullFilename" type="xs:string" />\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="SampleCarrierType" type="SampleCarrierType" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="BarcodeRegex" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="GeneralConfigs" type="ArrayOfGeneralConfiguration" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="AddOns" type="ArrayOfAddOn" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:simpleType name="SampleCarrierType">\n\t\t<xs:restriction base="xs:string">\n\t\t\t<xs:enumeration value="Undefined" />\n\t\t\t<xs:enumeration value="Positions24" />\n\t\t\t<xs:enumeration value="Positions32" />\n\t\t\t<xs:enumeration value="ErrorCarrierPositions24" />\n\t\t\t<xs:enumeration value="ErrorCarrierPositions32" />\n\t\t</xs:restriction>\n\t</xs:simpleType>\n\t<xs:complexType name="ArrayOfGeneralConfiguration">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="GeneralConfiguration" nillable="true" type="GeneralConfiguration" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="GeneralConfiguration">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Id" type="xs:int" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Version" type="xs:string" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="SampleTubeTypes" type="ArrayOfSampleTubeType" />\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="IsRequestListUsed" type="xs:boolean" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="RequestListFilePath" type="xs:string" />\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="IsLimsFileUsed" type="xs:boolean" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="LimsFilePath" type="xs:string" />\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="ValidateRequestList" type="xs:boolean" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfAddOn">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="AddOn" nillable="true" type="AddOn" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\n\t<!-- New: ArrayOfAssay / Assay -->\n\t<xs:complexType name="ArrayOfAssay">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="Assay" nillable="true" type="Assay" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\n\t<xs:complexType name="Assay">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="AddOnRef" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Analytes" type="ArrayOfAnalyte" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\n\t<xs:complexType name="ArrayOfMeasurementSampleList">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="MeasurementSampleList" nillable="true" type="MeasurementSampleList" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="MeasurementSampleList">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="AddOnRef" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="ExportPath" type="xs:string" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Header" type="xs:string" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Footer" type="xs:string" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="AdditionalInjections" type="ArrayOfAdditionalInjection" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="WarmUps" type="ArrayOfWarmUp" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="ParameterMappings" type="ArrayOfMeasurementSampleListItem" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="DelimiterType" type="DelimiterType" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="FileType" type="FileType" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="IsSelected" type="xs:boolean" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Assay" type="xs:string" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\t<xs:complexType name="NamedItemOfInt32">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Id" type="xs:int" />\n\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Name" type="xs:string" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="AnalyteUnit">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="AnalyteRef" type="xs:int" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\n\t<!-- Modified Analyte: now references AssayRef and may include AssayInformationType -->\n\t<xs:complexType name="Analyte">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="AssayRef" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="AnalyteUnits" type="ArrayOfAnalyteUnit" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="AssayInformationType" type="xs:string" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\n\t<xs:complexType name="ArrayOfAnalyteUnit">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="AnalyteUnit" nillable="true" type="AnalyteUnit" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfAnalyte">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="Analyte" nillable="true" type="Analyte" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\n\t<xs:complexType name="MeasurementSampleListItemComponent">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="MeasurementSampleListItemRef" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="MeasurementSampleListComponentType" type="MeasurementSampleListComponentType" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Value" type="xs:string" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Parameter" type="xs:string" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\n\t<xs:simpleType name="MeasurementSampleListComponentType">\n\t\t<xs:restriction base="xs:string">\n\t\t\t<xs:enumeration value="Undefined" />\n\t\t\t<xs:enumeration value="StaticText" />\n\t\t\t<xs:enumeration value="SampleId" />\n\t\t\t<xs:enumeration value="SampleType" />\n\t\t\t<xs:enumeration value="FinalPlateBarcode" />\n\t\t\t<xs:enumeration value="RunTimeStamp" />\n\t\t\t<xs:enumeration value="UserName" />\n\t\t\t<xs:enumeration value="AnalyteConcentration" />\n\t\t\t<xs:enumeration value="SamplePosition" />\n\t\t\t<xs:enumeration value="Level" />\n\t\t\t<xs:enumeration value="State" />\n\t\t\t<!-- Added entries to match C# enum -->\n\t\t\t<xs:enumeration value="SourcePosition" />\n\t\t\t<xs:enumeration value="DilutionFactor" />\n\t\t</xs:restriction>\n\t</xs:simpleType>\n\n\t<xs:complexType name="MeasurementSampleListItem">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="Components" type="ArrayOfMeasurementSampleListItemComponent" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="MeasurementSampleListRef" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Position" type="xs:int" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfMeasurementSampleListItemComponent">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="MeasurementSampleListItemComponent" nillable="true" type="MeasurementSampleListItemComponent" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="WarmUp">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="RequiredItemType" type="REQUIRED_ITEM_TYPE" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Level" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="MeasurementSampleListRef" type="xs:int" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\t<xs:simpleType name="REQUIRED_ITEM_TYPE">\n\t\t<xs:restriction base="xs:string">\n\t\t\t<xs:enumeration value="Undefined" />\n\t\t\t<xs:enumeration value="Calibrator" />\n\t\t\t<xs:enumeration value="Control" />\n\t\t\t<xs:enumeration value="Reagent" />\n\t\t\t<xs:enumeration value="Plate" />\n\t\t\t<xs:enumeration value="TipRack" />\n\t\t</xs:restriction>\n\t</xs:simpleType>\n\t<xs:complexType name="AdditionalInjection">\n\t\t<xs:complexContent mixed="false">\n\t\t\t<xs:extension base="NamedItemOfInt32">\n\t\t\t\t<xs:sequence>\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Frequency" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Offset" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Prepend" type="xs:boolean" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Append" type="xs:boolean" />\n\t\t\t\t\t<xs:element minOccurs="0" maxOccurs="1" name="DisplayName" type="xs:string" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="RequiredItemType" type="REQUIRED_ITEM_TYPE" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="Level" type="xs:int" />\n\t\t\t\t\t<xs:element minOccurs="1" maxOccurs="1" name="MeasurementSampleListRef" type="xs:int" />\n\t\t\t\t</xs:sequence>\n\t\t\t</xs:extension>\n\t\t</xs:complexContent>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfAdditionalInjection">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="AdditionalInjection" nillable="true" type="AdditionalInjection" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfWarmUp">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="WarmUp" nillable="true" type="WarmUp" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:complexType name="ArrayOfMeasurementSampleListItem">\n\t\t<xs:sequence>\n\t\t\t<xs:element minOccurs="0" maxOccurs="unbounded" name="MeasurementSampleListItem" nillable="true" type="MeasurementSampleListItem" />\n\t\t</xs:sequence>\n\t</xs:complexType>\n\t<xs:simpleType name="DelimiterType">\n\t\t<xs:restriction base="xs:string">\n\t\t\t<xs:enumeration value="Undefined" />\n\t\t\t<xs:enumeration value="Semicolon" />\n\t\t\t<xs:enumeration value="Comma" />\n\t\t\t<xs:enumeration value="Blank" />\n\t\t\t<xs:enumeration value="Tab" />\n\t\t</xs:restriction>\n\t</xs:simpleType>\n\t<xs:simpleType name="FileType">\n\t\t<xs:restriction base="xs:string">\n\t\t\t<xs:enumeration value="Undefined" />\n\t\t\t<xs:enumeration value="Csv" />\n\t\t\t<xs:enumeration value="Txt" />\n\t\t\t<xs:enumeration value="Xlsx" />\n\t\t\t<xs:enumeration value="Json" />\n\t\t\t<xs:enumeration value="Xml" />\n\t\t</xs:restriction>\n\t</xs:simpleType>\n\t\n</xs:schema>'
 
+_UNSAFE_DIR_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_SHARD_FILE = re.compile(r"consolidated-\d{4,}-\d{4,}\.xml")
+
+SHARD_MANIFEST_NAME = "manifest.json"
+SHARD_MANIFEST_VERSION = 1
+SHARD_BY = ("group", "size")
+DEFAULT_SHARD_ANALYTES = 500
 
 
 def build_addon_xml(result: WorkbookParseResult, cfg: XmlConfig) -> str:
@@ -56,7 +73,65 @@ def build_addon_xml(result: WorkbookParseResult, cfg: XmlConfig) -> str:
     return buffer.getvalue().decode("utf-8")
 
 
+@dataclass(slots=True)
+class AnalyteAggregate:
+    name: str
+    assay_ref: int = 0
+    units: set[str] = field(default_factory=set)
+
+
+class AssayAggregation:
+    """Running Assay -> Analyte -> unit aggregation behind the consolidated XML."""
+
+    def __init__(self) -> None:
+        self.assays: dict[str, dict[str, AnalyteAggregate]] = {}
+
+    def add_result(self, result: WorkbookParseResult) -> None:
+        self.add_records(result.normalized_values)
+
+    def add_records(self, records: Iterable[MeasurementRecord]) -> None:
+        assays = self.assays
+        for rec in records:
+            analytes = assays.get(rec.group_name or "")
+            if analytes is None:
+                analytes = assays[rec.group_name or ""] = {}
+            key = rec.analyte_name.strip().casefold()
+            analyte = analytes.get(key)
+            if analyte is None:
+                analyte = analytes[key] = AnalyteAggregate(name=rec.analyte_name.strip())
+            if analyte.assay_ref == 0:
+                analyte.assay_ref = _as_int_or_zero(rec.sample_code)
+            analyte.units.add(rec.unit or "")
+
+    def merge(self, other: AssayAggregation) -> None:
+        for assay_name, other_analytes in other.assays.items():
+            analytes = self.assays.setdefault(assay_name, {})
+            for key, other_analyte in other_analytes.items():
+                analyte = analytes.get(key)
+                if analyte is None:
+                    analytes[key] = AnalyteAggregate(
+                        name=other_analyte.name,
+                        assay_ref=other_analyte.assay_ref,
+                        units=set(other_analyte.units),
+                    )
+                    continue
+                if analyte.assay_ref == 0:
+                    analyte.assay_ref = other_analyte.assay_ref
+                analyte.units |= other_analyte.units
+
+
+def aggregate_results(results: Iterable[WorkbookParseResult]) -> AssayAggregation:
+    aggregation = AssayAggregation()
+    for result in results:
+        aggregation.add_result(result)
+    return aggregation
+
+
 def build_consolidated_addon_xml(results: list[WorkbookParseResult], cfg: XmlConfig) -> str:
+    return render_consolidated_addon_xml(aggregate_results(results), cfg)
+
+
+def render_consolidated_addon_xml(aggregation: AssayAggregation, cfg: XmlConfig) -> str:
     root = ET.Element(
         "AddOn",
         attrib={
@@ -73,26 +148,23 @@ def build_consolidated_addon_xml(results: list[WorkbookParseResult], cfg: XmlCon
         ET.SubElement(root, "RunResultsExportPath").text = cfg.run_results_export_path
 
     assays_el = ET.SubElement(root, "Assays")
-    grouped = _group_measurements_by_assay_name(results)
 
-    for assay_name, assay_records in grouped.items():
+    for assay_name, analytes in sorted(aggregation.assays.items()):
         assay_el = ET.SubElement(assays_el, "Assay")
         ET.SubElement(assay_el, "Id").text = "0"
         ET.SubElement(assay_el, "Name").text = assay_name
         ET.SubElement(assay_el, "AddOnRef").text = "0"
 
         analytes_el = ET.SubElement(assay_el, "Analytes")
-        analyte_buckets = _bucket_analytes_by_name(assay_records)
 
-        for _, analyte_records in sorted(analyte_buckets.items()):
+        for _, analyte in sorted(analytes.items()):
             analyte_el = ET.SubElement(analytes_el, "Analyte")
             ET.SubElement(analyte_el, "Id").text = "0"
-            ET.SubElement(analyte_el, "Name").text = analyte_records[0].analyte_name.strip()
-            ET.SubElement(analyte_el, "AssayRef").text = str(_pick_assay_ref(analyte_records))
+            ET.SubElement(analyte_el, "Name").text = analyte.name
+            ET.SubElement(analyte_el, "AssayRef").text = str(analyte.assay_ref)
 
-            units = sorted({(rec.unit or "") for rec in analyte_records})
             analyte_units_el = ET.SubElement(analyte_el, "AnalyteUnits")
-            for unit_name in units:
+            for unit_name in sorted(analyte.units):
                 unit_el = ET.SubElement(analyte_units_el, "AnalyteUnit")
                 ET.SubElement(unit_el, "Id").text = "0"
                 ET.SubElement(unit_el, "Name").text = unit_name
@@ -116,14 +188,170 @@ def write_addon_xml(result: WorkbookParseResult, cfg: XmlConfig, out_dir: Path)
 
 
 def write_consolidated_addon_xml(results: list[WorkbookParseResult], cfg: XmlConfig, out_dir: Path) -> Path:
+    out_path = write_aggregated_addon_xml(aggregate_results(results), cfg=cfg, out_dir=out_dir)
+    write_metrics_from_env()
+    return out_path
+
+
+def write_aggregated_addon_xml(aggregation: AssayAggregation, cfg: XmlConfig, out_dir: Path) -> Path:
+    started = time.perf_counter()
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / "consolidated.xml"
-    xml_content = build_consolidated_addon_xml(results=results, cfg=cfg)
+    xml_content = render_consolidated_addon_xml(aggregation, cfg=cfg)
     validate_addon_xml(xml_content)
     out_path.write_text(xml_content, encoding="utf-8")
+    if METRICS.enabled:
+        METRICS.inc("exports_total")
+        METRICS.inc("export_bytes_written_total", out_path.stat().st_size)
+        METRICS.observe("export_seconds", time.perf_counter() - started)
     return out_path
 
 
+def write_profile_exports(
+    results: list[WorkbookParseResult],
+    profiles: dict[str, XmlConfig],
+    out_dir: Path,
+    max_workers: int = 1,
+) -> dict[str, Path]:
+    """Aggregate ``results`` once and write ``out_dir/<profile name>/consolidated.xml`` per profile."""
+    return write_aggregated_profile_exports(aggregate_results(results), profiles, out_dir, max_workers)
+
+
+def write_aggregated_profile_exports(
+    aggregation: AssayAggregation,
+    profiles: dict[str, XmlConfig],
+    out_dir: Path,
+    max_workers: int = 1,
+) -> dict[str, Path]:
+    """:func:`write_profile_exports` for an existing aggregation."""
+    targets = {name: out_dir / _profile_dir_name(name) for name in profiles}
+    # Windows and macOS file systems ignore case: "Lab A" and "lab a" share a folder.
+    if len({target.name.casefold() for target in targets.values()}) != len(targets):
+        raise ValueError("Export profile names must map to distinct output folders")
+
+    if max_workers <= 1 or len(targets) < 2:
+        written = {
+            name: write_aggregated_addon_xml(aggregation, profiles[name], target) for name, target in targets.items()
+        }
+    else:
+        started = time.perf_counter()
+        # Rendering holds the GIL; spawned processes render profiles truly in parallel.
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(targets)), mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            paths = pool.map(
+                write_aggregated_addon_xml, repeat(aggregation), [profiles[name] for name in targets], targets.values()
+            )
+            written = dict(zip(targets, paths))
+        # Worker processes count into their own registry.
+        if METRICS.enabled:
+            METRICS.inc("exports_total", len(written))
+            METRICS.inc("export_bytes_written_total", sum(path.stat().st_size for path in written.values()))
+            METRICS.observe("export_seconds", time.perf_counter() - started)
+    write_metrics_from_env()
+    return written
+
+
+def plan_shards(
+    aggregation: AssayAggregation, shard_by: str = "group", max_analytes: int = DEFAULT_SHARD_ANALYTES
+) -> list[AssayAggregation]:
+    """Split ``aggregation`` into per-shard aggregations; an Assay is never split."""
+    if shard_by not in SHARD_BY:
+        raise ValueError(f"shard_by must be one of {', '.join(SHARD_BY)}")
+    if max_analytes < 1:
+        raise ValueError("max_analytes must be at least 1")
+    shards: list[AssayAggregation] = []
+    size = 0
+    for assay_name, analytes in sorted(aggregation.assays.items()):
+        if shard_by == "group" or not shards or size + len(analytes) > max_analytes:
+            shards.append(AssayAggregation())
+            size = 0
+        shards[-1].assays[assay_name] = analytes
+        size += len(analytes)
+    return shards or [AssayAggregation()]
+
+
+def write_sharded_consolidated_addon_xml(
+    results: list[WorkbookParseResult],
+    cfg: XmlConfig,
+    out_dir: Path,
+    shard_by: str = "group",
+    max_analytes: int = DEFAULT_SHARD_ANALYTES,
+    max_workers: int = 1,
+) -> Path:
+    manifest_path = write_sharded_addon_xml(
+        aggregate_results(results),
+        cfg,
+        out_dir,
+        shard_by=shard_by,
+        max_analytes=max_analytes,
+        max_workers=max_workers,
+    )
+    write_metrics_from_env()
+    return manifest_path
+
+
+def write_sharded_addon_xml(
+    aggregation: AssayAggregation,
+    cfg: XmlConfig,
+    out_dir: Path,
+    shard_by: str = "group",
+    max_analytes: int = DEFAULT_SHARD_ANALYTES,
+    max_workers: int = 1,
+) -> Path:
+    """Write the consolidated export as ``consolidated-GGGG-NNNN.xml`` shards plus ``manifest.json``."""
+    started = time.perf_counter()
+    shards = plan_shards(aggregation, shard_by=shard_by, max_analytes=max_analytes)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / SHARD_MANIFEST_NAME
+    previous, generation = _manifest_files(manifest_path)
+    while True:
+        generation += 1
+        names = [f"consolidated-{generation:04d}-{idx:04d}.xml" for idx in range(1, len(shards) + 1)]
+        if previous.isdisjoint(names):
+            break
+    paths = [out_dir / name for name in names]
+
+    if max_workers <= 1 or len(shards) < 2:
+        written = [_write_shard(shard, cfg, path) for shard, path in zip(shards, paths)]
+    else:
+        # Rendering holds the GIL; spawned processes render shards truly in parallel.
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(shards)), mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            written = list(pool.map(_write_shard, shards, repeat(cfg), paths))
+
+    manifest = {
+        "version": SHARD_MANIFEST_VERSION,
+        "generation": generation,
+        "method_id": cfg.method_id,
+        "method_version": cfg.method_version,
+        "shard_by": shard_by,
+        "shards": [
+            {
+                "file": path.name,
+                "sha256": digest,
+                "bytes": size,
+                "assays": sorted(shard.assays),
+                "analytes": sum(len(analytes) for analytes in shard.assays.values()),
+            }
+            for shard, path, (digest, size) in zip(shards, paths, written)
+        ],
+    }
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(manifest_path)
+    stale = previous | {path.name for path in out_dir.iterdir() if _SHARD_FILE.fullmatch(path.name)}
+    for name in stale.difference(names):
+        (out_dir / name).unlink(missing_ok=True)
+
+    if METRICS.enabled:
+        METRICS.inc("exports_total")
+        METRICS.inc("export_bytes_written_total", sum(size for _, size in written))
+        METRICS.observe("export_seconds", time.perf_counter() - started)
+    return manifest_path
+
+
 def validate_addon_xml(xml_text: str, xsd_path: Path | None = None) -> None:
     if xsd_path is not None:
         _ = ET.parse(xsd_path)
@@ -174,32 +402,36 @@ def _require_int(parent: ET.Element, child_name: str) -> None:
         ) from exc
 
 
-def _group_measurements_by_assay_name(
-    results: list[WorkbookParseResult],
-) -> dict[str, list[MeasurementRecord]]:
-    grouped: dict[str, list[MeasurementRecord]] = {}
-    for result in results:
-        for rec in result.normalized_values:
-            assay_name = rec.group_name or ""
-            grouped.setdefault(assay_name, []).append(rec)
-    return dict(sorted(grouped.items()))
+def _write_shard(aggregation: AssayAggregation, cfg: XmlConfig, path: Path) -> tuple[str, int]:
+    xml_content = render_consolidated_addon_xml(aggregation, cfg=cfg)
+    validate_addon_xml(xml_content)
+    # Written as bytes so the manifest digest matches the file on every platform.
+    data = xml_content.encode("utf-8")
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest(), len(data)
 
 
+def _manifest_files(manifest_path: Path) -> tuple[set[str], int]:
+    """Shard files and generation of an existing manifest (``set(), 0`` when there is none)."""
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set(), 0
+    if not isinstance(manifest, dict):
+        return set(), 0
+    # Only bare file names: a tampered manifest must not delete files elsewhere.
+    files = (shard.get("file") for shard in manifest.get("shards", []) if isinstance(shard, dict))
+    generation = manifest.get("generation")
+    return (
+        {name for name in files if isinstance(name, str) and Path(name).name == name},
+        generation if isinstance(generation, int) and generation > 0 else 0,
+    )
 
-def _bucket_analytes_by_name(assay_records: list[MeasurementRecord]) -> dict[str, list[MeasurementRecord]]:
-    buckets: dict[str, list[MeasurementRecord]] = {}
-    for rec in assay_records:
-        key = rec.analyte_name.strip().casefold()
-        buckets.setdefault(key, []).append(rec)
-    return buckets
 
+def _profile_dir_name(name: str) -> str:
+    cleaned = _UNSAFE_DIR_CHARS.sub("_", name.strip()).strip(" .")
+    return cleaned or "profile"
 
-def _pick_assay_ref(analyte_records: list[MeasurementRecord]) -> int:
-    for rec in analyte_records:
-        parsed = _as_int_or_zero(rec.sample_code)
-        if parsed != 0:
-            return parsed
-    return 0
 
 def _as_int_or_zero(value: str | None) -> int:
     if value is None:
@@ -4,6 +4,7 @@ from pathlib import Path
 
 import pytest
 
+from leaflets import write_synthetic_leaflet
 from src.parser import parse_folder
 
 
@@ -18,3 +19,10 @@ def workbook_paths() -> list[Path]:
 def parsed_results():
     return parse_folder(Path("."))
 
+
+@pytest.fixture()
+def leaflet_factory(tmp_path):
+    def make(name: str = "leaflet.xlsx", **kwargs) -> Path:
+        return write_synthetic_leaflet(tmp_path / name, **kwargs)
+
+    return make
@@ -0,0 +1,100 @@
+"""Synthetic leaflet workbooks for tests and memory profiling corpora.
+
+``python tests/leaflets.py <out_dir> --workbooks 100`` writes a corpus for
+``python -m src.memprofile``.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Sequence
+from pathlib import Path
+
+from openpyxl import Workbook
+
+
+def write_synthetic_leaflet(
+    path: Path,
+    analytes: int = 2,
+    levels: int = 1,
+    lot: str = "3124",
+    group: str = "Vitamins A/E",
+    version_sheet: bool = True,
+    first_code: int = 36,
+    analyte_prefix: str = "Analyte",
+) -> Path:
+    """Write a leaflet workbook laid out like the Chromsystems Excel leaflets.
+
+    Each control level adds one unit block (target, range low, separator,
+    range high) with one value per analyte.
+    """
+    workbook = Workbook()
+    rows_ws = workbook.active
+    rows_ws.title = "Leaflet sorted by rows"
+    rows_ws["A1"] = "Serum Control LV1 - Vitamins A and E"
+    rows_ws["A3"], rows_ws["B3"] = "Order No.", "0036"
+    rows_ws["A4"], rows_ws["B4"] = "Lot No.", lot
+    rows_ws["A5"], rows_ws["B5"] = "Exp. Date", "2026-03-31"
+    rows_ws["A7"] = "Substance"
+    rows_ws["A8"] = "Group"
+    for idx in range(analytes):
+        rows_ws.cell(row=7, column=4 + idx, value=f"{analyte_prefix} {idx + 1}")
+        rows_ws.cell(row=8, column=4 + idx, value=group)
+
+    row = 9
+    for level in range(levels):
+        block = (
+            (f"Control LV{level + 1}", f"{first_code + level}", "µg/L", lambda i: 0.5 + i + level),
+            (None, "Range", None, lambda i: 0.4 + i + level),
+            (None, None, None, lambda i: "-"),
+            (None, None, None, lambda i: 0.6 + i + level),
+        )
+        for label, code, unit, value in block:
+            rows_ws.cell(row=row, column=1, value=label)
+            rows_ws.cell(row=row, column=2, value=code)
+            rows_ws.cell(row=row, column=3, value=unit)
+            for idx in range(analytes):
+                rows_ws.cell(row=row, column=4 + idx, value=value(idx))
+            row += 1
+
+    column_ws = workbook.create_sheet("Leaflet sorted by column")
+    column_ws["A1"] = "Substance"
+    for idx in range(analytes):
+        column_ws.cell(row=2 + idx, column=1, value=f"{analyte_prefix} {idx + 1}")
+    if version_sheet:
+        version_ws = workbook.create_sheet("Version")
+        version_ws["A1"], version_ws["B1"] = "Version", 1.5
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(path)
+    return path
+
+
+def write_synthetic_corpus(out_dir: Path, workbooks: int, analytes: int = 40, levels: int = 6) -> list[Path]:
+    """Write ``workbooks`` synthetic leaflets spread over twenty assay groups."""
+    return [
+        write_synthetic_leaflet(
+            out_dir / f"synthetic_{idx:05d}.xlsx",
+            analytes=analytes,
+            levels=levels,
+            lot=f"{1000 + idx}",
+            group=f"Panel {idx % 20}",
+        )
+        for idx in range(workbooks)
+    ]
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Write a corpus of synthetic leaflets.")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--workbooks", type=int, default=100)
+    parser.add_argument("--analytes", type=int, default=40)
+    parser.add_argument("--levels", type=int, default=6)
+    args = parser.parse_args(argv)
+    paths = write_synthetic_corpus(args.out_dir, args.workbooks, args.analytes, args.levels)
+    print(f"Wrote {len(paths)} leaflet(s) to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import async_parser
+from src.async_parser import iter_parse_async, parse_folder_async, parse_workbook_async, process_executor
+from src.parser import discover_workbooks, parse_folder
+
+
+def _make_folder(leaflet_factory, count: int = 4):
+    for idx in range(count):
+        path = leaflet_factory(f"leaflets/lot{idx}.xlsx", analytes=2 + idx, lot=f"31{idx:02d}")
+    return path.parent
+
+
+def test_async_folder_parse_matches_blocking_parse_and_keeps_the_loop_running(tmp_path, leaflet_factory):
+    folder = _make_folder(leaflet_factory)
+    expected = parse_folder(folder)
+
+    async def run(executor):
+        ticks = 0
+        stop = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not stop.is_set():
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticking = asyncio.create_task(ticker())
+        try:
+            results = await parse_folder_async(folder, executor=executor, max_concurrency=2)
+        finally:
+            stop.set()
+            await ticking
+        return results, ticks
+
+    results, ticks = asyncio.run(run(None))
+    assert [r.normalized_values for r in results] == [r.normalized_values for r in expected]
+    assert ticks > 1
+
+    with process_executor(max_workers=2) as pool:
+        results, _ = asyncio.run(run(pool))
+        single = asyncio.run(parse_workbook_async(folder / "lot0.xlsx", executor=pool))
+    assert [r.source_file for r in results] == [r.source_file for r in expected]
+    assert [r.normalized_values for r in results] == [r.normalized_values for r in expected]
+    assert single.normalized_values == expected[0].normalized_values
+
+
+def test_timeouts_bounded_concurrency_and_cancellation(tmp_path, leaflet_factory, monkeypatch):
+    folder = _make_folder(leaflet_factory)
+    sources = discover_workbooks(folder)
+    real_parse = async_parser.parse_source
+    release = threading.Event()
+    slow = "lot3.xlsx"
+    active = 0
+    peak = 0
+    started: list[str] = []
+    lock = threading.Lock()
+
+    def slow_parse(source, source_file=None):
+        nonlocal active, peak
+        with lock:
+            started.append(source_file)
+            active += 1
+            peak = max(peak, active)
+        try:
+            if source_file == slow:
+                release.wait(1.0)
+            else:
+                time.sleep(0.3)
+            return real_parse(source, source_file=source_file)
+        finally:
+            with lock:
+                active -= 1
+
+    monkeypatch.setattr(async_parser, "parse_source", slow_parse)
+
+    async def collect():
+        return [
+            (source.name, result)
+            async for source, result in iter_parse_async(
+                sources, executor=executor, max_concurrency=2, timeout=0.5, return_exceptions=True
+            )
+        ]
+
+    # Largest first: lot3, lot2, lot1, lot0. The slow file is started second and times
+    # out while lot1 runs; lot0 must still wait for a worker, not for the timeout.
+    slow = "lot2.xlsx"
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outcomes = dict(asyncio.run(collect()))
+    assert peak <= 2
+    assert isinstance(outcomes.pop("lot2.xlsx"), TimeoutError)
+    assert sorted(outcomes) == ["lot0.xlsx", "lot1.xlsx", "lot3.xlsx"]
+    slow = "lot3.xlsx"
+
+    async def first_only():
+        parsed = iter_parse_async(sources, executor=executor, max_concurrency=1)
+        async for source, _ in parsed:
+            await parsed.aclose()
+            return source
+
+    release.set()
+    started.clear()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert asyncio.run(first_only()) in sources
+    # Closing after the first result submits nothing further.
+    assert len(started) == 1
+
+    release.clear()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            with pytest.raises(TimeoutError, match="lot3.xlsx timed out"):
+                asyncio.run(parse_workbook_async(folder / "lot3.xlsx", executor=executor, timeout=0.05))
+        finally:
+            release.set()
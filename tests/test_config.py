@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+
+from src import config
+from src.config import XmlConfig
+
+
+def test_profiles_and_defaults_share_the_config_file(tmp_path, monkeypatch):
+    defaults_path = tmp_path / "config" / "gui_defaults.json"
+    monkeypatch.setattr(config, "_DEFAULT_PATH", defaults_path)
+
+    config.save_gui_defaults(XmlConfig(method_id="Default"))
+    # Profiles are edited by hand in the same file; saving defaults must keep them.
+    data = json.loads(defaults_path.read_text(encoding="utf-8"))
+    data["export_profiles"] = {
+        "Instrument A": {"method_id": "A", "sample_tube_types": ["EDTA", " "]},
+        "Instrument B": {"method_id": "B", "method_version": "2.0"},
+    }
+    defaults_path.write_text(json.dumps(data), encoding="utf-8")
+    config.save_gui_defaults(XmlConfig(method_id="Changed default"))
+
+    assert config.load_gui_defaults().method_id == "Changed default"
+    profiles = config.load_export_profiles()
+    assert list(profiles) == ["Instrument A", "Instrument B"]
+    assert profiles["Instrument A"].sample_tube_types == ["EDTA"]
+    assert profiles["Instrument B"].method_version == "2.0"
+
+
+def test_missing_keys_fall_back_to_field_defaults(tmp_path, monkeypatch):
+    defaults_path = tmp_path / "gui_defaults.json"
+    defaults_path.write_text(json.dumps({"export_profiles": {"Bare": {}}}), encoding="utf-8")
+    monkeypatch.setattr(config, "_DEFAULT_PATH", defaults_path)
+
+    assert config.load_gui_defaults() == XmlConfig()
+    assert config.load_export_profiles() == {"Bare": XmlConfig()}
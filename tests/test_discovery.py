@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from leaflets import write_synthetic_leaflet
+from src.parser import discover_workbooks, iter_parse_workbooks, largest_first, parse_folder
+
+
+def _archive(tmp_path):
+    root = tmp_path / "archive"
+    write_synthetic_leaflet(root / "top.xlsx")
+    write_synthetic_leaflet(root / "2024" / "serum" / "lv1.xlsx", analytes=3)
+    write_synthetic_leaflet(root / "2025" / "serum" / "lv1.xlsx", analytes=30, levels=8)
+    write_synthetic_leaflet(root / "2025" / "old" / "draft.xlsx")
+    (root / "2025" / "serum" / "~$lv1.xlsx").write_bytes(b"lock")
+    (root / "2025" / "notes.txt").write_text("not a workbook")
+    return root
+
+
+def test_discovery_recurses_and_applies_patterns(tmp_path):
+    root = _archive(tmp_path)
+
+    def relative(paths):
+        return [p.relative_to(root).as_posix() for p in paths]
+
+    assert relative(discover_workbooks(root)) == [
+        "2024/serum/lv1.xlsx",
+        "2025/old/draft.xlsx",
+        "2025/serum/lv1.xlsx",
+        "top.xlsx",
+    ]
+    assert relative(discover_workbooks(root, recursive=False)) == ["top.xlsx"]
+    assert relative(discover_workbooks(root, include=["2025/*"], exclude=["*/old/*"])) == ["2025/serum/lv1.xlsx"]
+
+
+def test_parallel_parse_is_largest_first_and_returns_sorted_results(tmp_path):
+    root = _archive(tmp_path)
+    paths = discover_workbooks(root)
+
+    assert largest_first(paths)[0] == root / "2025" / "serum" / "lv1.xlsx"
+    sequential = [path for path, _ in iter_parse_workbooks(paths, root=root)]
+    assert sequential == largest_first(paths)
+
+    serial = parse_folder(root, recursive=True)
+    parallel = parse_folder(root, recursive=True, max_workers=2)
+    assert [r.source_file for r in parallel] == [
+        "2024/serum/lv1.xlsx",
+        "2025/old/draft.xlsx",
+        "2025/serum/lv1.xlsx",
+        "top.xlsx",
+    ]
+    assert parallel == serial
+    assert {rec.source_file for rec in parallel[2].normalized_values} == {"2025/serum/lv1.xlsx"}
+    assert [r.source_file for r in parse_folder(root)] == ["top.xlsx"]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import itertools
+
+from src.filter_index import MeasurementIndex
+from src.models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+
+
+def _record(source: str, sample: str | None, analyte: str, unit: str | None, role: str) -> MeasurementRecord:
+    return MeasurementRecord(
+        source_file=source,
+        sample_label=sample,
+        sample_code=None,
+        unit=unit,
+        analyte_name=analyte,
+        group_name=None,
+        metric_role=role,
+        raw_value="1",
+        numeric_value=1.0,
+        value_status="ok",
+        sheet_row=1,
+        sheet_col=1,
+    )
+
+
+def _result(source: str, samples=("LV1", "LV2", None), units=("mg/L", None)) -> WorkbookParseResult:
+    records = [
+        _record(source, sample, analyte, unit, role)
+        for sample, analyte, unit, role in itertools.product(
+            samples, ("Retinol", "Tocopherol"), units, ("target", "range_low")
+        )
+    ]
+    return WorkbookParseResult(source_file=source, workbook_meta=WorkbookMeta(), normalized_values=records)
+
+
+def _scan(results, filters):
+    out = []
+    for result in sorted(results, key=lambda r: r.source_file):
+        for rec in result.normalized_values:
+            keys = {
+                "source_file": rec.source_file,
+                "sample_label": rec.sample_label or "",
+                "analyte_name": rec.analyte_name,
+                "unit": rec.unit or "",
+                "metric_role": rec.metric_role,
+            }
+            if all(not value or keys[name] == value for name, value in filters.items()):
+                out.append(rec)
+    return out
+
+
+def test_query_matches_linear_scan_for_filter_combinations():
+    results = [_result("b.xlsx"), _result("a.xlsx"), _result("c.xlsx", samples=("LV3",))]
+    index = MeasurementIndex()
+    index.upsert(results)
+
+    choices = {
+        "source_file": ("", "a.xlsx", "c.xlsx", "missing.xlsx"),
+        "sample_label": ("", "LV1", "LV3"),
+        "analyte_name": ("", "Retinol"),
+        "unit": ("", "mg/L"),
+        "metric_role": ("", "range_low"),
+    }
+    for combo in itertools.product(*choices.values()):
+        filters = dict(zip(choices.keys(), combo))
+        assert index.query(filters) == _scan(results, filters), filters
+
+
+def test_upsert_replaces_workbook_and_maintains_filter_values():
+    index = MeasurementIndex()
+    index.upsert([_result("a.xlsx"), _result("b.xlsx", samples=("LV9",))])
+    assert index.values("source_file") == ["a.xlsx", "b.xlsx"]
+    assert index.values("sample_label") == ["LV1", "LV2", "LV9"]
+    generation = index.generation
+
+    index.upsert([_result("b.xlsx", samples=("LV1",), units=("µg/L",))])
+    assert index.generation > generation
+    assert index.values("sample_label") == ["LV1", "LV2"]
+    assert index.values("unit") == ["mg/L", "µg/L"]
+    assert all(rec.unit == "µg/L" for rec in index.query({"source_file": "b.xlsx"}))
+    assert len(index.query({"sample_label": "LV1"})) == 8 + 4
+
+    index.remove("a.xlsx")
+    assert index.values("source_file") == ["b.xlsx"]
+    assert index.values("unit") == ["µg/L"]
+    assert len(index) == 4
+
+    index.clear()
+    assert len(index) == 0
+    assert index.values("analyte_name") == []
+    assert index.query({}) == []
+
+
+def test_sorted_queries_use_typed_keys_and_respect_filters():
+    def numeric(source: str, analyte: str, value: float | None, row: int) -> MeasurementRecord:
+        rec = _record(source, "LV1", analyte, "mg/L", "target")
+        rec.numeric_value = value
+        rec.raw_value = None if value is None else str(value)
+        rec.sheet_row = row
+        return rec
+
+    index = MeasurementIndex()
+    index.upsert(
+        [
+            WorkbookParseResult(
+                source_file="b.xlsx",
+                workbook_meta=WorkbookMeta(),
+                normalized_values=[
+                    numeric("b.xlsx", "Retinol", 10.0, 1),
+                    numeric("b.xlsx", "Zinc", 2.5, 2),
+                ],
+            ),
+            WorkbookParseResult(
+                source_file="a.xlsx",
+                workbook_meta=WorkbookMeta(),
+                normalized_values=[
+                    numeric("a.xlsx", "Retinol", 9.0, 3),
+                    numeric("a.xlsx", "Zinc", None, 4),
+                ],
+            ),
+        ]
+    )
+
+    by_value = index.query({}, sort_by="numeric_value")
+    assert [r.numeric_value for r in by_value] == [2.5, 9.0, 10.0, None]
+    # Blanks stay last in both directions.
+    assert [r.numeric_value for r in index.query({}, sort_by="numeric_value", descending=True)] == [
+        10.0,
+        9.0,
+        2.5,
+        None,
+    ]
+    # Typed keys: "10.0" sorts before "9.0" as text but after it as a number.
+    assert [r.raw_value for r in index.query({}, sort_by="raw_value")] == [None, "10.0", "2.5", "9.0"]
+    assert [r.sheet_row for r in index.query({"analyte_name": "Retinol"}, sort_by="numeric_value")] == [3, 1]
+    assert [r.source_file for r in index.query({"source_file": "b.xlsx"}, sort_by="analyte_name")] == [
+        "b.xlsx",
+        "b.xlsx",
+    ]
+
+    perm_before = index._permutation("numeric_value")
+    index.query({"analyte_name": "Zinc"}, sort_by="numeric_value")
+    assert index._permutation("numeric_value") is perm_before
+
+    index.remove("a.xlsx")
+    assert [r.numeric_value for r in index.query({}, sort_by="numeric_value")] == [2.5, 10.0]
+
+
+def test_sorted_queries_with_a_source_and_another_filter_stay_in_that_source():
+    results = [_result("a.xlsx"), _result("b.xlsx"), _result("c.xlsx")]
+    index = MeasurementIndex()
+    index.upsert(results)
+
+    # A sparse match (sorted by rank) and a dense one (filtered permutation).
+    for filters in (
+        {"source_file": "b.xlsx", "analyte_name": "Retinol", "unit": "mg/L"},
+        {"source_file": "b.xlsx", "metric_role": "target"},
+    ):
+        expected = _scan(results, filters)
+        for sort_by in ("sample_label", "numeric_value", "sheet_row"):
+            for descending in (False, True):
+                rows = index.query(filters, sort_by=sort_by, descending=descending)
+                assert sorted(map(repr, rows)) == sorted(map(repr, expected))
+    searched = index.query({"source_file": "c.xlsx", "text": "toco"}, sort_by="analyte_name", descending=True)
+    assert len(searched) == 12 and {rec.source_file for rec in searched} == {"c.xlsx"}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from src.log_sink import BufferedLogSink
+
+
+class _IdleRoot:
+    def __init__(self) -> None:
+        self.idle = []
+
+    def after_idle(self, func):
+        self.idle.append(func)
+        return f"idle#{len(self.idle)}"
+
+    def run_idle(self) -> None:
+        callbacks, self.idle = self.idle, []
+        for func in callbacks:
+            func()
+
+
+class _FakeText:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.calls: list[str] = []
+
+    def configure(self, **kwargs):
+        self.calls.append(f"configure:{kwargs.get('state')}")
+
+    def insert(self, index, chars):
+        self.calls.append("insert")
+        self.lines.extend(chars.splitlines())
+
+    def delete(self, index1, index2=None):
+        self.calls.append("delete")
+        first_kept = int(index2.split(".")[0]) - 1
+        del self.lines[:first_kept]
+
+    def see(self, index):
+        self.calls.append("see")
+
+
+def test_messages_are_batched_per_tick_and_capped():
+    root = _IdleRoot()
+    widget = _FakeText()
+    sink = BufferedLogSink(root, widget, max_lines=5)
+
+    for idx in range(8):
+        sink.write(f"warning {idx}")
+    assert widget.lines == []
+    assert len(root.idle) == 1
+
+    root.run_idle()
+    assert widget.calls.count("insert") == 1
+    assert widget.lines == [f"warning {idx}" for idx in range(3, 8)]
+    assert list(sink.lines) == widget.lines
+
+    sink.write("warning 8")
+    sink.write("warning 9")
+    root.run_idle()
+    assert widget.calls.count("insert") == 2
+    assert widget.lines == [f"warning {idx}" for idx in range(5, 10)]
+    assert list(sink.lines) == widget.lines
+
+
+def test_messages_are_mirrored_to_rotating_file(tmp_path):
+    root = _IdleRoot()
+    log_path = tmp_path / "logs" / "status.log"
+    sink = BufferedLogSink(root, _FakeText(), log_path=log_path, max_bytes=200, backup_count=2)
+
+    for idx in range(30):
+        sink.write(f"[WARN] leaflet {idx:02d}.xlsx: Metadata key 'Order No.' was not found.")
+    sink.close()
+
+    assert log_path.exists()
+    assert (tmp_path / "logs" / "status.log.1").exists()
+    assert not (tmp_path / "logs" / "status.log.3").exists()
+    assert "leaflet 29.xlsx" in log_path.read_text(encoding="utf-8")
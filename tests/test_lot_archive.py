@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import itertools
+from datetime import date
+
+from src.filter_index import MeasurementIndex
+from src.lot_archive import LotArchive
+from src.models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from src.stats import compute_statistics
+
+
+def _result(source: str, lot: str, scale: float = 1.0, analytes=("Retinol", "Tocopherol")) -> WorkbookParseResult:
+    records = []
+    for row, (sample, analyte, role) in enumerate(
+        itertools.product(("LV1", "LV2", None), analytes, ("target", "range_low", "range_sep")), start=1
+    ):
+        nd = row % 7 == 0
+        records.append(
+            MeasurementRecord(
+                source_file=source,
+                sample_label=sample,
+                sample_code=str(row % 3),
+                unit="µg/L",
+                analyte_name=analyte,
+                group_name="Vitamins A/E",
+                metric_role=role,
+                raw_value="n.d." if nd else ("-" if role == "range_sep" else str(row * scale)),
+                numeric_value=None if nd or role == "range_sep" else row * scale,
+                value_status="nd" if nd else ("separator" if role == "range_sep" else "ok"),
+                sheet_row=row,
+                sheet_col=3,
+            )
+        )
+    return WorkbookParseResult(
+        source_file=source,
+        workbook_meta=WorkbookMeta(lot_no=lot, exp_date=date(2027, 1, int(lot[-1]))),
+        normalized_values=records,
+        warnings=[f"{source}: checked"],
+    )
+
+
+def test_archive_round_trips_lots_and_answers_queries_from_columns(tmp_path):
+    results = [_result("a.xlsx", "3001"), _result("b.xlsx", "3002", scale=1.5)]
+    with LotArchive(tmp_path / "archive") as archive:
+        archive.append(results[:1])
+        archive.append(results[1:])
+        assert len(archive) == sum(len(result.normalized_values) for result in results)
+
+    index = MeasurementIndex()
+    index.upsert(results)
+    with LotArchive(tmp_path / "archive") as archive:
+        assert [lot.source_file for lot in archive.lots()] == ["a.xlsx", "b.xlsx"]
+        restored = archive.result("b.xlsx")
+        assert restored.normalized_values == results[1].normalized_values
+        assert restored.workbook_meta == results[1].workbook_meta
+        assert restored.warnings == ["b.xlsx: checked"]
+
+        for filters in (
+            {},
+            {"analyte_name": "Retinol"},
+            {"source_file": "b.xlsx", "sample_label": "LV2", "metric_role": "target"},
+            {"unit": "µg/L", "analyte_name": "Zinc"},
+        ):
+            assert archive.records(filters) == index.query(filters), filters
+            assert archive.count(filters) == len(index.query(filters))
+        assert archive.values("sample_label") == index.values("sample_label")
+        assert archive.values("metric_role") == index.values("metric_role")
+        assert list(archive.numeric_values({"analyte_name": "Retinol", "sample_label": "LV1"}))[:2] == [1.0, 2.0]
+        assert archive.statistics() == compute_statistics(results)
+        assert archive.statistics({"sample_label": "LV1"}) == [
+            stats for stats in compute_statistics(results) if stats.sample_label == "LV1"
+        ]
+
+
+def test_superseded_and_removed_lots_are_dropped_by_compaction(tmp_path):
+    path = tmp_path / "archive"
+    with LotArchive(path) as archive:
+        archive.append([_result("a.xlsx", "3001"), _result("b.xlsx", "3002", analytes=("Zinc",))])
+        archive.append([_result("a.xlsx", "3001", scale=2.0)])
+        assert archive.dead_rows == len(_result("a.xlsx", "3001").normalized_values)
+        assert archive.remove("b.xlsx")
+        assert not archive.remove("b.xlsx")
+        assert archive.values("analyte_name") == ["Retinol", "Tocopherol"]
+        assert archive.records({"source_file": "a.xlsx"})[0].numeric_value == 2.0
+        old_segments = sorted(item.name for item in path.iterdir() if item.is_dir())
+
+        archive.compact()
+        assert archive.dead_rows == 0
+        assert archive.result("a.xlsx").normalized_values == _result("a.xlsx", "3001", 2.0).normalized_values
+
+    segments = sorted(item.name for item in path.iterdir() if item.is_dir())
+    assert len(segments) == 1 and segments != old_segments
+    with LotArchive(path) as archive:
+        assert [lot.source_file for lot in archive.lots()] == ["a.xlsx"]
+        assert archive.lot("a.xlsx").start == 0
+        assert "Zinc" not in archive._strings("analyte_name")
+        assert archive.records({"analyte_name": "Zinc"}) == []
+
+
+def test_uncommitted_bytes_are_discarded_on_open(tmp_path):
+    path = tmp_path / "archive"
+    with LotArchive(path) as archive:
+        archive.append([_result("a.xlsx", "3001")])
+        expected = archive.records({})
+        segment = path / archive._segment
+
+    # Simulate a crash after column data was written but before the manifest was replaced.
+    for column in segment.glob("*.col"):
+        with open(column, "ab") as handle:
+            handle.write(b"\xff" * 24)
+    with open(segment / "analyte_name.dict", "ab") as handle:
+        handle.write(b"\x03\x00\x00\x00abc")
+
+    with LotArchive(path) as archive:
+        assert archive.records({}) == expected
+        archive.append([_result("b.xlsx", "3002")])
+        assert archive.records({"source_file": "b.xlsx"}) == _result("b.xlsx", "3002").normalized_values
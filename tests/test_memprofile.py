@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from leaflets import write_synthetic_corpus
+from src import memprofile
+from src.memprofile import check_regressions, load_baseline, main, profile_corpus, save_baseline
+
+
+def test_profile_reports_phases_and_regressions(tmp_path):
+    paths = write_synthetic_corpus(tmp_path / "corpus", workbooks=2, analytes=5, levels=2)
+    report = profile_corpus("synthetic x2", paths, top=5)
+
+    assert report.workbooks == 2
+    assert report.records == 2 * 5 * 2 * 4
+    parse, export = report.phases["parse"], report.phases["export"]
+    assert parse.peak_bytes > 0 and parse.retained_bytes > 0
+    assert export.peak_bytes > 0
+    assert any("parser.py" in site for site, _ in parse.top_sites)
+    assert report.metrics()["bytes_per_record"] == parse.retained_bytes / report.records
+
+    baseline_path = tmp_path / "baseline.json"
+    save_baseline([report], baseline_path)
+    thresholds, tolerance = load_baseline(baseline_path)
+    assert set(thresholds) == set(report.metrics())
+    assert check_regressions([report], thresholds, tolerance) == []
+
+    tight = {key: value / 2 for key, value in thresholds.items()}
+    failures = check_regressions([report], tight, tolerance=0.0)
+    assert len(failures) == 3
+    assert failures[0].startswith("synthetic x2: parse_peak_bytes_per_workbook")
+    assert load_baseline(tmp_path / "missing.json") == ({}, 0.25)
+
+
+def test_main_profiles_each_folder_it_is_given(tmp_path, capsys):
+    write_synthetic_corpus(tmp_path / "a", workbooks=1, analytes=3, levels=1)
+    write_synthetic_corpus(tmp_path / "b", workbooks=2, analytes=3, levels=1)
+    (tmp_path / "empty").mkdir()
+
+    baseline = tmp_path / "baseline.json"
+    assert main([str(tmp_path / name) for name in ("a", "b", "empty")] + ["--baseline", str(baseline)]) == 0
+    out = capsys.readouterr()
+    assert "1 workbooks" in out.out and "2 workbooks" in out.out
+    assert "No leaflets" in out.err
+
+
+def test_rss_sampler_reads_a_size_on_this_platform(monkeypatch):
+    rss = memprofile._current_rss()
+    assert isinstance(rss, int) and rss > 0
+
+    # Without /proc the sampler falls back to the platform's peak counters.
+    def no_proc(*args, **kwargs):
+        raise OSError("no /proc")
+
+    monkeypatch.setattr(memprofile, "open", no_proc, raising=False)
+    peak = memprofile._current_rss()
+    assert isinstance(peak, int) and peak > 0
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.config import XmlConfig
+from src.metrics import METRICS, METRICS_FILE_ENV, MetricsRegistry, warning_type
+from src.parser import parse_folder, parse_workbook
+from src.xml_exporter import write_consolidated_addon_xml
+
+
+@pytest.fixture
+def metrics():
+    enabled = METRICS.enabled
+    METRICS.enabled = True
+    METRICS.reset()
+    yield METRICS
+    METRICS.enabled = enabled
+    METRICS.reset()
+
+
+def test_registry_counts_and_exports_snapshots(tmp_path):
+    disabled = MetricsRegistry()
+    disabled.inc("workbooks_parsed_total")
+    disabled.observe("parse_seconds", 0.2)
+    assert disabled.snapshot()["counters"] == {} and disabled.snapshot()["histograms"] == {}
+
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("workbooks_parsed_total")
+    registry.inc("workbooks_parsed_total", 2)
+    registry.inc("warnings_total", type='no "substance" row')
+    for seconds in (0.004, 0.2, 0.2, 120.0):
+        registry.observe("parse_seconds", seconds)
+    assert registry.counter_value("workbooks_parsed_total") == 3
+
+    text = registry.to_prometheus()
+    assert "# TYPE leaflet_parser_workbooks_parsed_total counter\nleaflet_parser_workbooks_parsed_total 3\n" in text
+    assert 'leaflet_parser_warnings_total{type="no \\"substance\\" row"} 1' in text
+    assert 'leaflet_parser_parse_seconds_bucket{le="0.005"} 1' in text
+    assert 'leaflet_parser_parse_seconds_bucket{le="0.25"} 3' in text
+    assert 'leaflet_parser_parse_seconds_bucket{le="+Inf"} 4' in text
+    assert "leaflet_parser_parse_seconds_count 4" in text
+
+    merged = MetricsRegistry(enabled=True)
+    merged.merge(registry.snapshot())
+    merged.merge(registry.snapshot())
+    assert merged.counter_value("workbooks_parsed_total") == 6
+    assert 'leaflet_parser_parse_seconds_bucket{le="0.25"} 6' in merged.to_prometheus()
+
+    prom = registry.write_snapshot(tmp_path / "textfile" / "leaflet.prom")
+    assert prom.read_text(encoding="utf-8") == text
+    data = json.loads(registry.write_snapshot(tmp_path / "leaflet.json").read_text(encoding="utf-8"))
+    assert data["counters"]["workbooks_parsed_total"] == [{"labels": {}, "value": 3}]
+    assert data["histograms"]["parse_seconds"][0]["count"] == 4
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["leaflet.json", "textfile"]
+
+    assert warning_type("No 'Substance' row found.") == "no_substance_row_found"
+
+
+def test_parse_and_export_feed_the_registry(tmp_path, leaflet_factory, metrics, monkeypatch):
+    for idx in range(3):
+        leaflet_factory(f"leaflets/lot{idx}.xlsx", analytes=3, levels=2, lot=f"31{idx:02d}")
+    (tmp_path / "leaflets" / "broken.xlsx").write_bytes(b"not a workbook")
+
+    results = [parse_workbook(path) for path in sorted((tmp_path / "leaflets").glob("lot*"))]
+    with pytest.raises(Exception):
+        parse_workbook(tmp_path / "leaflets" / "broken.xlsx")
+    assert metrics.counter_value("workbooks_parsed_total") == 3
+    assert metrics.counter_value("workbooks_failed_total") == 1
+    assert metrics.counter_value("records_emitted_total") == sum(len(r.normalized_values) for r in results)
+    assert metrics.counter_value("cells_read_total") == sum(len(r.raw_cells) for r in results)
+
+    monkeypatch.setenv(METRICS_FILE_ENV, str(tmp_path / "metrics.prom"))
+    out_path = write_consolidated_addon_xml(results, XmlConfig(), tmp_path / "out")
+    assert metrics.counter_value("exports_total") == 1
+    assert metrics.counter_value("export_bytes_written_total") == out_path.stat().st_size
+    assert "leaflet_parser_export_seconds_count 1" in (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+
+    # Worker processes report their counts back to the parent registry.
+    metrics.reset()
+    (tmp_path / "leaflets" / "broken.xlsx").unlink()
+    parse_folder(tmp_path / "leaflets", max_workers=2)
+    assert metrics.counter_value("workbooks_parsed_total") == 3
+    assert metrics.counter_value("records_emitted_total") == sum(len(r.normalized_values) for r in results)
+    assert "leaflet_parser_folder_parse_seconds_count 1" in (tmp_path / "metrics.prom").read_text(encoding="utf-8")
@@ -11,7 +11,7 @@ def test_outlier_sheet_name_is_handled():
     )
     assert result.normalized_values
 
-    sheet_names = {cell.sheet_name.lower() for cell in result.raw_cells}
+    sheet_names = {name.lower() for name in result.raw_cells.sheet_names}
     assert any("sorted by column" in name for name in sheet_names)
     assert any("sorted by rows" in name for name in sheet_names)
 
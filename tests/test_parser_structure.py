@@ -12,6 +12,6 @@ def test_parse_all_workbooks(parsed_results, workbook_paths):
 
 
 def test_raw_cells_include_version_sheet_when_present(parsed_results):
-    with_version = [r for r in parsed_results if any(c.sheet_name == "Version" for c in r.raw_cells)]
+    with_version = [r for r in parsed_results if "Version" in r.raw_cells.sheet_names]
     assert with_version, "Expected at least one workbook with a Version sheet in raw capture."
 
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import gc
+import json
+import threading
+
+import pytest
+
+from src import parser
+from src.config import XmlConfig
+from src.models import WorkbookParseResult
+from src.parser import parse_folder
+from src.pipeline import export_folder_streaming
+from src.xml_exporter import write_consolidated_addon_xml
+
+
+def _live_results() -> int:
+    return sum(isinstance(obj, WorkbookParseResult) for obj in gc.get_objects())
+
+
+def test_streaming_export_matches_batch_export_and_holds_one_result(tmp_path, leaflet_factory, monkeypatch):
+    # Larger leaflets are parsed first; their sample codes and analyte casing must not win over lot0's.
+    for idx in range(5):
+        leaflet_factory(
+            f"leaflets/lot{idx}.xlsx",
+            analytes=2 + idx,
+            lot=f"31{idx:02d}",
+            first_code=36 + 10 * idx,
+            analyte_prefix="Analyte" if idx == 0 else "ANALYTE",
+        )
+    folder = tmp_path / "leaflets"
+    cfg = XmlConfig(method_id="Method A")
+    results = parse_folder(folder)
+    expected = write_consolidated_addon_xml(results, cfg, tmp_path / "batch").read_text(encoding="utf-8")
+    record_count = sum(len(result.normalized_values) for result in results)
+    del results
+    assert "<AssayRef>36</AssayRef>" in expected and ">Analyte 1<" in expected
+
+    baseline = _live_results()
+    live: list[int] = []
+    real_parse = parser.parse_workbook
+
+    def counting_parse(*args, **kwargs):
+        # No earlier result may still be alive while the next workbook is parsed.
+        live.append(_live_results() - baseline)
+        return real_parse(*args, **kwargs)
+
+    monkeypatch.setattr(parser, "parse_workbook", counting_parse)
+    seen: list[str] = []
+    report = export_folder_streaming(
+        folder, cfg, tmp_path / "stream", prefetch_depth=2, on_result=lambda result: seen.append(result.source_file)
+    )
+    monkeypatch.undo()
+    assert report.out_path == tmp_path / "stream" / "consolidated.xml"
+    assert report.out_path.read_text(encoding="utf-8") == expected
+    assert (report.workbooks, report.records) == (5, record_count)
+    assert sorted(seen) == [f"lot{idx}.xlsx" for idx in range(5)]
+    assert len(live) == 5 and max(live) == 0
+
+    pooled = export_folder_streaming(folder, cfg, tmp_path / "pooled", max_workers=2)
+    assert pooled.out_path.read_text(encoding="utf-8") == expected
+
+    sharded = export_folder_streaming(folder, cfg, tmp_path / "shards", shard_by="size", max_analytes=10_000)
+    manifest = json.loads(sharded.out_path.read_text(encoding="utf-8"))
+    assert [shard["file"] for shard in manifest["shards"]] == ["consolidated-0001-0001.xml"]
+
+    with pytest.raises(ValueError):
+        export_folder_streaming(folder, cfg, tmp_path / "bad", shard_by="lot")
+
+
+def test_streaming_export_with_a_prefetch_budget_for_one_workbook(tmp_path, leaflet_factory):
+    for idx in range(3):
+        leaflet_factory(f"leaflets/lot{idx}.xlsx", analytes=4, lot=f"31{idx:02d}")
+    folder = tmp_path / "leaflets"
+    largest = max(path.stat().st_size for path in folder.iterdir())
+    outcome = {}
+
+    def run() -> None:
+        outcome["report"] = export_folder_streaming(
+            folder, XmlConfig(), tmp_path / "out", prefetch_depth=4, prefetch_bytes=largest * 3 // 2
+        )
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "streaming export stalled"
+    assert outcome["report"].workbooks == 3
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+import time
+import zipfile
+
+import pytest
+
+from src.parser import parse_folder
+from src.prefetch import ReadAhead
+
+
+def test_read_ahead_respects_depth_and_byte_limits():
+    sizes = {f"s{idx}": 40 for idx in range(12)}
+    sizes["huge"] = 500
+    sizes["broken"] = 10
+    reads: list[str] = []
+    lead: list[int] = []
+    consumed = 0
+    lock = threading.Lock()
+
+    def read(name: str) -> bytes:
+        if name == "broken":
+            raise OSError("share went away")
+        with lock:
+            # Buffers read but not yet handed out, including this one.
+            lead.append(len(reads) + 1 - consumed)
+            reads.append(name)
+        return b"x" * sizes[name]
+
+    order = ["huge", *[f"s{idx}" for idx in range(6)], "broken", *[f"s{idx}" for idx in range(6, 12)]]
+    reader = ReadAhead(order, read, sizes.__getitem__, depth=3, max_bytes=100)
+    out = []
+    for source, data in reader:
+        out.append((source, None if data is None else len(data)))
+        with lock:
+            consumed += data is not None
+    assert [source for source, _ in out] == order
+    assert dict(out)["huge"] is None and dict(out)["broken"] is None
+    assert all(size == 40 for source, size in out if source.startswith("s"))
+    assert "huge" not in reads
+    assert max(lead) <= 3 + 1
+    assert reader.peak_bytes <= 100
+
+    with pytest.raises(ValueError):
+        ReadAhead(order, read, sizes.__getitem__, depth=0)
+
+
+def test_budget_for_one_file_does_not_stall_a_slow_consumer():
+    consumed: list[int] = []
+
+    def consume() -> None:
+        reader = ReadAhead(range(6), lambda idx: bytes(60), lambda idx: 60, depth=4, max_bytes=100)
+        for idx, data in reader:
+            time.sleep(0.01)  # parsing is slower than reading
+            consumed.append(len(data))
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "read-ahead deadlocked"
+    assert consumed == [60] * 6
+
+
+def test_closing_early_stops_the_reader_thread():
+    reader = ReadAhead(range(100), lambda idx: bytes(10), lambda idx: 10, depth=2)
+    with reader:
+        for idx, _ in reader:
+            if idx == 3:
+                break
+    reader._thread.join(timeout=5)
+    assert not reader._thread.is_alive()
+
+
+def test_prefetched_folder_and_archive_imports_match_direct_reads(tmp_path, leaflet_factory):
+    folder = tmp_path / "leaflets"
+    for idx in range(4):
+        leaflet_factory(f"leaflets/lot{idx}.xlsx", lot=f"31{idx:02d}")
+    bundle = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle, "w") as archive:
+        for path in sorted(folder.iterdir()):
+            archive.write(path, f"leaflets/{path.name}")
+
+    for source in (folder, bundle):
+        direct = parse_folder(source, prefetch_depth=0)
+        prefetched = parse_folder(source, prefetch_depth=2, prefetch_bytes=1)
+        buffered = parse_folder(source, prefetch_depth=2)
+        assert [r.source_file for r in buffered] == [r.source_file for r in direct]
+        for results in (prefetched, buffered):
+            assert [r.normalized_values for r in results] == [r.normalized_values for r in direct]
+            assert [r.workbook_meta for r in results] == [r.workbook_meta for r in direct]
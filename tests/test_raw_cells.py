@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from src.models import RawCellGrid, RawCellRecord
+from src.parser import parse_workbook
+
+
+def test_parser_captures_raw_cells_in_sparse_grid(leaflet_factory):
+    result = parse_workbook(leaflet_factory(analytes=3))
+
+    grid = result.raw_cells
+    assert isinstance(grid, RawCellGrid)
+    assert grid.sheet_names == ["Leaflet sorted by rows", "Leaflet sorted by column", "Version"]
+    assert grid.get("Version", 1, 2) == RawCellRecord("Version", 1, 2, "1.5", "float")
+    assert grid.get("Leaflet sorted by rows", 7, 1).raw_value == "Substance"
+    assert grid.get("Leaflet sorted by rows", 2, 1) is None
+    assert grid.get("Missing", 1, 1) is None
+
+    cells = list(grid)
+    assert len(cells) == len(grid)
+    assert all(isinstance(cell, RawCellRecord) for cell in cells)
+    assert {cell.sheet_name for cell in cells} == set(grid.sheet_names)
+
+
+def test_grid_round_trips_records_and_interns_values():
+    records = [
+        RawCellRecord("Sheet", 1, 1, "Retinol", "str"),
+        RawCellRecord("Sheet", 2, 1, "Retinol", "str"),
+        RawCellRecord("Other", 1, 16384, None, None),
+    ]
+    grid = RawCellGrid.from_records(records)
+
+    assert list(grid) == records
+    assert grid == records
+    _, _, _, _, values, types, strings = grid.columns()
+    assert values[0] == values[1]
+    assert strings.count("Retinol") == 1
+    assert grid.get("Other", 1, 16384) == records[2]
+
+    grid.add("Other", 3, 2, "0.5", "float")
+    assert grid.get("Other", 3, 2).raw_value == "0.5"
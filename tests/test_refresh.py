@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from src.refresh import RefreshScheduler
+
+
+class _ManualRoot:
+    def __init__(self) -> None:
+        self._next_id = 0
+        self.pending: dict[str, object] = {}
+
+    def after(self, ms, func):
+        self._next_id += 1
+        after_id = f"after#{self._next_id}"
+        self.pending[after_id] = func
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def tick(self) -> None:
+        callbacks, self.pending = list(self.pending.values()), {}
+        for func in callbacks:
+            func()
+
+    def settle(self, max_ticks: int = 100) -> None:
+        for _ in range(max_ticks):
+            if not self.pending:
+                return
+            self.tick()
+        raise AssertionError("scheduler did not settle")
+
+
+def test_bursts_coalesce_and_unchanged_state_is_skipped():
+    root = _ManualRoot()
+    state = {"key": (1, ("",))}
+    renders = []
+    scheduler = RefreshScheduler(
+        root, state_key=lambda: state["key"], render=lambda: renders.append(state["key"])
+    )
+
+    for _ in range(10):
+        scheduler.request()
+    root.settle()
+    assert renders == [(1, ("",))]
+
+    scheduler.request()
+    root.settle()
+    assert len(renders) == 1
+
+    scheduler.request(force=True)
+    root.settle()
+    assert len(renders) == 2
+
+    state["key"] = (2, ("LV1",))
+    scheduler.request()
+    root.settle()
+    assert renders[-1] == (2, ("LV1",))
+
+
+def test_stale_chunked_render_is_cancelled():
+    root = _ManualRoot()
+    state = {"key": "a"}
+    finished = []
+    closed = []
+
+    def render():
+        key = state["key"]
+        try:
+            for _ in range(5):
+                yield
+            finished.append(key)
+        except GeneratorExit:
+            closed.append(key)
+            raise
+
+    scheduler = RefreshScheduler(root, state_key=lambda: state["key"], render=render)
+    scheduler.request()
+    root.tick()
+    root.tick()
+    assert scheduler.busy
+
+    state["key"] = "b"
+    scheduler.request()
+    root.settle()
+
+    assert closed == ["a"]
+    assert finished == ["b"]
+    assert not scheduler.busy
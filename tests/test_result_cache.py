@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import pytest
+
+from src.config import XmlConfig
+from src.filter_index import MeasurementIndex, merge_queries
+from src.models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from src.parser import parse_workbook
+from src.result_cache import MEMORY_BUDGET_ENV, ResultCache, estimate_result_bytes, memory_budget_from_env
+from src.xml_exporter import aggregate_results, render_consolidated_addon_xml
+
+
+def test_least_recently_used_results_are_paged_out_and_rehydrated(tmp_path, leaflet_factory):
+    results = [
+        parse_workbook(leaflet_factory(f"lv{idx}.xlsx", analytes=3 + idx, lot=f"31{idx:02d}")) for idx in range(4)
+    ]
+    sizes = [estimate_result_bytes(result) for result in results]
+    # Room for the two largest results, not for three.
+    cache = ResultCache(budget_bytes=sizes[2] + sizes[3] + 1, spill_dir=tmp_path / "spill")
+
+    assert cache.upsert(results[:2]) == []
+    cache.touch("lv0.xlsx")
+    assert cache.upsert([results[2]]) == ["lv1.xlsx"]
+    assert cache.upsert([results[3]]) == ["lv0.xlsx"]
+    assert cache.resident_sources() == ["lv2.xlsx", "lv3.xlsx"]
+    assert cache.resident_bytes == sizes[2] + sizes[3]
+    assert len(list((tmp_path / "spill").glob("*.wire"))) == 2
+
+    # Summaries and the aggregation cover evicted workbooks without reloading them.
+    assert cache.summary("lv0.xlsx").record_count == len(results[0].normalized_values)
+    assert cache.summary("lv1.xlsx").workbook_meta == results[1].workbook_meta
+    cfg = XmlConfig()
+    expected_xml = render_consolidated_addon_xml(aggregate_results(results), cfg)
+    assert render_consolidated_addon_xml(cache.aggregation(), cfg) == expected_xml
+
+    rehydrated, evicted = cache.get("lv1.xlsx")
+    assert rehydrated.normalized_values == results[1].normalized_values
+    assert rehydrated.raw_cells == results[1].raw_cells
+    assert evicted == ["lv2.xlsx"]
+    assert [result.source_file for result in cache.iter_results()] == [f"lv{idx}.xlsx" for idx in range(4)]
+    assert cache.resident_sources() == ["lv1.xlsx", "lv3.xlsx"]
+
+    # A single result larger than the budget still stays resident.
+    tiny = ResultCache(budget_bytes=1)
+    assert tiny.upsert(results[:2]) == ["lv0.xlsx"]
+    assert tiny.resident_sources() == ["lv1.xlsx"]
+    tiny.close()
+
+    cache.remove("lv2.xlsx")
+    cache.clear()
+    assert len(cache) == 0 and cache.resident_bytes == 0
+    assert cache.paged_out_records({}) == []
+    cache.close()
+    assert list((tmp_path / "spill").iterdir()) == []
+
+
+def test_paged_out_records_complete_index_queries(tmp_path, leaflet_factory, monkeypatch):
+    results = [
+        parse_workbook(leaflet_factory(f"lv{idx}.xlsx", analytes=3 + idx, lot=f"31{idx:02d}")) for idx in range(4)
+    ]
+    everything = MeasurementIndex()
+    everything.upsert(results)
+    cache = ResultCache(budget_bytes=estimate_result_bytes(results[3]) + 1, spill_dir=tmp_path / "spill")
+    resident = MeasurementIndex()
+    resident.upsert(results)
+    for source_file in cache.upsert(results):
+        resident.remove(source_file)
+    assert cache.paged_out_sources() == ["lv0.xlsx", "lv1.xlsx", "lv2.xlsx"]
+    assert set(resident.values("analyte_name")) | set(cache.paged_out_values("analyte_name")) == set(
+        everything.values("analyte_name")
+    )
+
+    # Views are answered by the store; no spill file is decoded.
+    def no_spill_reads(entry):
+        raise AssertionError("spill file decoded")
+
+    monkeypatch.setattr(cache, "_read_spill", no_spill_reads)
+
+    analyte = results[0].normalized_values[0].analyte_name
+    sorts = [(None, False), ("numeric_value", False), ("numeric_value", True), ("unit", True)]
+    views = [
+        {},
+        {"analyte_name": analyte},
+        {"metric_role": "target", "text": analyte[:3].upper()},
+        {"source_file": "lv1.xlsx", "unit": results[1].normalized_values[0].unit or ""},
+    ]
+    for filters in views:
+        for sort_by, descending in sorts:
+            expected = everything.query(filters, sort_by, descending)
+            paged_out = cache.paged_out_records(filters, sort_by, descending)
+            merged = merge_queries(resident.query(filters, sort_by, descending), paged_out, sort_by, descending)
+            assert merged == expected, (filters, sort_by, descending)
+            assert cache.paged_out_count(filters) == len(paged_out)
+            # A page of paged-out rows is a prefix of the merged view up to its last row.
+            page = cache.paged_out_records(filters, sort_by, descending, limit=5)
+            assert page == paged_out[:5]
+    # Querying does not make a workbook resident; rehydrating one takes it out of the store.
+    assert cache.resident_sources() == ["lv3.xlsx"]
+    monkeypatch.undo()
+    cache.get("lv1.xlsx")
+    assert "lv1.xlsx" not in {rec.source_file for rec in cache.paged_out_records({})}
+    cache.close()
+
+
+def test_aggregation_does_not_depend_on_recency():
+    def result(source: str, code: str, name: str) -> WorkbookParseResult:
+        record = MeasurementRecord(
+            source_file=source,
+            sample_label="S1",
+            sample_code=code,
+            unit="mg/L",
+            analyte_name=name,
+            group_name="Vitamins",
+            metric_role="target",
+            raw_value="1.0",
+            numeric_value=1.0,
+            value_status="ok",
+            sheet_row=10,
+            sheet_col=5,
+        )
+        return WorkbookParseResult(source_file=source, workbook_meta=WorkbookMeta(), normalized_values=[record])
+
+    results = [result("a.xlsx", "11", "Retinol"), result("b.xlsx", "22", "RETINOL")]
+    cfg = XmlConfig()
+    expected = render_consolidated_addon_xml(aggregate_results(results), cfg)
+    cache = ResultCache()
+    cache.upsert(results[::-1])
+    assert render_consolidated_addon_xml(cache.aggregation(), cfg) == expected
+    cache.touch("a.xlsx")
+    assert render_consolidated_addon_xml(cache.aggregation(), cfg) == expected
+    assert "<AssayRef>11</AssayRef>" in expected
+
+
+def test_memory_budget_from_env(monkeypatch):
+    monkeypatch.delenv(MEMORY_BUDGET_ENV, raising=False)
+    assert memory_budget_from_env() is None
+    monkeypatch.setenv(MEMORY_BUDGET_ENV, "1.5")
+    assert memory_budget_from_env() == 1536 * 1024
+    for value in ("0", "lots"):
+        monkeypatch.setenv(MEMORY_BUDGET_ENV, value)
+        assert memory_budget_from_env() is None
+    with pytest.raises(ValueError):
+        ResultCache(budget_bytes=0)
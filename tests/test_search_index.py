@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from src.filter_index import TEXT_FILTER, MeasurementIndex
+from src.models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from src.search_index import TrigramIndex
+
+
+def _record(source: str, analyte: str, sample: str, code: str | None, group: str | None, raw: str):
+    return MeasurementRecord(
+        source_file=source,
+        sample_label=sample,
+        sample_code=code,
+        unit="mg/L",
+        analyte_name=analyte,
+        group_name=group,
+        metric_role="target",
+        raw_value=raw,
+        numeric_value=None,
+        value_status="text",
+        sheet_row=1,
+        sheet_col=1,
+    )
+
+
+def _result(source: str, records) -> WorkbookParseResult:
+    return WorkbookParseResult(source_file=source, workbook_meta=WorkbookMeta(), normalized_values=records)
+
+
+def _ids(bitmap: int) -> list[int]:
+    return [idx for idx in range(bitmap.bit_length()) if bitmap >> idx & 1]
+
+
+def test_substring_search_covers_all_searchable_fields():
+    records = [
+        _record("a.xlsx", "all-trans-Retinol", "Control LV1", "0036", "Vitamins A/E", "0.52"),
+        _record("a.xlsx", "alpha-Tocopherol", "Control LV1", "0036", "Vitamins A/E", "n.d."),
+        _record("a.xlsx", "Clozapine", "Calibrator 3", "92028", "Neuroleptics", "152.4"),
+    ]
+    index = TrigramIndex()
+    index.add_records(0, records)
+
+    assert _ids(index.bitmap("RETINOL", 3)) == [0]
+    assert _ids(index.bitmap("vitamins", 3)) == [0, 1]
+    assert _ids(index.bitmap("9202", 3)) == [2]
+    assert _ids(index.bitmap("n.d", 3)) == [1]
+    assert _ids(index.bitmap("5", 3)) == [0, 2]
+    assert _ids(index.bitmap("xyz", 3)) == []
+    assert _ids(index.bitmap("toco", 3)) == [1]
+
+    index.add_records(3, [_record("b.xlsx", "13-cis-Retinol", "Control LV2", None, None, "1.1")])
+    assert _ids(index.bitmap("retinol", 4)) == [0, 3]
+
+
+def test_text_filter_combines_with_other_filters_and_upserts():
+    index = MeasurementIndex()
+    index.upsert(
+        [
+            _result("a.xlsx", [_record("a.xlsx", "Retinol", "LV1", "1", "Vit", "0.5")]),
+            _result("b.xlsx", [_record("b.xlsx", "Retinol", "LV2", "1", "Vit", "0.7")]),
+        ]
+    )
+
+    assert [r.source_file for r in index.query({TEXT_FILTER: "retin"})] == ["a.xlsx", "b.xlsx"]
+    assert [r.sample_label for r in index.query({TEXT_FILTER: "retin", "sample_label": "LV2"})] == ["LV2"]
+
+    index.upsert([_result("a.xlsx", [_record("a.xlsx", "Tocopherol", "LV1", "1", "Vit", "0.5")])])
+    assert [r.source_file for r in index.query({TEXT_FILTER: "retin"})] == ["b.xlsx"]
+    assert [r.analyte_name for r in index.query({TEXT_FILTER: "tocoph"})] == ["Tocopherol"]
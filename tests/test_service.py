@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+from contextlib import contextmanager
+
+import pytest
+
+from src.config import XmlConfig
+from src.parser import parse_workbook
+from src.service import ParseService, make_server
+from src.store import MeasurementStore
+from src.xml_exporter import build_consolidated_addon_xml
+
+
+@contextmanager
+def _running(service, **kwargs):
+    server = make_server(service, port=0, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
+
+
+def _request(base, method, path, body=None):
+    request = urllib.request.Request(base + path, data=body, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers["Content-Type"], exc.read()
+
+
+def test_service_parses_paths_and_uploads_and_keeps_the_session_aggregation(tmp_path, leaflet_factory):
+    first = leaflet_factory("lv1.xlsx", analytes=3, lot="3101")
+    second = leaflet_factory("lv2.xlsx", analytes=5, lot="3102")
+    cfg = XmlConfig(method_id="Method", method_version="2.0")
+    service = ParseService(cfg=cfg, roots=[tmp_path])
+
+    with _running(service) as server:
+        base = "http://127.0.0.1:{}".format(server.server_address[1])
+        status, content_type, body = _request(base, "POST", f"/parse?path={first}")
+        assert status == 200 and content_type == "application/json"
+        payload = json.loads(body)["results"][0]
+        expected = parse_workbook(first)
+        assert payload["source_file"] == "lv1.xlsx"
+        assert payload["workbook_meta"]["lot_no"] == expected.workbook_meta.lot_no
+        assert len(payload["records"]) == len(expected.normalized_values)
+        assert payload["records"][0]["analyte_name"] == expected.normalized_values[0].analyte_name
+
+        status, content_type, body = _request(
+            base, "POST", "/parse?name=lv2.xlsx&format=xml&method_version=3.0", second.read_bytes()
+        )
+        assert status == 200 and content_type.startswith("application/xml")
+        override = XmlConfig(method_id="Method", method_version="3.0")
+        single = build_consolidated_addon_xml([parse_workbook(second)], override)
+        assert body.decode("utf-8") == single
+
+        # Re-submitting a workbook replaces it; keep=0 leaves the session alone.
+        _request(base, "POST", f"/parse?path={first}")
+        _request(base, "POST", "/parse?name=scratch.xlsx&keep=0", first.read_bytes())
+        status, _, body = _request(base, "GET", "/workbooks")
+        assert json.loads(body)["workbooks"] == ["lv1.xlsx", "lv2.xlsx"]
+
+        status, _, body = _request(base, "GET", "/consolidated.xml")
+        both = build_consolidated_addon_xml([parse_workbook(first), parse_workbook(second)], cfg)
+        assert status == 200 and body.decode("utf-8") == both
+
+        health = json.loads(_request(base, "GET", "/health")[2])
+        assert health["status"] == "ok" and health["workbooks"] == 2
+
+        assert _request(base, "POST", f"/parse?path={tmp_path / 'missing.xlsx'}")[0] == 404
+        status, _, body = _request(base, "POST", "/parse?name=broken.xlsx", b"not a workbook")
+        assert status == 422 and "error" in json.loads(body)
+        assert _request(base, "POST", "/parse")[0] == 400
+        assert _request(base, "GET", "/nope")[0] == 404
+
+        assert _request(base, "DELETE", "/workbooks?source_file=lv1.xlsx")[0] == 200
+        assert json.loads(_request(base, "DELETE", "/workbooks")[2]) == {"workbooks": []}
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets not available")
+def test_service_listens_on_a_unix_socket(tmp_path, leaflet_factory):
+    path = leaflet_factory("lv1.xlsx")
+    socket_path = tmp_path / "parser.sock"
+
+    with _running(ParseService(cfg=XmlConfig(), roots=[tmp_path]), socket_path=socket_path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(socket_path))
+        connection = http.client.HTTPConnection("localhost")
+        connection.sock = sock
+        connection.request("POST", f"/parse?path={path}")
+        response = connection.getresponse()
+        assert response.status == 200
+        assert json.loads(response.read())["results"][0]["source_file"] == "lv1.xlsx"
+        connection.close()
+    assert not socket_path.exists()
+
+
+def _raw_request(server, path, headers, body=b""):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+    connection.putrequest("POST", path, skip_host="Host" in headers)
+    for name, value in headers.items():
+        connection.putheader(name, value)
+    connection.endheaders(body or None)
+    response = connection.getresponse()
+    status = response.status
+    response.read()
+    connection.close()
+    return status
+
+
+def test_service_refuses_browsers_foreign_hosts_paths_outside_roots_and_missing_tokens(tmp_path, leaflet_factory):
+    inside = leaflet_factory("data/lv1.xlsx")
+    outside = leaflet_factory("elsewhere/lv2.xlsx")
+    service = ParseService(cfg=XmlConfig(), roots=[tmp_path / "data"])
+
+    with _running(service) as server:
+        assert _raw_request(server, f"/parse?path={inside}", {}) == 200
+        assert _raw_request(server, f"/parse?path={inside}", {"Host": "localhost:8765"}) == 200
+        assert _raw_request(server, f"/parse?path={inside}", {"Origin": "http://127.0.0.1"}) == 403
+        assert _raw_request(server, f"/parse?path={inside}", {"Host": "evil.example:8765"}) == 403
+        assert _raw_request(server, f"/parse?path={outside}", {}) == 403
+        escape = tmp_path / "data" / ".." / "elsewhere" / "lv2.xlsx"
+        assert _raw_request(server, f"/parse?path={escape}", {}) == 403
+    assert service.sources() == ["lv1.xlsx"]
+
+    with _running(ParseService(cfg=XmlConfig()), token="s3cret") as server:
+        assert _raw_request(server, f"/parse?path={inside}", {"Authorization": "Bearer s3cret"}) == 403
+        data = inside.read_bytes()
+        length = {"Content-Length": str(len(data))}
+        assert _raw_request(server, "/parse?name=lv1.xlsx", length, data) == 401
+        assert _raw_request(server, "/parse?name=lv1.xlsx", {**length, "Authorization": "Bearer wrong"}, data) == 401
+        assert _raw_request(server, "/parse?name=lv1.xlsx", {**length, "Authorization": "Bearer s3cret"}, data) == 200
+
+    with pytest.raises(ValueError):
+        make_server(ParseService(cfg=XmlConfig()), host="0.0.0.0", port=0)
+    server = make_server(ParseService(cfg=XmlConfig()), host="0.0.0.0", port=0, token="s3cret")
+    server.server_close()
+
+
+def test_service_answers_measurement_and_lot_queries_from_its_store(tmp_path, leaflet_factory):
+    first = leaflet_factory("lv1.xlsx", analytes=3, lot="3101")
+    second = leaflet_factory("lv2.xlsx", analytes=5, lot="3102")
+    expected = parse_workbook(second).normalized_values
+    analyte = expected[-1].analyte_name
+
+    with _running(ParseService(cfg=XmlConfig())) as server:
+        base = "http://127.0.0.1:{}".format(server.server_address[1])
+        assert _request(base, "GET", "/lots")[0] == 404
+
+    store = MeasurementStore(tmp_path / "session.sqlite")
+    with _running(ParseService(cfg=XmlConfig(), roots=[tmp_path], store=store)) as server:
+        base = "http://127.0.0.1:{}".format(server.server_address[1])
+        _request(base, "POST", f"/parse?path={first}")
+        _request(base, "POST", f"/parse?path={second}")
+        _request(base, "POST", "/parse?name=scratch.xlsx&keep=0", first.read_bytes())
+
+        body = json.loads(_request(base, "GET", f"/lots?analyte_name={quote(analyte)}")[2])
+        assert body == {"lots": [{"source_file": "lv2.xlsx", "lot_no": parse_workbook(second).workbook_meta.lot_no}]}
+        status, _, body = _request(base, "GET", "/measurements?source_file=lv2.xlsx&sort=sheet_row&descending=1&limit=2")
+        rows = json.loads(body)["records"]
+        assert status == 200 and [row["sheet_row"] for row in rows] == sorted(
+            (rec.sheet_row for rec in expected), reverse=True
+        )[:2]
+        assert _request(base, "GET", "/measurements?sort=nope")[0] == 400
+
+        _request(base, "DELETE", "/workbooks?source_file=lv2.xlsx")
+        assert json.loads(_request(base, "GET", "/lots")[2])["lots"][0]["source_file"] == "lv1.xlsx"
+    store.close()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from src.config import XmlConfig
+from src.models import AnalyteDef, MeasurementRecord, RawCellRecord, WorkbookMeta, WorkbookParseResult
+from src.snapshot import SessionSnapshot, load_session, save_session
+
+
+def _result(source: str) -> WorkbookParseResult:
+    records = [
+        MeasurementRecord(
+            source_file=source,
+            sample_label="Control LV1",
+            sample_code="0036",
+            unit="µg/L",
+            analyte_name="all-trans-Retinol",
+            group_name="Vitamins A/E",
+            metric_role="target",
+            raw_value="0.52",
+            numeric_value=0.52,
+            value_status="ok",
+            sheet_row=14,
+            sheet_col=4,
+        ),
+        MeasurementRecord(
+            source_file=source,
+            sample_label=None,
+            sample_code=None,
+            unit=None,
+            analyte_name="alpha-Tocopherol",
+            group_name=None,
+            metric_role="range_sep",
+            raw_value="n.d.",
+            numeric_value=None,
+            value_status="nd",
+            sheet_row=15,
+            sheet_col=5,
+        ),
+    ]
+    return WorkbookParseResult(
+        source_file=source,
+        workbook_meta=WorkbookMeta(
+            title_lines=["Serum Control LV1"],
+            order_no="0036",
+            lot_no="3124",
+            exp_date=date(2026, 3, 31),
+            sheet_name_rows="sorted by rows",
+        ),
+        analytes=[AnalyteDef(name="all-trans-Retinol", group_name="Vitamins A/E", column_index=4, units_seen=["µg/L"])],
+        normalized_values=records,
+        raw_cells=[
+            RawCellRecord(sheet_name="sorted by rows", row_idx=1, col_idx=1, raw_value="Title", python_type="str"),
+            RawCellRecord(sheet_name="Version", row_idx=2, col_idx=3, raw_value="1.0", python_type="float"),
+        ],
+        warnings=["Metadata key 'Order No.' was not found."],
+    )
+
+
+def test_session_round_trip(tmp_path):
+    snapshot = SessionSnapshot(
+        results=[_result("a.xlsx"), _result("b.xlsx"), WorkbookParseResult("empty.xlsx", WorkbookMeta())],
+        filters={"analyte_name": "all-trans-Retinol", "text": "retin"},
+        config=XmlConfig(method_id="M", method_version="2.0", sample_tube_types=["EDTA"]),
+    )
+    path = save_session(tmp_path / "morning.lpsession", snapshot)
+
+    restored = load_session(path)
+    assert restored == snapshot
+    # Strings come from one interned table instead of one copy per cell.
+    first, second = restored.results[0].normalized_values[0], restored.results[1].normalized_values[0]
+    assert first.analyte_name is second.analyte_name
+
+
+def test_load_rejects_foreign_files(tmp_path):
+    path = tmp_path / "not-a-session.lpsession"
+    path.write_bytes(b"PK\x03\x04 definitely a workbook")
+    with pytest.raises(ValueError, match="Not a session snapshot"):
+        load_session(path)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import statistics
+from datetime import date
+
+import pytest
+
+from src.models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from src.stats import CrossLotStatistics, compute_statistics
+
+
+def _record(source: str, role: str, value: float | None, sample: str = "LV1") -> MeasurementRecord:
+    return MeasurementRecord(
+        source_file=source,
+        sample_label=sample,
+        sample_code="1",
+        unit="µg/L",
+        analyte_name="Retinol",
+        group_name="Vitamins A/E",
+        metric_role=role,
+        raw_value=None if value is None else str(value),
+        numeric_value=value,
+        value_status="ok" if value is not None else "nd",
+        sheet_row=1,
+        sheet_col=2,
+    )
+
+
+def _lot(source: str, lot_no: str | None, exp_date: date | None, values: dict[str, list[float | None]]):
+    records = [_record(source, role, value) for role, role_values in values.items() for value in role_values]
+    return WorkbookParseResult(
+        source_file=source,
+        workbook_meta=WorkbookMeta(lot_no=lot_no, exp_date=exp_date),
+        normalized_values=records,
+    )
+
+
+def test_series_statistics_match_reference_implementation():
+    targets = [12.0, 9.5, 11.25, 10.0, 14.5, 13.0]
+    results = [
+        _lot(f"lot{idx}.xlsx", str(3100 + idx), date(2027, 1, 1 + idx), {"target": [value]})
+        for idx, value in enumerate(targets)
+    ]
+    results.append(_lot("extra.xlsx", "3200", date(2028, 1, 1), {"range_sep": [1.0], "target": [None]}))
+
+    (stats,) = compute_statistics(results, percentiles=(25, 50, 75))
+    assert stats.key == ("Vitamins A/E", "Retinol", "µg/L", "target", "LV1")
+    assert (stats.count, stats.lots) == (6, 6)
+    assert (stats.minimum, stats.maximum) == (9.5, 14.5)
+    assert stats.mean == pytest.approx(statistics.fmean(targets))
+    assert stats.std == pytest.approx(statistics.stdev(targets))
+    assert stats.percentiles == pytest.approx(tuple(statistics.quantiles(targets, n=4, method="inclusive")))
+    steps = [abs(b - a) for a, b in zip(targets, targets[1:])]
+    assert stats.max_step == pytest.approx(max(steps))
+    assert stats.drift == pytest.approx(statistics.linear_regression(range(len(targets)), targets).slope)
+
+
+def test_lots_are_folded_by_lot_number_and_ordered_by_expiry():
+    engine = CrossLotStatistics()
+    # Added out of order; the lot sequence follows expiry date, then lot number.
+    engine.add_result(_lot("c.xlsx", "3003", date(2027, 3, 1), {"target": [30.0], "range_low": [25.0]}))
+    engine.add_result(_lot("a.xlsx", "3001", date(2027, 1, 1), {"target": [10.0], "range_low": [5.0]}))
+    engine.add_result(_lot("a-copy.xlsx", "3001", date(2027, 1, 1), {"target": [12.0]}))
+    engine.add_result(_lot("b.xlsx", None, None, {"target": [50.0]}))
+    engine.add_result(_lot("d.xlsx", "3002", date(2027, 2, 1), {"target": [20.0]}))
+    assert len(engine) == 7
+
+    by_role = {stats.metric_role: stats for stats in engine.compute()}
+    assert list(by_role) == ["range_low", "target"]
+
+    target = by_role["target"]
+    assert (target.count, target.lots) == (5, 4)
+    # Per-lot means in lot order: 11 (3001), 20 (3002), 30 (3003), 50 (b.xlsx, no dates).
+    assert target.max_step == pytest.approx(20.0)
+    assert target.drift == pytest.approx(statistics.linear_regression(range(4), [11, 20, 30, 50]).slope)
+
+    range_low = by_role["range_low"]
+    assert (range_low.lots, range_low.drift, range_low.max_step) == (2, 20.0, 20.0)
+
+    single = CrossLotStatistics()
+    single.add_result(_lot("a.xlsx", "1", None, {"target": [4.0]}))
+    (only,) = single.compute()
+    assert (only.std, only.drift, only.max_step, only.percentiles) == (None, None, None, (4.0,) * 5)
+
+    assert CrossLotStatistics().compute() == []
+    with pytest.raises(ValueError):
+        engine.compute(percentiles=(101,))
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import itertools
+
+from src.filter_index import MeasurementIndex
+from src.models import MeasurementRecord, WorkbookMeta, WorkbookParseResult
+from src.store import MeasurementStore
+from src.xml_exporter import aggregate_results, render_consolidated_addon_xml
+from src.config import XmlConfig
+
+
+def _result(source: str, lot: str, statuses=("ok", "nd")) -> WorkbookParseResult:
+    records = []
+    for row, (sample, analyte, unit, status) in enumerate(
+        itertools.product(("LV1", None), (" Retinol", "retinol", "Zinc"), ("µg/L", None), statuses), start=1
+    ):
+        records.append(
+            MeasurementRecord(
+                source_file=source,
+                sample_label=sample,
+                sample_code=None if sample is None else str(row % 3),
+                unit=unit,
+                analyte_name=analyte,
+                group_name="Vitamins" if analyte != "Zinc" else "Trace Elements",
+                metric_role="target" if row % 2 else "range_low",
+                raw_value="n.d." if status == "nd" else str(row / 4),
+                numeric_value=None if status == "nd" else row / 4,
+                value_status=status,
+                sheet_row=row,
+                sheet_col=4,
+            )
+        )
+    return WorkbookParseResult(source_file=source, workbook_meta=WorkbookMeta(lot_no=lot), normalized_values=records)
+
+
+def test_store_queries_match_the_in_memory_index():
+    results = [_result("b.xlsx", "2002"), _result("a.xlsx", "2001", statuses=("ok",))]
+    index = MeasurementIndex()
+    index.upsert(results)
+    store = MeasurementStore()
+    store.upsert(results)
+
+    assert len(store) == len(index)
+    for name in ("source_file", "sample_label", "analyte_name", "unit", "metric_role"):
+        assert store.values(name) == index.values(name)
+    choices = {
+        "source_file": ("", "a.xlsx"),
+        "analyte_name": ("", "retinol"),
+        "unit": ("", "µg/L"),
+        "text": ("", "RETIN", "µG"),
+    }
+    for combo in itertools.product(*choices.values()):
+        filters = dict(zip(choices, combo))
+        assert store.query(filters) == index.query(filters), filters
+        for column in ("numeric_value", "sample_label", "raw_value"):
+            for descending in (False, True):
+                assert store.query(filters, sort_by=column, descending=descending) == index.query(
+                    filters, sort_by=column, descending=descending
+                ), (filters, column, descending)
+
+
+def test_store_answers_lot_questions_and_feeds_the_exporter(tmp_path):
+    results = [_result("a.xlsx", "2001", statuses=("ok",)), _result("b.xlsx", "2002")]
+    path = tmp_path / "library.sqlite"
+    with MeasurementStore(path) as store:
+        store.upsert(results)
+        store.upsert([_result("c.xlsx", "2003")])
+        store.remove("c.xlsx")
+
+    with MeasurementStore(path) as store:
+        assert store.lots({"analyte_name": "Zinc", "unit": "µg/L", "value_status": "nd"}) == [("b.xlsx", "2002")]
+        assert store.count({"value_status": "nd"}) == 12
+        assert len(store.query({}, limit=5)) == 5
+        cfg = XmlConfig()
+        assert render_consolidated_addon_xml(store.aggregation(), cfg) == render_consolidated_addon_xml(
+            aggregate_results(results), cfg
+        )
+        store.clear()
+        assert len(store) == 0 and store.lots({}) == []
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from src.tasks import BackgroundTaskRunner, TaskContext
+
+
+class _FakeRoot:
+    def __init__(self) -> None:
+        self.pending = []
+
+    def after(self, ms, func):
+        self.pending.append(func)
+        return f"after#{len(self.pending)}"
+
+    def pump(self, until, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not until():
+            assert time.monotonic() < deadline, "task runner did not settle"
+            callbacks, self.pending = self.pending, []
+            for func in callbacks:
+                func()
+            time.sleep(0.005)
+
+
+def test_results_and_progress_are_delivered_through_after():
+    root = _FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_interval_ms=1)
+    progress = []
+    outcome = {}
+    worker_threads = []
+
+    def work(ctx: TaskContext) -> int:
+        worker_threads.append(threading.current_thread())
+        for idx in range(1, 4):
+            ctx.report(idx, 3, f"file{idx}")
+        return 42
+
+    assert runner.submit(
+        "import",
+        work,
+        on_success=lambda v: outcome.setdefault("value", v),
+        on_progress=progress.append,
+    )
+    root.pump(lambda: "value" in outcome)
+
+    assert outcome["value"] == 42
+    assert [p.done for p in progress] == [1, 2, 3]
+    assert worker_threads[0] is not threading.main_thread()
+    assert not runner.is_running("import")
+
+
+def test_only_one_job_per_kind_and_cancel():
+    root = _FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_interval_ms=1)
+    started = threading.Event()
+    outcome = {}
+
+    def work(ctx: TaskContext) -> None:
+        started.set()
+        while True:
+            ctx.check_cancelled()
+            time.sleep(0.001)
+
+    assert runner.submit(
+        "import",
+        work,
+        on_success=lambda _v: None,
+        on_cancelled=lambda: outcome.setdefault("cancelled", True),
+    )
+    assert not runner.submit("import", work, on_success=lambda _v: None)
+    assert runner.submit("export", lambda ctx: "ok", on_success=lambda v: outcome.setdefault("export", v))
+
+    started.wait(timeout=5)
+    runner.cancel("import")
+    root.pump(lambda: "cancelled" in outcome and "export" in outcome)
+
+    assert outcome == {"cancelled": True, "export": "ok"}
+    assert not runner.is_running()
+
+
+def test_errors_are_reported_on_main_thread():
+    root = _FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_interval_ms=1)
+    errors = []
+
+    def work(ctx: TaskContext) -> None:
+        raise ValueError("broken workbook")
+
+    runner.submit("import", work, on_success=lambda _v: None, on_error=errors.append)
+    root.pump(lambda: bool(errors))
+
+    assert isinstance(errors[0], ValueError)
+    assert errors[0].args == ("broken workbook",)
+
+
+def test_partial_results_arrive_in_batches_before_completion():
+    root = _FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_interval_ms=1)
+    batches = []
+    outcome = {}
+    published = threading.Event()
+
+    def work(ctx: TaskContext) -> str:
+        for idx in range(3):
+            ctx.publish(idx)
+        published.wait(timeout=5)
+        ctx.publish(3)
+        return "done"
+
+    runner.submit(
+        "import",
+        work,
+        on_success=lambda v: outcome.setdefault("value", (v, sum(batches, []))),
+        on_partial=batches.append,
+    )
+    root.pump(lambda: len(batches) == 1)
+    published.set()
+    root.pump(lambda: "value" in outcome)
+
+    assert batches == [[0, 1, 2], [3]]
+    # The last partial result is delivered before the success callback.
+    assert outcome["value"] == ("done", [0, 1, 2, 3])
+
+
+def test_partial_results_published_before_a_cancel_are_delivered():
+    root = _FakeRoot()
+    runner = BackgroundTaskRunner(root, poll_interval_ms=1)
+    events = []
+    published = threading.Event()
+
+    def work(ctx: TaskContext) -> None:
+        ctx.publish("lot1.xlsx")
+        ctx.publish("lot2.xlsx")
+        published.set()
+        while True:
+            ctx.check_cancelled()
+            time.sleep(0.001)
+
+    runner.submit(
+        "import",
+        work,
+        on_success=lambda _v: None,
+        on_partial=events.append,
+        on_cancelled=lambda: events.append("cancelled"),
+    )
+    # Cancel before the main thread has drained the published values.
+    published.wait(timeout=5)
+    runner.cancel("import")
+    root.pump(lambda: "cancelled" in events)
+
+    assert events == [["lot1.xlsx", "lot2.xlsx"], "cancelled"]
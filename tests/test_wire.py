@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+
+import pytest
+
+from src.models import WorkbookMeta, WorkbookParseResult
+from src.parser import parse_workbook
+from src.wire import decode_results, encode_results, read_shared_results, share_results
+
+
+def _count_in_child(name: str) -> tuple[int, list[str]]:
+    results = read_shared_results(name)
+    return sum(len(r.normalized_values) for r in results), [r.source_file for r in results]
+
+
+@pytest.fixture()
+def parsed(leaflet_factory):
+    return [
+        parse_workbook(leaflet_factory("a.xlsx", analytes=3)),
+        parse_workbook(leaflet_factory("b.xlsx", analytes=5, lot="4417", version_sheet=False)),
+        WorkbookParseResult("empty.xlsx", WorkbookMeta(), warnings=["No data"]),
+    ]
+
+
+def test_round_trip_equals_dataclass_form(parsed):
+    payload = encode_results(parsed)
+
+    restored = decode_results(payload)
+    assert restored == parsed
+    assert restored == pickle.loads(pickle.dumps(parsed))
+    assert [list(r.raw_cells) for r in restored] == [list(r.raw_cells) for r in parsed]
+    assert restored[0].raw_cells.get("Leaflet sorted by rows", 4, 2).raw_value == "3124"
+    assert decode_results(encode_results([])) == []
+
+
+def test_decode_accepts_oversized_buffers_and_rejects_bad_payloads(parsed):
+    payload = encode_results(parsed)
+    assert decode_results(bytearray(payload) + bytearray(4096)) == parsed
+
+    with pytest.raises(ValueError, match="Not a parse result payload"):
+        decode_results(b"PK\x03\x04 definitely a workbook")
+    with pytest.raises(ValueError, match="truncated"):
+        decode_results(payload[:-10])
+    corrupted = bytearray(payload)
+    corrupted[40:48] = b"\xff" * 8
+    with pytest.raises(ValueError, match="Corrupt"):
+        decode_results(bytes(corrupted))
+
+
+def test_shared_memory_round_trip_across_processes(parsed):
+    block = share_results(parsed)
+    try:
+        assert read_shared_results(block.name) == parsed
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            count, sources = pool.apply(_count_in_child, (block.name,))
+    finally:
+        block.close()
+        block.unlink()
+
+    assert count == sum(len(r.normalized_values) for r in parsed)
+    assert sources == ["a.xlsx", "b.xlsx", "empty.xlsx"]
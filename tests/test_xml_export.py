@@ -1,16 +1,26 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from pathlib import Path
 
 from xml.etree import ElementTree as ET
 
+import pytest
+
+from src import xml_exporter
 from src.config import XmlConfig
 from src.models import AnalyteDef, MeasurementRecord, WorkbookMeta, WorkbookParseResult
 from src.xml_exporter import (
     _EMBEDDED_ADDON_XSD,
+    aggregate_results,
     build_addon_xml,
     build_consolidated_addon_xml,
+    plan_shards,
+    render_consolidated_addon_xml,
     validate_addon_xml,
+    write_profile_exports,
+    write_sharded_consolidated_addon_xml,
 )
 
 
@@ -199,3 +209,122 @@ def test_consolidated_xml_deduplicates_analytes_within_assay():
     unit_names = [u.findtext("Name") for u in analytes[0].findall("./AnalyteUnits/AnalyteUnit")]
     assert unit_names == ["mg/L", "μmol/L"]
 
+
+
+def _vitamin_record(source: str, analyte: str, code: str | None, unit: str | None, group: str | None):
+    return MeasurementRecord(
+        source_file=source,
+        sample_label="S1",
+        sample_code=code,
+        unit=unit,
+        analyte_name=analyte,
+        group_name=group,
+        metric_role="target",
+        raw_value="1.0",
+        numeric_value=1.0,
+        value_status="ok",
+        sheet_row=10,
+        sheet_col=5,
+    )
+
+
+def test_merged_aggregations_render_like_a_single_pass():
+    first = WorkbookParseResult(
+        source_file="one.xlsx",
+        workbook_meta=WorkbookMeta(),
+        normalized_values=[
+            _vitamin_record("one.xlsx", " Retinol ", "", "mg/L", "Vitamins"),
+            _vitamin_record("one.xlsx", "Zinc", "4", None, None),
+        ],
+    )
+    second = WorkbookParseResult(
+        source_file="two.xlsx",
+        workbook_meta=WorkbookMeta(),
+        normalized_values=[
+            _vitamin_record("two.xlsx", "retinol", "27", "μmol/L", "Vitamins"),
+            _vitamin_record("two.xlsx", "Tocopherol", "31", "mg/L", "Vitamins"),
+        ],
+    )
+
+    merged = aggregate_results([first])
+    merged.merge(aggregate_results([second]))
+
+    expected = build_consolidated_addon_xml([first, second], XmlConfig())
+    assert render_consolidated_addon_xml(merged, XmlConfig()) == expected
+
+
+def test_profile_exports_render_every_profile_from_one_aggregation(tmp_path):
+    result = WorkbookParseResult(
+        source_file="one.xlsx",
+        workbook_meta=WorkbookMeta(),
+        normalized_values=[_vitamin_record("one.xlsx", "Retinol", "11", "mg/L", "Vitamins")],
+    )
+    profiles = {
+        "Instrument A": XmlConfig(method_id="Method A"),
+        "Instrument B/2": XmlConfig(method_id="Method B", method_version="2.0"),
+    }
+
+    written = write_profile_exports([result], profiles, tmp_path)
+    pooled = write_profile_exports([result], profiles, tmp_path / "pooled", max_workers=2)
+
+    assert written["Instrument A"] == tmp_path / "Instrument A" / "consolidated.xml"
+    assert written["Instrument B/2"] == tmp_path / "Instrument B_2" / "consolidated.xml"
+    for name, path in written.items():
+        root = ET.fromstring(path.read_text(encoding="utf-8"))
+        assert root.findtext("MethodId") == profiles[name].method_id
+        assert root.findtext("./Assays/Assay/Analytes/Analyte/AssayRef") == "11"
+        assert pooled[name].read_bytes() == path.read_bytes()
+
+    # Folder names differing only in case collide on case-insensitive file systems.
+    with pytest.raises(ValueError):
+        write_profile_exports([result], {"Lab A": XmlConfig(), "lab a": XmlConfig()}, tmp_path / "clash")
+
+
+def test_sharded_export_splits_assays_and_writes_a_manifest(tmp_path, monkeypatch):
+    records = [
+        _vitamin_record("one.xlsx", f"Analyte {idx}", str(idx), "mg/L", group)
+        for group, count in (("Amino acids", 3), ("Vitamins", 2), ("Zinc panel", 1))
+        for idx in range(count)
+    ]
+    results = [WorkbookParseResult(source_file="one.xlsx", workbook_meta=WorkbookMeta(), normalized_values=records)]
+    cfg = XmlConfig(method_id="Method A")
+    aggregation = aggregate_results(results)
+
+    assert [sorted(shard.assays) for shard in plan_shards(aggregation, "size", max_analytes=3)] == [
+        ["Amino acids"],
+        ["Vitamins", "Zinc panel"],
+    ]
+
+    manifest_path = write_sharded_consolidated_addon_xml(results, cfg, tmp_path, max_workers=2)
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["shard_by"] == "group" and manifest["method_id"] == "Method A" and manifest["generation"] == 1
+    assert [shard["assays"] for shard in manifest["shards"]] == [["Amino acids"], ["Vitamins"], ["Zinc panel"]]
+    assays = []
+    for shard in manifest["shards"]:
+        data = (tmp_path / shard["file"]).read_bytes()
+        assert hashlib.sha256(data).hexdigest() == shard["sha256"] and len(data) == shard["bytes"]
+        validate_addon_xml(data.decode("utf-8"))
+        assays.extend(ET.fromstring(data).findall("./Assays/Assay"))
+    single = ET.fromstring(build_consolidated_addon_xml(results, cfg)).findall("./Assays/Assay")
+    for assay in (*assays, *single):
+        assay.tail = None
+    assert [ET.tostring(assay) for assay in assays] == [ET.tostring(assay) for assay in single]
+
+    # An export that fails half-way leaves the current manifest and its shards untouched.
+    before = {path.name: path.read_bytes() for path in tmp_path.iterdir()}
+    real_write_shard = xml_exporter._write_shard
+
+    def failing_write_shard(shard, cfg, path):
+        if path.name.endswith("-0002.xml"):
+            raise OSError("disk full")
+        return real_write_shard(shard, cfg, path)
+
+    monkeypatch.setattr(xml_exporter, "_write_shard", failing_write_shard)
+    with pytest.raises(OSError):
+        write_sharded_consolidated_addon_xml(results, XmlConfig(method_id="Method B"), tmp_path)
+    monkeypatch.undo()
+    assert all((tmp_path / name).read_bytes() == data for name, data in before.items())
+
+    # Re-exporting with fewer shards removes the shards the new manifest no longer lists.
+    write_sharded_consolidated_addon_xml(results, cfg, tmp_path, shard_by="size", max_analytes=10)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["consolidated-0002-0001.xml", "manifest.json"]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import zipfile
+
+import pytest
+
+from leaflets import write_synthetic_leaflet
+from src.parser import list_archive_workbooks, parse_folder, parse_workbook
+
+
+def test_zip_members_parse_in_memory_with_qualified_source_names(tmp_path):
+    lv1 = write_synthetic_leaflet(tmp_path / "src" / "lv1.xlsx", analytes=3)
+    lv2 = write_synthetic_leaflet(tmp_path / "src" / "lv2.xlsx", analytes=6, lot="4417")
+    bundle = tmp_path / "release" / "bundle.zip"
+    bundle.parent.mkdir()
+    with zipfile.ZipFile(bundle, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.write(lv1, "lv1.xlsx")
+        archive.write(lv2, "serum/lv2.xlsx")
+        archive.writestr("serum/~$lv2.xlsx", b"lock")
+        archive.writestr("readme.txt", "not a workbook")
+
+    assert [m.name for m in list_archive_workbooks(bundle)] == ["lv1.xlsx", "serum/lv2.xlsx"]
+    assert [m.name for m in list_archive_workbooks(bundle, exclude=["serum/*"])] == ["lv1.xlsx"]
+
+    results = parse_folder(bundle)
+    assert [r.source_file for r in results] == ["bundle.zip/lv1.xlsx", "bundle.zip/serum/lv2.xlsx"]
+    expected = parse_workbook(lv2, source_file="bundle.zip/serum/lv2.xlsx")
+    assert results[1] == expected
+    assert results[1].workbook_meta.lot_no == "4417"
+    assert parse_folder(bundle, max_workers=2) == results
+    assert sorted(p.name for p in bundle.parent.iterdir()) == ["bundle.zip"]
+
+
+def test_invalid_archives_and_streams_without_names_are_rejected(tmp_path):
+    broken = tmp_path / "broken.zip"
+    broken.write_bytes(b"definitely not a zip")
+    with pytest.raises(ValueError, match="Not a valid ZIP archive"):
+        list_archive_workbooks(broken)
+    with open(write_synthetic_leaflet(tmp_path / "lv1.xlsx"), "rb") as handle:
+        with pytest.raises(ValueError, match="source_file is required"):
+            parse_workbook(handle)